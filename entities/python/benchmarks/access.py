@@ -0,0 +1,66 @@
+"""
+Benchmark of field access of entities.
+
+Measures gets, sets and constructions per second of ``Item`` and
+``DirtyRemoteItem`` entities.
+
+Usage:
+    python benchmarks/access.py --number 100000
+"""
+import argparse
+import timeit
+
+from onedrive_client.entities.common import DirtyRemoteItem
+from onedrive_client.entities.onedrive import Item
+
+ITEM = {
+    'base_item': {'id': b'ABC!123', 'e_tag': b'etag', 'c_tag': b'ctag',
+                  'last_modified_date_time': 1500000000, 'name': 'file'},
+    'size': 1024,
+    'file': {'hashes': {'sha1_hash': b'0' * 20}}
+}
+
+
+def measure(name: str, statement, number: int) -> None:
+    """Print operations per second of a statement.
+
+    Parameters
+    ----------
+    name : str
+        Name of the measurement.
+    statement : Callable
+        Operation to measure.
+    number : int
+        Number of operations.
+    """
+    seconds = min(timeit.repeat(statement, number=number, repeat=3))
+    print('{:>24}: {:>12,.0f} ops/s'.format(name, number / seconds))
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    item = Item(ITEM)
+    dirty = DirtyRemoteItem({'our_id': b'ABC!123', 'item': ITEM})
+    base_item = item['base_item']
+
+    measure('Item get', lambda: item['size'], args.number)
+    measure('Item get nested', lambda: base_item['e_tag'], args.number)
+    measure('Item get default', lambda: Item()['size'], args.number // 10)
+    measure('Item set', lambda: item.__setitem__('size', 2048), args.number)
+    measure('BaseItem set', lambda: base_item.__setitem__('name', 'f'),
+            args.number)
+    measure('Item construct', lambda: Item(ITEM), args.number // 10)
+    measure('DirtyRemoteItem get', lambda: dirty['our_id'], args.number)
+    measure('DirtyRemoteItem set',
+            lambda: dirty.__setitem__('our_id', b'DEF!456'), args.number)
+    measure('DirtyRemoteItem construct',
+            lambda: DirtyRemoteItem({'our_id': b'ABC!123', 'item': ITEM}),
+            args.number // 10)
+
+
+if __name__ == '__main__':
+    main()
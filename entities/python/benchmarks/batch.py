@@ -0,0 +1,104 @@
+"""
+Benchmark of joins of local and remote items.
+
+Finds local items which differ from remote ones of the same name by size
+or modification time, with a Python loop over entities against a join of
+``EntityBatch``-es.
+
+Usage:
+    python benchmarks/batch.py --number 100000
+"""
+import argparse
+import random
+import time
+
+from onedrive_client.entities.batch import EntityBatch
+from onedrive_client.entities.common import LocalItem
+from onedrive_client.entities.onedrive import Item
+
+
+def make_items(number: int) -> tuple:
+    """Make local items and remote ones, a tenth of them is changed."""
+    local_items = [
+        LocalItem({'path': 'file%d' % i,
+                   'metadata': {'size': i, 'modified': 1500000000 + i}})
+        for i in range(number)
+    ]
+    remote_items = [
+        Item({'base_item': {'name': 'file%d' % i,
+                            'last_modified_date_time': 1500000000 + i},
+              'size': i + (i % 10 == 0)})
+        for i in range(number)
+    ]
+    random.shuffle(remote_items)
+    return local_items, remote_items
+
+
+def loop(local_items: list, remote_items: list) -> set:
+    """Find changed items with a loop."""
+    by_name = {item['base_item']['name']: item for item in remote_items}
+    changed = set()
+    for local_item in local_items:
+        remote_item = by_name.get(local_item['path'])
+        if remote_item is None:
+            continue
+        metadata = local_item['metadata']
+        if metadata['size'] != remote_item['size'] or \
+                metadata['modified'] != \
+                remote_item['base_item']['last_modified_date_time']:
+            changed.add(local_item['path'])
+    return changed
+
+
+def join(local: EntityBatch, remote: EntityBatch) -> set:
+    """Find changed items with a join."""
+    left, right = local.join(remote, 'path', 'base_item.name')
+    changed = (
+        (local['metadata.size'][left] != remote['size'][right]) |
+        (local['metadata.modified'][left] !=
+         remote['base_item.last_modified_date_time'][right])
+    )
+    return set(local['path'][left[changed]])
+
+
+def measure(name: str, function, number: int):
+    """Print items per second of a function and return its result.
+
+    Parameters
+    ----------
+    name : str
+        Name of the measurement.
+    function : Callable
+        Operation over all the items.
+    number : int
+        Number of items.
+    """
+    started = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - started
+    print('{:>24}: {:>12,.0f} items/s'.format(name, number / seconds))
+    return result
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    local_items, remote_items = make_items(args.number)
+
+    expected = measure('loop join', lambda: loop(local_items, remote_items),
+                       args.number)
+    local, remote = measure(
+        'batch conversion',
+        lambda: (EntityBatch.from_entities(LocalItem, local_items),
+                 EntityBatch.from_entities(Item, remote_items)),
+        args.number
+    )
+    changed = measure('batch join', lambda: join(local, remote), args.number)
+    assert changed == expected
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark of memory of bulk construction of entities.
+
+Measures memory allocated per ``UploadStatus`` entity, which has a repeated
+field, and the number of collection-classes alive after the construction.
+
+Usage:
+    python benchmarks/memory.py --number 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from onedrive_client.entities.base import EntityCollection
+from onedrive_client.entities.onedrive import UploadStatus
+
+STATUS = {
+    'expiration_date_time': 1500000000,
+    'next_expected_ranges': [{'beginning': 0, 'end': 1024},
+                             {'beginning': 2048}]
+}
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    statuses = [UploadStatus(STATUS) for _ in range(args.number)]
+    seconds = time.perf_counter() - started
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    classes = len(EntityCollection.__subclasses__())
+    print('{:>24}: {:>12,}'.format('entities', len(statuses)))
+    print('{:>24}: {:>12,.0f} ops/s'.format(
+        'construct', args.number / seconds))
+    print('{:>24}: {:>12,.0f} B'.format(
+        'memory per entity', allocated / args.number))
+    print('{:>24}: {:>12,}'.format('collection-classes', classes))
+
+
+if __name__ == '__main__':
+    main()
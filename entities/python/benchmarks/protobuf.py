@@ -0,0 +1,110 @@
+"""
+Benchmark of serialization of entities.
+
+Compares encoding and decoding of a page of ``DirtyRemoteItem`` entities
+with the length-delimited Protobuf codec against JSON lines.
+
+Usage:
+    python benchmarks/protobuf.py --number 100000
+"""
+import argparse
+import base64
+import enum
+import json
+import time
+
+from onedrive_client.entities import codec, Entity
+from onedrive_client.entities.base import EntityCollection
+from onedrive_client.entities.common import DirtyRemoteItem
+
+ITEM = {
+    'base_item': {'id': b'ABC!123', 'e_tag': b'etag', 'c_tag': b'ctag',
+                  'last_modified_date_time': 1500000000, 'name': 'file'},
+    'size': 1024,
+    'file': {'hashes': {'sha1_hash': b'0' * 20}}
+}
+
+
+def to_plain(value):
+    """Convert an entity to JSON-compatible values, bytes as base64."""
+    if isinstance(value, Entity):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, EntityCollection):
+        return [to_plain(item) for item in value]
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    if isinstance(value, enum.IntEnum):
+        return int(value)
+    return value
+
+
+def from_plain(entity: Entity, plain: dict) -> Entity:
+    """Fill an entity from JSON-compatible values."""
+    for key, value in plain.items():
+        if isinstance(value, dict):
+            entity[key] = {}
+            from_plain(entity[key], value)
+            continue
+        try:
+            entity[key] = value
+        except TypeError:
+            entity[key] = base64.b64decode(value)
+    return entity
+
+
+def encode_json(entities) -> bytes:
+    """Encode entities as JSON lines."""
+    return b'\n'.join(json.dumps(to_plain(entity)).encode('utf-8')
+                      for entity in entities)
+
+
+def decode_json(data: bytes):
+    """Decode entities from JSON lines."""
+    return [from_plain(DirtyRemoteItem(), json.loads(line.decode('utf-8')))
+            for line in data.split(b'\n')]
+
+
+def measure(name: str, function, number: int):
+    """Print entities per second of a function and return its result.
+
+    Parameters
+    ----------
+    name : str
+        Name of the measurement.
+    function : Callable
+        Operation over all the entities.
+    number : int
+        Number of entities.
+    """
+    started = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - started
+    print('{:>24}: {:>12,.0f} items/s'.format(name, number / seconds))
+    return result
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    entities = [DirtyRemoteItem({'our_id': str(i).encode(), 'item': ITEM})
+                for i in range(args.number)]
+
+    data = measure('protobuf encode', lambda: codec.encode(entities),
+                   args.number)
+    decoded = measure('protobuf decode',
+                      lambda: list(codec.decode(DirtyRemoteItem, data)),
+                      args.number)
+    assert decoded == entities
+    print('{:>24}: {:>12,} B'.format('protobuf size', len(data)))
+
+    data = measure('json encode', lambda: encode_json(entities), args.number)
+    decoded = measure('json decode', lambda: decode_json(data), args.number)
+    assert decoded == entities
+    print('{:>24}: {:>12,} B'.format('json size', len(data)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of lazy views of entities.
+
+Compares decoding of serialized ``DirtyRemoteItem`` entities followed by
+reading of ``id``, ``e_tag`` and ``size`` only, with ``from_protobuf``
+against ``view``, and memory held by the decoded entities.
+
+Usage:
+    python benchmarks/view.py --number 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from onedrive_client.entities.common import DirtyRemoteItem
+
+ITEM = {
+    'base_item': {'id': b'ABC!123', 'e_tag': b'etag', 'c_tag': b'ctag',
+                  'last_modified_date_time': 1500000000, 'name': 'file'},
+    'size': 1024,
+    'file': {'hashes': {'sha1_hash': b'0' * 20}}
+}
+
+
+def partial_read(entity: DirtyRemoteItem) -> tuple:
+    """Read the fields most consumers need."""
+    item = entity['item']
+    base_item = item['base_item']
+    return base_item['id'], base_item['e_tag'], item['size']
+
+
+def measure(name: str, decode, buffers: list) -> list:
+    """Print decodings per second and memory of the decoded entities.
+
+    Parameters
+    ----------
+    name : str
+        Name of the measurement.
+    decode : Callable
+        Decoding of a buffer to an entity.
+    buffers : list
+        Serialized entities.
+    """
+    seconds = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        fields = [partial_read(decode(buffer)) for buffer in buffers]
+        seconds = min(seconds, time.perf_counter() - started)
+
+    # Memory is traced apart, since tracing slows allocations down
+    gc.collect()
+    tracemalloc.start()
+    entities = [decode(buffer) for buffer in buffers]
+    for entity in entities:
+        partial_read(entity)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{:>24}: {:>12,.0f} items/s'.format(
+        name + ' partial read', len(buffers) / seconds))
+    print('{:>24}: {:>12,.0f} B'.format(
+        name + ' per entity', allocated / len(buffers)))
+    return fields
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    buffers = [DirtyRemoteItem({'our_id': str(i).encode(),
+                                'item': ITEM}).to_protobuf()
+               for i in range(args.number)]
+
+    eager = measure('from_protobuf', DirtyRemoteItem.from_protobuf, buffers)
+    lazy = measure('view', DirtyRemoteItem.view, buffers)
+    assert eager == lazy
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,27 @@
 """Provides ``Entity`` class - a base class for project-wise DTOs."""
+# pylint: disable=too-many-lines
 from abc import ABCMeta
+from array import array
 import collections.abc
 import enum
 import importlib
-from typing import Callable, Generic, Iterable, TypeVar
+import struct
+from typing import Callable, Generic, Iterable, Sequence, TypeVar
 
 from google.protobuf.descriptor import (
     Descriptor,
     EnumDescriptor,
     FieldDescriptor
 )
+from google.protobuf.internal import api_implementation
+from google.protobuf.message import DecodeError, Message
 from google.protobuf.reflection import MakeClass
 
 T = TypeVar('T')
 
+# The C++ implementation of Protobuf serializes PB-messages faster than
+# fields can be encoded in Python
+_PURE_PYTHON = api_implementation.Type() == 'python'
 
 _TYPE_MAP = {
     FieldDescriptor.TYPE_DOUBLE: (float,),
@@ -104,6 +112,464 @@ class EntityCollection(collections.abc.MutableSequence, Generic[T]):
         return item
 
 
+_REGISTRY = {}
+# Collection-classes by full name of the field
+_COLLECTIONS = {}
+
+_VIRTUAL_MODULE = __name__.rsplit('.', 1)[0] + '.virtual'
+
+# Kinds of fields
+_SCALAR, _ENUM, _MESSAGE = range(3)
+
+_MISSING = object()
+
+# Wire types of Protobuf encoding
+_VARINT, _FIXED64, _LENGTH_DELIMITED, _FIXED32 = 0, 1, 2, 5
+
+
+def _signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _zigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _fixed(fmt: str) -> Callable:
+    unpack = struct.Struct(fmt).unpack
+    return lambda value: unpack(value)[0]
+
+
+def _unsigned(value: int) -> int:
+    return value & 0xffffffffffffffff
+
+
+def _unzigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+# Wire type, conversion of a raw value and the reverse one by type of
+# a field. Raw values of varints are non-negative integers, the others are
+# bytes.
+_WIRE_MAP = {
+    FieldDescriptor.TYPE_DOUBLE: (_FIXED64, _fixed('<d'),
+                                  struct.Struct('<d').pack),
+    FieldDescriptor.TYPE_FLOAT: (_FIXED32, _fixed('<f'),
+                                 struct.Struct('<f').pack),
+    FieldDescriptor.TYPE_INT64: (_VARINT, _signed, _unsigned),
+    FieldDescriptor.TYPE_UINT64: (_VARINT, int, int),
+    FieldDescriptor.TYPE_INT32: (_VARINT, _signed, _unsigned),
+    FieldDescriptor.TYPE_FIXED64: (_FIXED64, _fixed('<Q'),
+                                   struct.Struct('<Q').pack),
+    FieldDescriptor.TYPE_FIXED32: (_FIXED32, _fixed('<I'),
+                                   struct.Struct('<I').pack),
+    FieldDescriptor.TYPE_BOOL: (_VARINT, bool, int),
+    FieldDescriptor.TYPE_STRING: (_LENGTH_DELIMITED,
+                                  lambda value: str(value, 'utf-8'),
+                                  lambda value: value.encode('utf-8')),
+    FieldDescriptor.TYPE_MESSAGE: (_LENGTH_DELIMITED, None, None),
+    FieldDescriptor.TYPE_BYTES: (_LENGTH_DELIMITED, bytes, bytes),
+    FieldDescriptor.TYPE_UINT32: (_VARINT, int, int),
+    FieldDescriptor.TYPE_ENUM: (_VARINT, _signed, _unsigned),
+    FieldDescriptor.TYPE_SFIXED32: (_FIXED32, _fixed('<i'),
+                                    struct.Struct('<i').pack),
+    FieldDescriptor.TYPE_SFIXED64: (_FIXED64, _fixed('<q'),
+                                    struct.Struct('<q').pack),
+    FieldDescriptor.TYPE_SINT32: (_VARINT, _zigzag, _unzigzag),
+    FieldDescriptor.TYPE_SINT64: (_VARINT, _zigzag, _unzigzag),
+}
+
+
+def _encode_varint(value: int) -> bytes:
+    """Encode a non-negative integer as a varint."""
+    chunks = bytearray()
+    while value > 0x7f:
+        chunks.append(value & 0x7f | 0x80)
+        value >>= 7
+    chunks.append(value)
+    return bytes(chunks)
+
+
+def _decode_varint(buffer: bytes, position: int) -> tuple:
+    """Decode a varint at the position.
+
+    Returns the value and the position after it.
+    """
+    result = shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def _scan(buffer: bytes, start: int, end: int, fields: dict) -> array:
+    """Index raw values of fields of a message in wire format.
+
+    Only the top level of the message is walked and nothing is decoded
+    or copied: values are recorded as their offsets in the buffer. The
+    index is a single flat array per message, so a view holds a few bytes
+    per value until it's decoded.
+
+    Parameters
+    ----------
+    buffer : bytes
+        Any bytes-like object with the message.
+    start, end : int
+        Bounds of the message within the buffer.
+    fields : dict
+        Fields of the entity-class by number. Unknown fields are skipped.
+
+    Returns
+    -------
+    array
+        Quadruples of a negated field number, a wire type and bounds of a
+        value. Numbers are negated, so membership of a field is checked
+        with ``in``.
+    """
+    # pylint: disable=too-many-branches
+    index = []
+    position = start
+    try:
+        while position < end:
+            # Most of keys and lengths take a single byte
+            key = buffer[position]
+            position += 1
+            if key > 0x7f:
+                key, position = _decode_varint(buffer, position - 1)
+            wire_type = key & 0x7
+            if wire_type == _LENGTH_DELIMITED:
+                size = buffer[position]
+                position += 1
+                if size > 0x7f:
+                    size, position = _decode_varint(buffer, position - 1)
+                value_start = position
+                position += size
+            elif wire_type == _VARINT:
+                value_start = position
+                while buffer[position] > 0x7f:
+                    position += 1
+                position += 1
+            elif wire_type == _FIXED64:
+                value_start = position
+                position += 8
+            elif wire_type == _FIXED32:
+                value_start = position
+                position += 4
+            else:
+                raise DecodeError('Unsupported wire type %d.' % wire_type)
+
+            field = fields.get(key >> 3)
+            if field is None:
+                continue
+            if field.oneof:
+                # The last member of oneof wins
+                others = {-number for number, other in fields.items()
+                          if other.name in field.oneof}
+                index = [value for quadruple in zip(*[iter(index)] * 4)
+                         if quadruple[0] not in others
+                         for value in quadruple]
+            index += (-field.number, wire_type, value_start, position)
+    except IndexError:
+        raise DecodeError('Truncated message.')
+    if position > end:
+        raise DecodeError('Truncated message.')
+
+    return array('q', index)
+
+
+def _import(spec: str):
+    package, _, name = spec.rpartition('.')
+    try:
+        module = importlib.import_module(package)
+    except ModuleNotFoundError:
+        return None
+
+    return getattr(module, name)
+
+
+def _get_or_make_entity(base: type, descriptor: Descriptor) -> type:
+    """Retrieve entity-class or create a "virtual" one.
+
+    Virtual entities are made for schemas that are defined within other
+    schemas.
+    """
+    entity_cls = _import(descriptor.full_name)
+    if entity_cls is None:
+        entity_cls = _REGISTRY.get(descriptor.full_name)
+    if entity_cls is None:
+        entity_cls = type(
+            descriptor.name,
+            (base,),
+            {'_DESCRIPTOR': descriptor, '__module__': _VIRTUAL_MODULE}
+        )
+        _REGISTRY[descriptor.full_name] = entity_cls
+
+    return entity_cls
+
+
+def _get_or_make_enum(descriptor: EnumDescriptor) -> type:
+    """Retrieve enum-class or create it."""
+    enum_cls = _import(descriptor.full_name)
+    if enum_cls is None:
+        enum_cls = _REGISTRY.get(descriptor.full_name)
+    if enum_cls is None:
+        enum_cls = enum.IntEnum(
+            descriptor.name,
+            {d.name: d.number for d in descriptor.values}
+        )
+        enum_cls.__module__ = _VIRTUAL_MODULE
+        _REGISTRY[descriptor.full_name] = enum_cls
+
+    return enum_cls
+
+
+def _get_or_make_collection(field: '_Field') -> type:
+    """Retrieve collection-class of the field or create it.
+
+    The class is shared by all the entity-classes with the field.
+    """
+    collection_cls = _COLLECTIONS.get(field.descriptor.full_name)
+    if collection_cls is None:
+        collection_cls = _make_collection(field)
+        _COLLECTIONS[field.descriptor.full_name] = collection_cls
+
+    return collection_cls
+
+
+def _make_collection(field: '_Field') -> type:
+    """Create collection-class respecting the type of the field."""
+    # pylint: disable=missing-docstring
+    if field.kind == _ENUM:
+        enum_cls = field.enum
+
+        def check(e):
+            if not isinstance(e, enum_cls):
+                try:
+                    e = enum_cls(e)
+                except ValueError as exc:
+                    raise TypeError(exc)
+            return e
+
+        name = field.descriptor.enum_type.name + 'Collection'
+    elif field.kind == _MESSAGE:
+        sub_entity = field.entity
+
+        def check(e):
+            if not isinstance(e, sub_entity):
+                e = sub_entity(e)
+            return e
+        name = sub_entity.__name__ + 'Collection'
+    else:
+        type_ = field.types
+        name = ''.join(t.__name__.capitalize() + 'Collection'
+                       for t in type_)
+
+        def check(e):
+            if not isinstance(e, type_):
+                try:
+                    e = type_(e)
+                except (ValueError, TypeError) as exc:
+                    raise TypeError(exc)
+            return e
+
+    return type(
+        name,
+        (EntityCollection,),
+        {'CHECK': check, '__module__': _VIRTUAL_MODULE}
+    )
+
+
+class _Field:
+    """Properties of a field of an entity-class computed once.
+
+    Classes of sub-entities, enums and collections are resolved on first
+    use, since they may be defined after the entity-class.
+
+    Parameters
+    ----------
+    owner : type
+        Entity-class of the field, the base of virtual sub-entities.
+    descriptor : FieldDescriptor
+        Descriptor of the field.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = ('name', 'number', 'kind', 'repeated', 'default', 'types',
+                 'oneof', 'wire_type', 'convert', 'to_raw', 'tag',
+                 'descriptor', '_owner', '_entity', '_enum', '_collection')
+
+    def __init__(self, owner: type, descriptor: FieldDescriptor):  # noqa: D107
+        self.name = descriptor.name
+        self.number = descriptor.number
+        self.descriptor = descriptor
+        self.repeated = descriptor.label == descriptor.LABEL_REPEATED
+        self.default = None
+        if descriptor.type == descriptor.TYPE_MESSAGE:
+            self.kind = _MESSAGE
+        else:
+            self.kind = (_ENUM if descriptor.type == descriptor.TYPE_ENUM
+                         else _SCALAR)
+            if not self.repeated:
+                self.default = descriptor.default_value
+        self.types = _TYPE_MAP.get(descriptor.type)
+        self.wire_type, self.convert, self.to_raw = \
+            _WIRE_MAP[descriptor.type]
+        # Repeated numbers are packed as in proto3
+        packed = self.repeated and self.wire_type != _LENGTH_DELIMITED
+        self.tag = _encode_varint(self.number << 3 | (
+            _LENGTH_DELIMITED if packed else self.wire_type
+        ))
+        oneof = descriptor.containing_oneof
+        self.oneof = () if oneof is None else tuple(
+            f.name for f in oneof.fields if f.name != self.name
+        )
+        self._owner = owner
+        self._entity = self._enum = self._collection = None
+
+    @property
+    def entity(self) -> type:
+        """Entity-class of a composite field."""
+        if self._entity is None:
+            self._entity = _get_or_make_entity(self._owner,
+                                               self.descriptor.message_type)
+        return self._entity
+
+    @property
+    def enum(self) -> type:
+        """Enum-class of an enum field."""
+        if self._enum is None:
+            self._enum = _get_or_make_enum(self.descriptor.enum_type)
+        return self._enum
+
+    @property
+    def collection(self) -> type:
+        """Collection-class of a repeated field."""
+        if self._collection is None:
+            self._collection = _get_or_make_collection(self)
+        return self._collection
+
+    def to_enum(self, value: int):
+        """Convert a decoded number to the enum of the field.
+
+        Raises
+        ------
+        google.protobuf.message.DecodeError
+            If the number is not a value of the enum, e.g. it was added to
+            the schema of a newer version.
+        """
+        try:
+            return self.enum(value)  # pylint: disable=not-callable
+        except ValueError:
+            raise DecodeError('Unknown value %d of enum field %s.'
+                              % (value, self.descriptor.full_name))
+
+    def decode(self, buffer: bytes, raw: Sequence):
+        """Decode the value of the field from raw values found by ``_scan``.
+
+        Sub-entities are views over the same buffer. Unknown enum numbers
+        raise ``DecodeError`` as in ``to_enum``.
+        """
+        # pylint: disable=not-callable,too-many-return-statements
+        if len(raw) == 3 and not self.repeated:
+            # A single occurrence is the usual case
+            wire_type, start, end = raw
+            if wire_type == self.wire_type:
+                if self.kind == _MESSAGE:
+                    return self.entity.view(buffer, start, end)
+                value = self.__convert(buffer, start, end)
+                return self.to_enum(value) if self.kind == _ENUM else value
+
+        triples = zip(*[iter(raw)] * 3)
+        if self.kind == _MESSAGE:
+            bounds = [(start, end) for wire_type, start, end in triples
+                      if wire_type == _LENGTH_DELIMITED]
+            view = self.entity.view
+            if self.repeated:
+                return self.collection(view(buffer, start, end)
+                                       for start, end in bounds)
+            if len(bounds) == 1:
+                return view(buffer, *bounds[0])
+            # Occurrences of a composite field are merged
+            return view(b''.join(buffer[start:end] for start, end in bounds))
+
+        values = []
+        for wire_type, start, end in triples:
+            if wire_type == self.wire_type:
+                values.append(self.__convert(buffer, start, end))
+            elif wire_type == _LENGTH_DELIMITED and self.repeated:
+                values.extend(self.__unpack(buffer, start, end))
+        if self.repeated:
+            if self.kind == _ENUM:
+                values = map(self.to_enum, values)
+            return self.collection(values)
+        value = values[-1] if values else self.default
+        return self.to_enum(value) if self.kind == _ENUM else value
+
+    def encode(self, out: bytearray, value) -> None:
+        """Append the value of the field in wire format to ``out``.
+
+        The output is the same as a PB-message serializes: default values
+        of scalar and enum fields are omitted unless they are members of
+        oneof, empty sub-entities are present.
+        """
+        if self.repeated:
+            if not value:
+                return
+            if self.wire_type != _LENGTH_DELIMITED:
+                packed = bytearray()
+                for item in value:
+                    self.__write(packed, item)
+                out += self.tag
+                out += _encode_varint(len(packed))
+                out += packed
+                return
+            for item in value:
+                out += self.tag
+                self.__write(out, item)
+            return
+
+        if not value and self.kind != _MESSAGE and not self.oneof:
+            return
+        out += self.tag
+        self.__write(out, value)
+
+    def __write(self, out: bytearray, value) -> None:
+        """Append a single value without a tag."""
+        if self.kind == _MESSAGE:
+            raw = value.to_protobuf()
+        else:
+            raw = self.to_raw(value)
+            if self.wire_type == _VARINT:
+                out += _encode_varint(raw)
+                return
+            if self.wire_type != _LENGTH_DELIMITED:
+                out += raw
+                return
+        out += _encode_varint(len(raw))
+        out += raw
+
+    def __convert(self, buffer: bytes, start: int, end: int):
+        """Decode a single value."""
+        if self.wire_type == _VARINT:
+            return self.convert(_decode_varint(buffer, start)[0])
+        return self.convert(buffer[start:end])
+
+    def __unpack(self, buffer: bytes, start: int, end: int) -> Iterable:
+        """Decode values of a packed repeated field."""
+        convert = self.convert
+        if self.wire_type == _VARINT:
+            while start < end:
+                value, start = _decode_varint(buffer, start)
+                yield convert(value)
+        else:
+            size = 8 if self.wire_type == _FIXED64 else 4
+            for position in range(start, end, size):
+                yield convert(buffer[position:position + size])
+
+
 class _EntityMeta(ABCMeta):
     """A metaclass for ``Entity`` for various auxiliary purposes.
 
@@ -111,6 +577,10 @@ class _EntityMeta(ABCMeta):
     -----
     - Assigns ``_MESSAGE_CLASS`` class-attribute with a PB-message class
       generated by the original Protobuf Python plugin.
+    - Assigns ``_FIELDS`` and ``_FIELDS_BY_NUMBER`` class-attributes with
+      tables of fields by name and by number, so accessing a field doesn't
+      inspect the descriptor, and ``_FIELDS_IN_ORDER`` with fields sorted
+      by number, the order they are serialized in.
     """
 
     def __new__(mcs, name, bases, attributes, **kwargs):  # noqa: D102
@@ -121,10 +591,18 @@ class _EntityMeta(ABCMeta):
 
         type_ = super().__new__(mcs, name, bases, attributes, **kwargs)
 
-        return type_
-
+        if descriptor is not None:
+            fields = {field.name: _Field(type_, field)
+                      for field in descriptor.fields}
+            setattr(type_, '_FIELDS', fields)
+            setattr(type_, '_FIELDS_BY_NUMBER', {
+                field.number: field for field in fields.values()
+            })
+            setattr(type_, '_FIELDS_IN_ORDER', tuple(
+                sorted(fields.values(), key=lambda field: field.number)
+            ))
 
-_REGISTRY = {}
+        return type_
 
 
 class Entity(collections.abc.MutableMapping, metaclass=_EntityMeta):
@@ -212,6 +690,15 @@ class Entity(collections.abc.MutableMapping, metaclass=_EntityMeta):
 
     _DESCRIPTOR = None
     _MESSAGE_CLASS = None
+    _FIELDS = {}
+    _FIELDS_BY_NUMBER = {}
+    _FIELDS_IN_ORDER = ()
+
+    # Wire format buffer of a view, bounds of the message within it and
+    # the index of raw values of fields made by _scan
+    __buffer = None
+    __start = __end = 0
+    __index = None
 
     __FIELD_TYPE_ERROR_MESSAGE = 'Wrong value type.'
 
@@ -220,152 +707,99 @@ class Entity(collections.abc.MutableMapping, metaclass=_EntityMeta):
         if args or kwargs:
             self.update(dict(*args, **kwargs))
 
-    @staticmethod
-    def __is_composite_field(descriptor: FieldDescriptor) -> bool:
-        return descriptor.type == descriptor.TYPE_MESSAGE
-
-    @staticmethod
-    def __is_enum_field(descriptor: FieldDescriptor) -> bool:
-        return descriptor.type == descriptor.TYPE_ENUM
+    @classmethod
+    def view(cls, buffer: bytes, start: int = 0,
+             end: int = None) -> 'Entity':
+        """Make a lazy view over an entity in Protobuf wire format.
+
+        The buffer isn't copied. A field is decoded when it's accessed for
+        the first time, composite fields become views over the same buffer.
+        Writing to the view decodes the rest of the fields, so it's a regular
+        entity afterwards.
+
+        Parameters
+        ----------
+        buffer : bytes
+            Any bytes-like object with a message of the entity-class.
+        start, end : int, optional
+            Bounds of the message within the buffer, the whole buffer by
+            default.
+
+        Returns
+        -------
+        Entity
+            Entity of the class which behaves like a regular one.
+
+        Raises
+        ------
+        google.protobuf.message.DecodeError
+            On access to a field if the buffer is malformed.
+
+        Examples
+        --------
+        >>> from onedrive_client.entities.common import LocalItem
+        >>> buffer = LocalItem({'path': '/foo'}).to_protobuf()
+        >>> LocalItem.view(buffer)['path']
+        '/foo'
+        """
+        # pylint: disable=protected-access
+        entity = cls()
+        entity.__buffer = buffer
+        entity.__start = start
+        entity.__end = len(buffer) if end is None else end
+        return entity
 
-    @staticmethod
-    def __is_repeated_field(descriptor: FieldDescriptor) -> bool:
-        return descriptor.label == descriptor.LABEL_REPEATED
+    def __get_index(self) -> array:
+        """Index raw values of a view on first use."""
+        index = self.__index
+        if index is None:
+            index = self.__index = _scan(self.__buffer, self.__start,
+                                         self.__end, self._FIELDS_BY_NUMBER)
+        return index
+
+    def __get_raw(self, field: _Field) -> array:
+        """Collect triples of raw values of a field, None if it's absent."""
+        index = self.__index
+        if index is None:
+            index = self.__get_index()
+        key = -field.number
+        count = index.count(key)
+        if not count:
+            return None
+        position = index.index(key)
+        if count == 1:
+            return index[position + 1:position + 4]
+        raw = array('q')
+        for position in range(position, len(index), 4):
+            if index[position] == key:
+                raw += index[position + 1:position + 4]
+        return raw
+
+    def __promote(self):
+        """Decode the rest of the fields of a view."""
+        data = self.__data
+        buffer = self.__buffer
+        index = self.__get_index()
+        raws = {}
+        for position in range(0, len(index), 4):
+            raws.setdefault(-index[position], []).extend(
+                index[position + 1:position + 4]
+            )
+        for number, raw in raws.items():
+            field = self._FIELDS_BY_NUMBER[number]
+            if field.name not in data:
+                data[field.name] = field.decode(buffer, raw)
+        self.__buffer = self.__index = None
 
     @classmethod
-    def __get_field_descriptor(cls, name: str) -> FieldDescriptor:
+    def __get_field(cls, name: str) -> _Field:
         try:
-            return cls._DESCRIPTOR.fields_by_name[name]
+            return cls._FIELDS[name]
         except KeyError:
             raise TypeError('"%s" doesn\'t have the field "%s".' % (
                 cls.__name__, name
             ))
 
-    @staticmethod
-    def __check_enum(enum_descriptor: EnumDescriptor, value: int) -> bool:
-        return value in enum_descriptor.values_by_number
-
-    @staticmethod
-    def __import(spec):
-        package, _, name = spec.rpartition('.')
-        try:
-            module = importlib.import_module(package)
-        except ModuleNotFoundError:
-            return None
-
-        return getattr(module, name)
-
-    @classmethod
-    def __get_entity(cls, message_descriptor: Descriptor) -> type:
-        return cls.__import(message_descriptor.full_name)
-
-    __VIRTUAL_MODULE = __name__.rsplit('.', 1)[0] + '.virtual'
-
-    @classmethod
-    def __make_entity(cls, message_descriptor: Descriptor) -> type:
-        """Make a "virtual" entity.
-
-        Used for schemas that are defined within other schemas.
-        """
-        entity_cls = _REGISTRY.get(message_descriptor.full_name)
-        if entity_cls is None:
-            entity_cls = type(
-                message_descriptor.name,
-                (cls,),
-                {'_DESCRIPTOR': message_descriptor,
-                 '__module__': cls.__VIRTUAL_MODULE}
-            )
-            _REGISTRY[message_descriptor.full_name] = entity_cls
-
-        return entity_cls
-
-    @classmethod
-    def __get_or_make_entity(cls, descriptor: Descriptor) -> type:
-        """Retrieve entity-class or create it."""
-        entity = cls.__get_entity(descriptor)
-        if entity is None:
-            entity = cls.__make_entity(descriptor)
-
-        return entity
-
-    @classmethod
-    def __get_enum(cls, enum_descriptor: EnumDescriptor) -> type:
-        return cls.__import(enum_descriptor.full_name)
-
-    @classmethod
-    def __make_enum(cls, enum_descriptor: EnumDescriptor) -> type:
-        enum_cls = _REGISTRY.get(enum_descriptor.full_name)
-        if enum_cls is None:
-            enum_cls = enum.IntEnum(
-                enum_descriptor.name,
-                {d.name: d.number for d in enum_descriptor.values}
-            )
-            enum_cls.__module__ = cls.__VIRTUAL_MODULE
-            _REGISTRY[enum_descriptor.full_name] = enum_cls
-
-        return enum_cls
-
-    @classmethod
-    def __get_or_make_enum(cls, enum_descriptor: EnumDescriptor) -> type:
-        """Retrieve enum-class or create it."""
-        enum_cls = cls.__get_enum(enum_descriptor)
-        if enum_cls is None:
-            enum_cls = cls.__make_enum(enum_descriptor)
-        return enum_cls
-
-    def __make_collection(
-        self,
-        field_descriptor: FieldDescriptor
-    ) -> type:
-        """Create collection-class respecting the type of the field."""
-        # pylint: disable=missing-docstring
-        if self.__is_enum_field(field_descriptor):
-            enum_cls = self.__get_or_make_enum(field_descriptor.enum_type)
-
-            def check(e):
-                if not isinstance(e, enum_cls):
-                    try:
-                        e = enum_cls(e)
-                    except ValueError as exc:
-                        raise TypeError(exc)
-                return e
-
-            name = field_descriptor.enum_type.name + 'Collection'
-        elif self.__is_composite_field(field_descriptor):
-            sub_entity = self.__get_or_make_entity(
-                field_descriptor.message_type
-            )
-
-            def check(e):
-                if not isinstance(e, sub_entity):
-                    e = sub_entity(e)
-                return e
-            name = sub_entity.__name__ + 'Collection'
-        else:
-            type_ = self.__get_regular_field_types(field_descriptor)
-            name = ''.join(t.__name__.capitalize() + 'Collection'
-                           for t in type_)
-
-            def check(e):
-                if not isinstance(e, type_):
-                    try:
-                        e = type_(e)
-                    except (ValueError, TypeError) as exc:
-                        raise TypeError(exc)
-                return e
-
-        collection = type(
-            name,
-            (EntityCollection,),
-            {'CHECK': check,
-             '__module__': self.__VIRTUAL_MODULE}
-        )
-        return collection
-
-    @staticmethod
-    def __get_regular_field_types(descriptor):
-        return _TYPE_MAP[descriptor.type]
-
     def __getitem__(self, item):
         """Retrieve an item respecting type-checking rules.
 
@@ -374,26 +808,28 @@ class Entity(collections.abc.MutableMapping, metaclass=_EntityMeta):
         - If a complex value is not set - raise ``KeyError``.
         - If a field is set - return it's value.
         """
-        field_descriptor = self.__get_field_descriptor(item)
-
-        if item in self.__data:
-            return self.__data[item]
-        if self.__is_enum_field(field_descriptor):
-            enum_cls = self.__get_or_make_enum(field_descriptor.enum_type)
-            value = self.__data[item] = enum_cls(
-                field_descriptor.default_value
-            )
-            return value
-        elif self.__is_repeated_field(field_descriptor):
-            collection_cls = self.__make_collection(field_descriptor)
-            value = self.__data[item] = collection_cls()
-            return value
-        elif not self.__is_composite_field(field_descriptor):
-            value = field_descriptor.default_value
-            self.__data[item] = value
+        value = self.__data.get(item, _MISSING)
+        if value is not _MISSING:
             return value
-        else:
+
+        field = self.__get_field(item)
+        if self.__buffer is not None:
+            raw = self.__get_raw(field)
+            if raw is not None:
+                value = self.__data[item] = field.decode(self.__buffer, raw)
+                return value
+        if field.repeated:
+            value = field.collection()
+        elif field.kind == _MESSAGE:
             raise KeyError(item)
+        elif field.kind == _ENUM:
+            value = field.enum(field.default)
+        else:
+            value = field.default
+        if not field.oneof:
+            # Members of oneof are present only once they are set
+            self.__data[item] = value
+        return value
 
     def __setitem__(self, key, value):
         """Set item and apply type-checking rules.
@@ -402,77 +838,72 @@ class Entity(collections.abc.MutableMapping, metaclass=_EntityMeta):
           if the type doesn't match.
         - Don't allow multiple fields within oneof group to be set.
         """
-        field_descriptor = self.__get_field_descriptor(key)
-
-        oneof = field_descriptor.containing_oneof
-        if oneof is not None:
-            try:
-                next(f.name for f in oneof.fields
-                     if f.name != key and f.name in self)
-            except StopIteration:
-                pass
-            else:
-                raise TypeError(
-                    'Can\'t set one of the OneOf fields '
-                    'while other is present.'
-                )
-        if self.__is_repeated_field(field_descriptor):
-            collection_cls = self.__make_collection(field_descriptor)
-            items = collection_cls(value)
-            self.__data[key] = items
-            return
-        elif self.__is_composite_field(field_descriptor):
-            sub_entity_cls = self.__get_or_make_entity(
-                field_descriptor.message_type
+        field = self.__get_field(key)
+        if self.__buffer is not None:
+            self.__promote()
+
+        if field.oneof and any(name in self.__data for name in field.oneof):
+            raise TypeError(
+                'Can\'t set one of the OneOf fields '
+                'while other is present.'
             )
+        if field.repeated:
+            value = field.collection(value)
+        elif field.kind == _SCALAR:
+            if not isinstance(value, field.types):
+                raise TypeError(self.__FIELD_TYPE_ERROR_MESSAGE)
+        elif field.kind == _MESSAGE:
+            sub_entity_cls = field.entity
             if not isinstance(value, sub_entity_cls):
                 value = sub_entity_cls(value)
-            self.__data[key] = value
-            return
-        elif self.__is_enum_field(field_descriptor):
-            enum_cls = self.__get_or_make_enum(field_descriptor.enum_type)
+        else:
+            enum_cls = field.enum
             if not isinstance(value, enum_cls):
                 try:
                     value = enum_cls(value)
                 except ValueError as exc:
                     raise TypeError(exc)
-            self.__data[key] = value
-            return
-        else:
-            type_ = self.__get_regular_field_types(field_descriptor)
-            if not isinstance(value, type_):
-                raise TypeError(self.__FIELD_TYPE_ERROR_MESSAGE)
-            self.__data[key] = value
+        self.__data[key] = value
 
     def __delitem__(self, key):
         """Delete item respecting field types.
 
-        - Only composite fields could be unset.
+        - Only composite fields and members of oneof could be unset.
         - Repeated fields are cleared.
         - Primitive and enum fields are set to a default value.
         """
-        field_descriptor = self.__get_field_descriptor(key)
+        field = self.__get_field(key)
+        if self.__buffer is not None:
+            self.__promote()
 
+        if field.repeated:
+            self[key].clear()
+            return
         try:
-            if self.__is_composite_field(field_descriptor):
-                del self[key]
-                return
-            elif self.__is_repeated_field(field_descriptor):
-                self[key].clear()
-                return
-
             del self.__data[key]
         except KeyError:
-            raise KeyError(key)
+            if field.kind == _MESSAGE or field.oneof:
+                raise KeyError(key)
+
+    def __contains__(self, key):
+        """Check if the field is present."""
+        if key in self.__data:
+            return True
+        field = self.__get_field(key)
+        if self.__buffer is not None and -field.number in self.__get_index():
+            return True
+
+        return field.repeated or not (field.kind == _MESSAGE or field.oneof)
 
     def __iter__(self):
         """Iterate over available fields."""
-        for field, descriptor in self._DESCRIPTOR.fields_by_name.items():
-            if (self.__is_repeated_field(descriptor) or
-                self.__is_enum_field(descriptor) or
-                (not self.__is_composite_field(descriptor) or
-                 descriptor.name in self.__data)):
-                yield field
+        data = self.__data
+        raw = set(self.__get_index()[::4]) if self.__buffer is not None \
+            else ()
+        for name, field in self._FIELDS.items():
+            if name in data or -field.number in raw or field.repeated or \
+                    not (field.kind == _MESSAGE or field.oneof):
+                yield name
 
     def __len__(self):
         """Count the keys."""
@@ -488,10 +919,111 @@ class Entity(collections.abc.MutableMapping, metaclass=_EntityMeta):
             ', '.join(map(lambda e: ': '.join(map(repr, e)), self.items()))
         )
 
-    def to_protobuf(self):
+    def to_message(self, message: Message = None) -> Message:
+        """Fill a PB-message with the fields of the entity.
+
+        Parameters
+        ----------
+        message : Message, optional
+            Message to reuse, it's cleared first. A new one is made if it's
+            not given.
+
+        Returns
+        -------
+        Message
+            Message of ``_MESSAGE_CLASS`` with the fields that are set.
+        """
+        if message is None:
+            message = self._MESSAGE_CLASS()  # pylint: disable=not-callable
+        else:
+            message.Clear()
+        if self.__buffer is not None:
+            self.__promote()
+
+        for name, value in self.__data.items():
+            field = self._FIELDS[name]
+            if field.repeated:
+                if field.kind == _MESSAGE:
+                    container = getattr(message, name)
+                    for item in value:
+                        item.to_message(container.add())
+                else:
+                    getattr(message, name).extend(value)
+            elif field.kind == _MESSAGE:
+                sub_message = getattr(message, name)
+                # Empty sub-entities are present as well
+                sub_message.SetInParent()
+                value.to_message(sub_message)
+            else:
+                setattr(message, name, value)
+        return message
+
+    @classmethod
+    def from_message(cls, message: Message) -> 'Entity':
+        """Make an entity from a PB-message.
+
+        Values are copied, so the message may be reused afterwards.
+
+        Parameters
+        ----------
+        message : Message
+            Message with the schema of the entity-class.
+
+        Returns
+        -------
+        Entity
+
+        Raises
+        ------
+        google.protobuf.message.DecodeError
+            If an enum field has a number unknown to its enum.
+        """
+        entity = cls()
+        data = entity.__data  # pylint: disable=protected-access
+        fields = cls._FIELDS
+        for descriptor, value in message.ListFields():
+            field = fields[descriptor.name]
+            if field.repeated:
+                if field.kind == _MESSAGE:
+                    entity_cls = field.entity
+                    value = map(entity_cls.from_message, value)
+                elif field.kind == _ENUM:
+                    value = map(field.to_enum, value)
+                value = field.collection(value)
+            elif field.kind == _MESSAGE:
+                value = field.entity.from_message(value)
+            elif field.kind == _ENUM:
+                value = field.to_enum(value)
+            data[descriptor.name] = value
+        return entity
+
+    def to_protobuf(self) -> bytes:
         """Serialize to Protobuf wire format."""
-        raise NotImplementedError
+        if self.__buffer is not None:
+            if not self.__data:
+                # Untouched view
+                return bytes(self.__buffer[self.__start:self.__end])
+            self.__promote()
+        if not _PURE_PYTHON:
+            return self.to_message().SerializeToString()
+
+        out = bytearray()
+        data = self.__data
+        for field in self._FIELDS_IN_ORDER:
+            value = data.get(field.name, _MISSING)
+            if value is not _MISSING:
+                field.encode(out, value)
+        return bytes(out)
 
-    def from_protobuf(self, input_bytes):
-        """Deserialize to Protobuf wire format."""
-        raise NotImplementedError
+    @classmethod
+    def from_protobuf(cls, input_bytes: bytes) -> 'Entity':
+        """Deserialize from Protobuf wire format.
+
+        Raises
+        ------
+        google.protobuf.message.DecodeError
+            If the input is not a valid message of the entity-class.
+        """
+        message = cls._MESSAGE_CLASS()  # pylint: disable=not-callable
+        message.ParseFromString(input_bytes)
+        return cls.from_message(message)
@@ -0,0 +1,538 @@
+"""Provides ``EntityBatch`` - columnar storage of many entities of a class.
+
+Every scalar field, nested ones included, is a NumPy array, bytes and
+string fields are ``BytesColumn``-s - offset-encoded buffers. Columns are
+named by dotted paths of the fields, e.g. ``'metadata.size'``, and
+composite fields have boolean columns of their presence.
+
+Examples
+--------
+>>> from onedrive_client.entities.common import LocalItem
+>>> batch = EntityBatch.from_entities(LocalItem, [
+...     LocalItem({'path': '/foo', 'metadata': {'size': 10}}),
+...     LocalItem({'path': '/bar'}),
+... ])
+>>> batch['metadata.size'].tolist()
+[10, 0]
+>>> (batch['path'] == '/bar').tolist()
+[False, True]
+>>> batch[batch['metadata']].to_entities()
+[LocalItem({'path': '/foo',
+            'metadata': LocalItemMetadata({'size': 10, 'modified': 0})})]
+"""
+import collections
+from typing import Iterable, List, Tuple, Union
+
+from google.protobuf.descriptor import FieldDescriptor
+import numpy as np
+
+from .base import _MESSAGE, Entity
+
+_DTYPE_MAP = {
+    FieldDescriptor.TYPE_DOUBLE: np.dtype('float64'),
+    FieldDescriptor.TYPE_FLOAT: np.dtype('float32'),
+    FieldDescriptor.TYPE_INT64: np.dtype('int64'),
+    FieldDescriptor.TYPE_UINT64: np.dtype('uint64'),
+    FieldDescriptor.TYPE_INT32: np.dtype('int32'),
+    FieldDescriptor.TYPE_FIXED64: np.dtype('uint64'),
+    FieldDescriptor.TYPE_FIXED32: np.dtype('uint32'),
+    FieldDescriptor.TYPE_BOOL: np.dtype('bool'),
+    FieldDescriptor.TYPE_STRING: str,
+    FieldDescriptor.TYPE_BYTES: bytes,
+    FieldDescriptor.TYPE_UINT32: np.dtype('uint32'),
+    FieldDescriptor.TYPE_ENUM: np.dtype('int32'),
+    FieldDescriptor.TYPE_SFIXED32: np.dtype('int32'),
+    FieldDescriptor.TYPE_SFIXED64: np.dtype('int64'),
+    FieldDescriptor.TYPE_SINT32: np.dtype('int32'),
+    FieldDescriptor.TYPE_SINT64: np.dtype('int64'),
+}
+
+# Column of a field: dotted name, path of field names and dtype, which is
+# ``bytes`` or ``str`` for ``BytesColumn``-s and ``None`` for presence of
+# composite fields
+_Column = collections.namedtuple('_Column', 'name, path, dtype')
+
+_LAYOUTS = {}
+
+_INT64 = np.dtype('int64')
+_UINT64 = np.dtype('uint64')
+_INT64_MAX = _UINT64.type(np.iinfo(_INT64).max)
+# Odd multiplier of the polynomial hashes of ``BytesColumn`` values
+_HASH_MULTIPLIER = _UINT64.type(0x100000001b3)
+
+
+def _layout(entity_cls: type, prefix: tuple = ()) -> List[_Column]:
+    """Columns of the entity-class, parents go before their fields."""
+    # pylint: disable=protected-access
+    if not prefix and entity_cls in _LAYOUTS:
+        return _LAYOUTS[entity_cls]
+
+    columns = []
+    for name, field in entity_cls._FIELDS.items():
+        path = prefix + (name,)
+        dotted = '.'.join(path)
+        if field.repeated or field.oneof:
+            raise TypeError(
+                'Field "%s" of "%s" can\'t be stored in columns.' % (
+                    dotted, entity_cls.__name__
+                )
+            )
+        if field.kind == _MESSAGE:
+            columns.append(_Column(dotted, path, None))
+            columns.extend(_layout(field.entity, path))
+        else:
+            columns.append(_Column(dotted, path,
+                                   _DTYPE_MAP[field.descriptor.type]))
+
+    if not prefix:
+        _LAYOUTS[entity_cls] = columns
+    return columns
+
+
+def _gather(offsets: np.ndarray, rows: np.ndarray) -> tuple:
+    """Positions of bytes of the rows in an offset-encoded buffer.
+
+    Returns offsets of the gathered rows and the positions.
+    """
+    lengths = (offsets[1:] - offsets[:-1])[rows]
+    new_offsets = np.zeros(len(lengths) + 1, np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    positions = np.repeat(offsets[:-1][rows] - new_offsets[:-1], lengths) + \
+        np.arange(new_offsets[-1], dtype=np.int64)
+    return new_offsets, positions
+
+
+def _join(left: np.ndarray, right: np.ndarray) -> tuple:
+    """Indices of pairs of equal keys - an inner join."""
+    if left.dtype.kind + right.dtype.kind in ('iu', 'ui') and \
+            np.result_type(left, right).kind == 'f':
+        return _join_signed(left, right)
+
+    _, codes = np.unique(np.concatenate([left, right]), return_inverse=True)
+    left_codes, right_codes = codes[:len(left)], codes[len(left):]
+
+    order = np.argsort(right_codes, kind='mergesort')
+    sorted_codes = right_codes[order]
+    low = np.searchsorted(sorted_codes, left_codes, 'left')
+    counts = np.searchsorted(sorted_codes, left_codes, 'right') - low
+
+    left_indices = np.repeat(np.arange(len(left)), counts)
+    # Every left key is paired with the range of equal right keys
+    starts = np.cumsum(counts) - counts
+    positions = np.repeat(low - starts, counts) + \
+        np.arange(counts.sum(), dtype=np.int64)
+    return left_indices, order[positions]
+
+
+def _join_signed(left: np.ndarray, right: np.ndarray) -> tuple:
+    """Inner join of signed keys with unsigned ones of 64 bits.
+
+    Such keys have no common integer type and float64 loses precision.
+    Unsigned keys beyond int64 can't be equal to signed ones, so the others
+    are joined as int64.
+    """
+    left_rows, right_rows = _signed_rows(left), _signed_rows(right)
+    left_indices, right_indices = _join(left[left_rows].astype(_INT64),
+                                        right[right_rows].astype(_INT64))
+    return left_rows[left_indices], right_rows[right_indices]
+
+
+def _signed_rows(keys: np.ndarray) -> np.ndarray:
+    """Indices of integer keys which fit into int64."""
+    if keys.dtype.kind == 'u':
+        return np.flatnonzero(keys <= _INT64_MAX)
+    return np.arange(len(keys))
+
+
+class BytesColumn:
+    """Column of bytes or strings in a single offset-encoded buffer.
+
+    Values of the column are ``data[offsets[i]:offsets[i + 1]]``, strings
+    are stored encoded as UTF-8.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Contents of all the values, ``uint8``.
+    offsets : np.ndarray
+        Bounds of the values within the data, ``int64``, starts from 0.
+    text : bool
+        Whether values are strings.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray,
+                 text: bool = False):  # noqa: D107
+        self.data = data
+        self.offsets = offsets
+        self.text = text
+
+    @classmethod
+    def from_values(cls, values: Iterable, text: bool = False):
+        """Make a column of the values.
+
+        Parameters
+        ----------
+        values : Iterable
+            Bytes or strings.
+        text : bool
+            Whether values are strings.
+
+        Returns
+        -------
+        BytesColumn
+        """
+        if text:
+            values = [value.encode('utf-8') for value in values]
+        else:
+            values = list(values)
+        offsets = np.zeros(len(values) + 1, np.int64)
+        np.cumsum(np.fromiter(map(len, values), np.int64, len(values)),
+                  out=offsets[1:])
+        data = np.frombuffer(b''.join(values), np.uint8)
+        return cls(data, offsets, text)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Lengths of the values in bytes."""
+        return self.offsets[1:] - self.offsets[:-1]
+
+    def __len__(self):
+        """Count the values."""
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        """Retrieve a value or a column of the selected values.
+
+        The index is an integer, a boolean mask or an array of indices.
+        """
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            value = self.data[self.offsets[index]:
+                              self.offsets[index + 1]].tobytes()
+            return value.decode('utf-8') if self.text else value
+        return self.take(index)
+
+    def __iter__(self):
+        """Iterate over the values."""
+        return iter(self.tolist())
+
+    def __eq__(self, other) -> np.ndarray:
+        """Compare element-wise to a value or a column of the same length."""
+        if isinstance(other, BytesColumn):
+            return self.__equals_column(other)
+        if isinstance(other, str):
+            other = other.encode('utf-8')
+        return self.__equals_value(other)
+
+    def __ne__(self, other) -> np.ndarray:
+        """Compare element-wise to a value or a column of the same length."""
+        return ~self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        """Represent as a string."""
+        return '%s(%r)' % (self.__class__.__name__, self.tolist())
+
+    def take(self, indices) -> 'BytesColumn':
+        """Make a column of the selected values.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            A boolean mask or indices of the values.
+
+        Returns
+        -------
+        BytesColumn
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == np.bool_:
+            indices = np.flatnonzero(indices)
+        offsets, positions = _gather(self.offsets, indices)
+        return BytesColumn(self.data[positions], offsets, self.text)
+
+    def tolist(self) -> list:
+        """Convert to a list of bytes or strings."""
+        buffer = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        values = [buffer[start:end]
+                  for start, end in zip(offsets[:-1], offsets[1:])]
+        if self.text:
+            return [value.decode('utf-8') for value in values]
+        return values
+
+    def hashes(self) -> np.ndarray:
+        """Make 64-bit hashes of the values.
+
+        Equal values have equal hashes, different ones rarely do, so
+        values with equal hashes are to be compared. Hashes take 8 bytes
+        per value and are made with 8 bytes per byte of the values.
+
+        Returns
+        -------
+        np.ndarray
+            Array of ``uint64``.
+        """
+        lengths = self.lengths
+        total = int(self.offsets[-1])
+        width = int(lengths.max()) if lengths.size else 0
+        # Powers of the multiplier wrap around like the hashes
+        powers = np.full(width, _HASH_MULTIPLIER, _UINT64)
+        powers[:1] = 1
+        np.cumprod(powers, out=powers)
+
+        # Every byte is multiplied by the power of its distance from the
+        # end of its value
+        ends = np.repeat(self.offsets[1:], lengths)
+        terms = self.data[:total].astype(_UINT64)
+        terms *= powers[ends - np.arange(1, total + 1)]
+
+        result = lengths.astype(_UINT64) * _HASH_MULTIPLIER
+        rows = np.flatnonzero(lengths)
+        if rows.size:
+            result[rows] += np.add.reduceat(terms, self.offsets[:-1][rows])
+        return _mix(result)
+
+    def __equals_value(self, value: bytes) -> np.ndarray:
+        result = self.lengths == len(value)
+        rows = np.flatnonzero(result)
+        if rows.size and value:
+            _, positions = _gather(self.offsets, rows)
+            contents = self.data[positions].reshape(len(rows), len(value))
+            result[rows] = (contents == np.frombuffer(value, np.uint8)).all(1)
+        return result
+
+    def __equals_column(self, other: 'BytesColumn') -> np.ndarray:
+        if len(self) != len(other):
+            raise ValueError('Columns differ in length.')
+        lengths = self.lengths
+        result = lengths == other.lengths
+        rows = np.flatnonzero(result & (lengths > 0))
+        if rows.size:
+            offsets, positions = _gather(self.offsets, rows)
+            _, other_positions = _gather(other.offsets, rows)
+            differences = self.data[positions] != other.data[other_positions]
+            differs = np.add.reduceat(differences, offsets[:-1]) > 0
+            result[rows[differs]] = False
+        return result
+
+
+class EntityBatch:
+    """Columnar storage of entities of an entity-class.
+
+    The columns are made from the schema of the entity-class. Scalar
+    fields are NumPy arrays, so they can be filtered and compared at
+    once, bytes and string fields are ``BytesColumn``-s. Fields of absent
+    composite fields have default values.
+
+    Repeated fields and members of oneof can't be stored in columns.
+
+    Parameters
+    ----------
+    entity_cls : type
+        Entity-class of the entities.
+    columns : dict
+        Columns by dotted names of the fields.
+
+    Examples
+    --------
+    >>> from onedrive_client.entities.onedrive import Drive
+    >>> batch = EntityBatch.from_entities(Drive, [
+    ...     Drive({'drive_type': 1}), Drive({'base_item': {'name': 'd'}})
+    ... ])
+    >>> sorted(batch.columns)  # doctest: +NORMALIZE_WHITESPACE
+    ['base_item', 'base_item.c_tag', 'base_item.e_tag', 'base_item.id',
+     'base_item.last_modified_date_time', 'base_item.name', 'drive_type']
+    >>> (batch['drive_type'] == 1).tolist()
+    [True, False]
+    """
+
+    def __init__(self, entity_cls: type, columns: dict):  # noqa: D107
+        self.entity_cls = entity_cls
+        self.columns = columns
+        self._layout = _layout(entity_cls)
+
+    @classmethod
+    def from_entities(cls, entity_cls: type,
+                      entities: Iterable[Entity]) -> 'EntityBatch':
+        """Store the entities in columns.
+
+        Parameters
+        ----------
+        entity_cls : type
+            Entity-class of the entities.
+        entities : Iterable[Entity]
+            Entities or dicts accepted by the entity-class.
+
+        Returns
+        -------
+        EntityBatch
+
+        Raises
+        ------
+        TypeError
+            If the entity-class has repeated fields or oneof.
+        """
+        layout = _layout(entity_cls)
+        values = [[] for _ in layout]
+        for entity in entities:
+            if not isinstance(entity, entity_cls):
+                entity = entity_cls(entity)
+            # Sub-entities by path, missing ones are None
+            nodes = {(): entity}
+            for column, column_values in zip(layout, values):
+                parent = nodes[column.path[:-1]]
+                name = column.path[-1]
+                if column.dtype is None:
+                    present = parent is not None and name in parent
+                    nodes[column.path] = parent[name] if present else None
+                    column_values.append(present)
+                elif parent is None:
+                    column_values.append(_default(column))
+                else:
+                    column_values.append(parent[name])
+
+        columns = {}
+        for column, column_values in zip(layout, values):
+            if column.dtype in (bytes, str):
+                columns[column.name] = BytesColumn.from_values(
+                    column_values, text=column.dtype is str
+                )
+            else:
+                columns[column.name] = np.array(
+                    column_values, column.dtype or np.bool_
+                )
+        return cls(entity_cls, columns)
+
+    def to_entities(self) -> List[Entity]:
+        """Make an entity of every row."""
+        layout = self._layout
+        values = [self.columns[column.name].tolist() for column in layout]
+        entities = []
+        for row in zip(*values):
+            data = {}
+            # Dicts of present composite fields by path
+            nodes = {(): data}
+            for column, value in zip(layout, row):
+                parent = nodes.get(column.path[:-1])
+                if parent is None:
+                    continue
+                if column.dtype is None:
+                    if value:
+                        nodes[column.path] = parent[column.path[-1]] = {}
+                else:
+                    parent[column.path[-1]] = value
+            entities.append(self.entity_cls(data))
+        return entities
+
+    def __len__(self):
+        """Count the entities."""
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, key: Union[str, np.ndarray]):
+        """Retrieve a column by name or a batch of the selected rows.
+
+        Rows are selected by a boolean mask or an array of indices.
+        """
+        if isinstance(key, str):
+            return self.columns[key]
+        return self.take(key)
+
+    def __repr__(self):
+        """Represent as a string."""
+        return '<%s of %d %s>' % (self.__class__.__name__, len(self),
+                                  self.entity_cls.__name__)
+
+    def take(self, indices) -> 'EntityBatch':
+        """Make a batch of the selected rows.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            A boolean mask or indices of the rows.
+
+        Returns
+        -------
+        EntityBatch
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == np.bool_:
+            indices = np.flatnonzero(indices)
+        return EntityBatch(self.entity_cls, {
+            name: column[indices] for name, column in self.columns.items()
+        })
+
+    def join(self, other: 'EntityBatch', on: str,
+             other_on: str = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Pair rows of the batches with equal keys - an inner join.
+
+        Parameters
+        ----------
+        other : EntityBatch
+            Batch to join with, may be of another entity-class.
+        on : str
+            Name of the key column of the batch.
+        other_on : str, optional
+            Name of the key column of the other batch, same as ``on`` by
+            default.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Indices of the paired rows of the batch and of the other one.
+
+        Raises
+        ------
+        TypeError
+            If one key column is of bytes or strings and the other isn't.
+
+        Examples
+        --------
+        >>> from onedrive_client.entities.common import LocalItem
+        >>> from onedrive_client.entities.onedrive import Item
+        >>> local = EntityBatch.from_entities(LocalItem, [
+        ...     {'path': 'a'}, {'path': 'b'}
+        ... ])
+        >>> remote = EntityBatch.from_entities(Item, [
+        ...     {'base_item': {'name': 'b'}}, {'base_item': {'name': 'c'}}
+        ... ])
+        >>> [indices.tolist()
+        ...  for indices in local.join(remote, 'path', 'base_item.name')]
+        [[1], [0]]
+        """
+        left = self.columns[on]
+        right = other.columns[other_on or on]
+        if isinstance(left, BytesColumn) != isinstance(right, BytesColumn):
+            raise TypeError('Key columns are of different types.')
+        if not isinstance(left, BytesColumn):
+            return _join(left, right)
+
+        left_indices, right_indices = _join(left.hashes(), right.hashes())
+        # Values of different keys may have equal hashes
+        equal = left.take(left_indices) == right.take(right_indices)
+        return left_indices[equal], right_indices[equal]
+
+
+def _default(column: _Column):
+    """Value of a field of an absent composite field."""
+    if column.dtype is bytes:
+        return b''
+    if column.dtype is str:
+        return ''
+    return 0
+
+
+def _mix(hashes: np.ndarray) -> np.ndarray:
+    """Scramble bits of ``uint64`` hashes in place, the splitmix64 finalizer.
+
+    Bits of the hashes of similar values are spread over the whole word.
+    """
+    uint64 = _UINT64.type
+    hashes ^= hashes >> uint64(30)
+    hashes *= uint64(0xbf58476d1ce4e5b9)
+    hashes ^= hashes >> uint64(27)
+    hashes *= uint64(0x94d049bb133111eb)
+    hashes ^= hashes >> uint64(31)
+    return hashes
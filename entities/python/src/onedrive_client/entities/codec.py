@@ -0,0 +1,116 @@
+"""Streaming codec for sequences of entities.
+
+Entities are written in Protobuf wire format one after another, each
+prefixed with its length as a varint - the same framing as
+``writeDelimitedTo`` / ``parseDelimitedFrom`` of other Protobuf runtimes.
+A single PB-message is reused for the whole stream, so a page of entities
+is processed without making a message per entity. With the pure-Python
+implementation of Protobuf entities are encoded without PB-messages at all.
+
+Examples
+--------
+>>> import io
+>>> from onedrive_client.entities.common import LocalItem
+>>> stream = io.BytesIO()
+>>> dump([LocalItem({'path': '/foo'}), LocalItem({'path': '/bar'})], stream)
+2
+>>> _ = stream.seek(0)
+>>> [item['path'] for item in load(LocalItem, stream)]
+['/foo', '/bar']
+"""
+import io
+from typing import BinaryIO, Iterable, Iterator
+
+from google.protobuf.message import DecodeError
+
+from .base import _encode_varint, _PURE_PYTHON, Entity
+
+
+def _read_varint(stream: BinaryIO) -> int:
+    """Read a varint from the stream.
+
+    Returns ``None`` at the end of the stream.
+    """
+    result = shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            if shift:
+                raise DecodeError('Truncated length of a message.')
+            return None
+        result |= (byte[0] & 0x7f) << shift
+        if not byte[0] & 0x80:
+            return result
+        shift += 7
+
+
+def dump(entities: Iterable[Entity], stream: BinaryIO) -> int:
+    """Write length-delimited entities to the stream.
+
+    Parameters
+    ----------
+    entities : Iterable[Entity]
+        Entities of the same entity-class.
+    stream : BinaryIO
+        Writable binary stream.
+
+    Returns
+    -------
+    int
+        Number of written entities.
+    """
+    message = None
+    count = 0
+    for count, entity in enumerate(entities, 1):
+        if _PURE_PYTHON:
+            data = entity.to_protobuf()
+        else:
+            message = entity.to_message(message)
+            data = message.SerializeToString()
+        stream.write(_encode_varint(len(data)))
+        stream.write(data)
+    return count
+
+
+def load(entity_cls: type, stream: BinaryIO) -> Iterator[Entity]:
+    """Read length-delimited entities from the stream lazily.
+
+    Parameters
+    ----------
+    entity_cls : type
+        Entity-class of the entities.
+    stream : BinaryIO
+        Readable binary stream.
+
+    Yields
+    ------
+    Entity
+        Entities in the order they were written.
+
+    Raises
+    ------
+    google.protobuf.message.DecodeError
+        If the stream is truncated or a message is malformed.
+    """
+    message = entity_cls._MESSAGE_CLASS()  # pylint: disable=protected-access
+    while True:
+        size = _read_varint(stream)
+        if size is None:
+            return
+        data = stream.read(size)
+        if len(data) != size:
+            raise DecodeError('Truncated message.')
+        message.ParseFromString(data)
+        yield entity_cls.from_message(message)
+
+
+def encode(entities: Iterable[Entity]) -> bytes:
+    """Encode entities as length-delimited messages."""
+    stream = io.BytesIO()
+    dump(entities, stream)
+    return stream.getvalue()
+
+
+def decode(entity_cls: type, data: bytes) -> Iterator[Entity]:
+    """Decode entities from length-delimited messages lazily."""
+    return load(entity_cls, io.BytesIO(data))
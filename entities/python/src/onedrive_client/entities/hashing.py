@@ -0,0 +1,82 @@
+"""Provides ``QuickXorHash`` - content hash of OneDrive for Business.
+
+The hash is shared by the services: the filesystem service computes it for
+local files and the OneDrive service verifies downloads with it.
+
+Examples
+--------
+>>> quick_xor = QuickXorHash(b'foo')
+>>> quick_xor.update(b'bar')
+>>> quick_xor.digest() == QuickXorHash(b'foobar').digest()
+True
+>>> QuickXorHash().digest() == bytes(20)
+True
+"""
+import struct
+
+import numpy as np
+
+
+class QuickXorHash:
+    """QuickXorHash with hashlib-like interface.
+
+    Every byte is xored into a 160 bit state at an offset which grows by 11
+    bits from byte to byte, so bytes 160 positions apart land at the same
+    offset. Data is xor-reduced into 160 columns of bytes with NumPy and
+    the columns are shifted into the state only when the digest is taken.
+
+    Parameters
+    ----------
+    data : bytes
+        Any bytes-like object, initial data.
+    """
+
+    WIDTH = 160
+    SHIFT = 11
+    digest_size = WIDTH // 8
+
+    def __init__(self, data: bytes = b''):  # noqa: D107
+        self._columns = np.zeros(self.WIDTH, dtype='uint8')
+        self._length = 0
+        self.update(data)
+
+    def update(self, data: bytes) -> None:
+        """Hash the next chunk of data.
+
+        Parameters
+        ----------
+        data : bytes
+            Any bytes-like object.
+        """
+        data = np.frombuffer(data, dtype='uint8')
+        size = len(data)
+        start = self._length % self.WIDTH
+        self._length += size
+
+        head = min((self.WIDTH - start) % self.WIDTH, size)
+        self._columns[start:start + head] ^= data[:head]
+        rows = (size - head) // self.WIDTH
+        if rows:
+            # 160 bytes make 20 words, so rows are reduced by words
+            body = data[head:head + rows * self.WIDTH].view('uint64')
+            self._columns ^= np.bitwise_xor.reduce(
+                body.reshape(rows, self.WIDTH // 8), axis=0
+            ).view('uint8')
+        tail = data[head + rows * self.WIDTH:]
+        self._columns[:len(tail)] ^= tail
+
+    def digest(self) -> bytes:
+        """Return the hash of the data passed so far."""
+        state = 0
+        mask = (1 << self.WIDTH) - 1
+        for column, value in enumerate(self._columns.tolist()):
+            if value:
+                offset = column * self.SHIFT % self.WIDTH
+                value <<= offset
+                state ^= (value | value >> self.WIDTH) & mask
+
+        result = bytearray(state.to_bytes(self.digest_size, 'little'))
+        for index, byte in enumerate(struct.pack('<q', self._length)):
+            result[self.digest_size - 8 + index] ^= byte
+
+        return bytes(result)
@@ -20,7 +20,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   name='onedrive_client/entities/onedrive.proto',
   package='onedrive_client.entities.onedrive',
   syntax='proto3',
-  serialized_pb=_b('\n\'onedrive_client/entities/onedrive.proto\x12!onedrive_client.entities.onedrive\"c\n\x08\x42\x61seItem\x12\n\n\x02id\x18\x01 \x01(\x0c\x12\r\n\x05\x65_tag\x18\x02 \x01(\x0c\x12\r\n\x05\x63_tag\x18\x03 \x01(\x0c\x12\x1f\n\x17last_modified_date_time\x18\x04 \x01(\x04\x12\x0c\n\x04name\x18\x05 \x01(\t\"\x89\x01\n\x05\x44rive\x12>\n\tbase_item\x18\x01 \x01(\x0b\x32+.onedrive_client.entities.onedrive.BaseItem\x12@\n\ndrive_type\x18\x02 \x01(\x0e\x32,.onedrive_client.entities.onedrive.DriveType\"\r\n\x0b\x46olderFacet\"\x0e\n\x0cPackageFacet\"\x0e\n\x0c\x44\x65letedFacet\"L\n\x0bHashesFacet\x12\x12\n\ncrc32_hash\x18\x01 \x01(\x0c\x12\x11\n\tsha1_hash\x18\x02 \x01(\x0c\x12\x16\n\x0equick_xor_hash\x18\x03 \x01(\x0c\"K\n\tFileFacet\x12>\n\x06hashes\x18\x01 \x01(\x0b\x32..onedrive_client.entities.onedrive.HashesFacet\"\xd4\x02\n\x04Item\x12>\n\tbase_item\x18\x01 \x01(\x0b\x32+.onedrive_client.entities.onedrive.BaseItem\x12\x0c\n\x04size\x18\x02 \x01(\x04\x12:\n\x04\x66ile\x18\x03 \x01(\x0b\x32,.onedrive_client.entities.onedrive.FileFacet\x12>\n\x06\x66older\x18\x04 \x01(\x0b\x32..onedrive_client.entities.onedrive.FolderFacet\x12@\n\x07package\x18\x05 \x01(\x0b\x32/.onedrive_client.entities.onedrive.PackageFacet\x12@\n\x07\x64\x65leted\x18\x06 \x01(\x0b\x32/.onedrive_client.entities.onedrive.DeletedFacet\"/\n\rExpectedRange\x12\x11\n\tbeginning\x18\x01 \x01(\r\x12\x0b\n\x03\x65nd\x18\x02 \x01(\r\"|\n\x0cUploadStatus\x12\x1c\n\x14\x65xpiration_date_time\x18\x01 \x01(\x04\x12N\n\x14next_expected_ranges\x18\x02 \x03(\x0b\x32\x30.onedrive_client.entities.onedrive.ExpectedRange\"6\n\x0cUploadedFile\x12\n\n\x02id\x18\x01 \x01(\x0c\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04size\x18\x03 \x01(\x04*=\n\tDriveType\x12\x0c\n\x08PERSONAL\x10\x00\x12\x0c\n\x08\x42USINESS\x10\x01\x12\x14\n\x10\x44OCUMENT_LIBRARY\x10\x02*5\n\x10\x43onflictBehavior\x12\n\n\x06RENAME\x10\x00\x12\x0b\n\x07REPLACE\x10\x01\x12\x08\n\x04\x46\x41IL\x10\x02\x62\x06proto3')
+  serialized_pb=_b('\n\'onedrive_client/entities/onedrive.proto\x12!onedrive_client.entities.onedrive\"c\n\x08\x42\x61seItem\x12\n\n\x02id\x18\x01 \x01(\x0c\x12\r\n\x05\x65_tag\x18\x02 \x01(\x0c\x12\r\n\x05\x63_tag\x18\x03 \x01(\x0c\x12\x1f\n\x17last_modified_date_time\x18\x04 \x01(\x04\x12\x0c\n\x04name\x18\x05 \x01(\t\"\x89\x01\n\x05\x44rive\x12>\n\tbase_item\x18\x01 \x01(\x0b\x32+.onedrive_client.entities.onedrive.BaseItem\x12@\n\ndrive_type\x18\x02 \x01(\x0e\x32,.onedrive_client.entities.onedrive.DriveType\"\r\n\x0b\x46olderFacet\"\x0e\n\x0cPackageFacet\"\x0e\n\x0c\x44\x65letedFacet\"L\n\x0bHashesFacet\x12\x12\n\ncrc32_hash\x18\x01 \x01(\x0c\x12\x11\n\tsha1_hash\x18\x02 \x01(\x0c\x12\x16\n\x0equick_xor_hash\x18\x03 \x01(\x0c\"K\n\tFileFacet\x12>\n\x06hashes\x18\x01 \x01(\x0b\x32..onedrive_client.entities.onedrive.HashesFacet\"\xd4\x02\n\x04Item\x12>\n\tbase_item\x18\x01 \x01(\x0b\x32+.onedrive_client.entities.onedrive.BaseItem\x12\x0c\n\x04size\x18\x02 \x01(\x04\x12:\n\x04\x66ile\x18\x03 \x01(\x0b\x32,.onedrive_client.entities.onedrive.FileFacet\x12>\n\x06\x66older\x18\x04 \x01(\x0b\x32..onedrive_client.entities.onedrive.FolderFacet\x12@\n\x07package\x18\x05 \x01(\x0b\x32/.onedrive_client.entities.onedrive.PackageFacet\x12@\n\x07\x64\x65leted\x18\x06 \x01(\x0b\x32/.onedrive_client.entities.onedrive.DeletedFacet\"/\n\rExpectedRange\x12\x11\n\tbeginning\x18\x01 \x01(\x04\x12\x0b\n\x03\x65nd\x18\x02 \x01(\x04\"|\n\x0cUploadStatus\x12\x1c\n\x14\x65xpiration_date_time\x18\x01 \x01(\x04\x12N\n\x14next_expected_ranges\x18\x02 \x03(\x0b\x32\x30.onedrive_client.entities.onedrive.ExpectedRange\"6\n\x0cUploadedFile\x12\n\n\x02id\x18\x01 \x01(\x0c\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04size\x18\x03 \x01(\x04*=\n\tDriveType\x12\x0c\n\x08PERSONAL\x10\x00\x12\x0c\n\x08\x42USINESS\x10\x01\x12\x14\n\x10\x44OCUMENT_LIBRARY\x10\x02*5\n\x10\x43onflictBehavior\x12\n\n\x06RENAME\x10\x00\x12\x0b\n\x07REPLACE\x10\x01\x12\x08\n\x04\x46\x41IL\x10\x02\x62\x06proto3')
 )
 
 _DRIVETYPE = _descriptor.EnumDescriptor(
@@ -406,14 +406,14 @@ _EXPECTEDRANGE = _descriptor.Descriptor(
   fields=[
     _descriptor.FieldDescriptor(
       name='beginning', full_name='onedrive_client.entities.onedrive.ExpectedRange.beginning', index=0,
-      number=1, type=13, cpp_type=3, label=1,
+      number=1, type=4, cpp_type=4, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
       name='end', full_name='onedrive_client.entities.onedrive.ExpectedRange.end', index=1,
-      number=2, type=13, cpp_type=3, label=1,
+      number=2, type=4, cpp_type=4, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
@@ -1,16 +1,50 @@
 """Tests for ``onedrive_client.entities.base`` module."""
+from google.protobuf import descriptor_pb2, descriptor_pool
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.message import DecodeError
 import pytest
 
+from onedrive_client.entities import base, Entity
+from tests.proto import test_pb2
 from tests.proto.test import Bar, Foo
-# pylint: disable=blacklisted-name,no-self-use
+# pylint: disable=blacklisted-name,no-member,no-self-use
+
+# Values of every scalar type by name of the type
+SCALARS = {
+    'double': -1.5, 'float': 0.25, 'int64': -5, 'uint64': 2 ** 64 - 1,
+    'int32': -7, 'fixed64': 2 ** 63, 'fixed32': 7, 'bool': True,
+    'string': '\u00fc', 'bytes': b'\x00', 'uint32': 300, 'sfixed32': -3,
+    'sfixed64': -2 ** 40, 'sint32': -2 ** 31, 'sint64': -2 ** 63
+}
+
+
+def make_scalars_class() -> type:
+    """Make an entity-class with a plain and a repeated field per type."""
+    file_proto = descriptor_pb2.FileDescriptorProto(
+        name='tests/scalars.proto', package='tests.scalars', syntax='proto3'
+    )
+    message = file_proto.message_type.add(name='Scalars')
+    for number, name in enumerate(SCALARS, 1):
+        type_ = getattr(FieldDescriptor, 'TYPE_' + name.upper())
+        message.field.add(name=name, number=number, type=type_,
+                          label=FieldDescriptor.LABEL_OPTIONAL)
+        message.field.add(name='repeated_' + name, number=number + 100,
+                          type=type_, label=FieldDescriptor.LABEL_REPEATED)
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_proto)
+
+    return type('Scalars', (Entity,), {
+        '_DESCRIPTOR': pool.FindMessageTypeByName('tests.scalars.Scalars')
+    })
 
 
 class TestEntity:
     """Tests for ``Entity`` class."""
 
-    @pytest.fixture
-    def foo(self):
-        return Foo()
+    @pytest.fixture(params=['entity', 'view'])
+    def foo(self, request):
+        # Views must behave exactly like regular entities
+        return Foo() if request.param == 'entity' else Foo.view(b'')
 
     class TestCompositeField:
         """Tests for composite fields."""
@@ -71,17 +105,18 @@ class TestEntity:
 
             assert foo['repeated_field'][0] == expected_value
 
-        @pytest.mark.parametrize('value, expected_value', [
-            (['a', 'b', 'c'], ['a', 'b', 'c']),
-            (iter(['a', 'b', 'c']), ['a', 'b', 'c'])
+        @pytest.mark.parametrize('make_value, expected_value', [
+            (lambda: ['a', 'b', 'c'], ['a', 'b', 'c']),
+            (lambda: iter(['a', 'b', 'c']), ['a', 'b', 'c'])
         ])
         def test_override_repeated_field(
             self,
             foo: Foo,
-            value, expected_value
+            make_value, expected_value
         ):
             """Repeated fields could be overridden with a new iterable."""
-            foo['repeated_field'] = value
+            # Iterators are made per test since ``foo`` is parametrized
+            foo['repeated_field'] = make_value()
 
             assert foo['repeated_field'] == expected_value
 
@@ -107,6 +142,20 @@ class TestEntity:
             with pytest.raises(TypeError):
                 foo['repeated_field'] = value
 
+        def test_collection_class_is_shared(self, foo: Foo):
+            """Collection-class of a field is created only once.
+
+            Entity-classes with the same field share it as well.
+            """
+            other = Foo({'repeated_field': ['a']})
+            # pylint: disable=protected-access
+            copy_cls = type('FooCopy', (Entity,),
+                            {'_DESCRIPTOR': Foo._DESCRIPTOR})
+
+            collection_cls = foo['repeated_field'].__class__
+            assert other['repeated_field'].__class__ is collection_cls
+            assert copy_cls()['repeated_field'].__class__ is collection_cls
+
     class TestEnumField:
         """Tests for enum-fields."""
         def test_set_enum_field(self, foo: Foo):
@@ -142,6 +191,212 @@ class TestEntity:
             with pytest.raises(TypeError):
                 foo['manufacturer'] = value
 
+    class TestOneofField:
+        """Tests for fields within oneof group."""
+
+        def test_members_of_oneof_are_unset_by_default(self, foo: Foo):
+            """Members of oneof are present only once they are set."""
+            assert foo['baz'] == 0
+            assert 'bar' not in foo
+            assert 'baz' not in foo
+
+        def test_set_member_of_oneof(self, foo: Foo):
+            """A member is set while others aren't present."""
+            foo['bar'] = 'test'
+
+            assert foo['bar'] == 'test'
+            assert 'bar' in foo
+
+        def test_set_other_member_of_oneof_fails(self, foo: Foo):
+            """Only one member of oneof could be set at once."""
+            foo['spam'] = {'eggs': 1}
+            with pytest.raises(TypeError):
+                foo['bar'] = 'test'
+
+            del foo['spam']
+            foo['bar'] = 'test'
+            assert 'spam' not in foo
+
+    class TestProtobuf:
+        """Tests for serialization to Protobuf."""
+
+        def test_round_trip(self, foo: Foo):
+            """Nested, repeated, enum and oneof fields survive a round-trip."""
+            foo.update({
+                'foo': b'test',
+                'repeated_field': ['a', 'b'],
+                'composite_field': {'eggs': 1},
+                'spam': {'eggs': 2},
+                'azerty': {'sausages': -3},
+                'manufacturer': 2,
+                'sub_enum_field': 1
+            })
+            result = Foo.from_protobuf(foo.to_protobuf())
+
+            assert result == foo
+            assert result['manufacturer'].__class__ is \
+                foo['manufacturer'].__class__
+            assert 'bar' not in result
+
+        def test_presence_survives_round_trip(self, foo: Foo):
+            """Empty composite fields and oneof members set to defaults."""
+            foo.update({'composite_field': {}, 'baz': 0})
+            result = Foo.from_protobuf(foo.to_protobuf())
+
+            assert result['composite_field'] == Bar()
+            assert result['baz'] == 0
+            assert 'azerty' not in result
+
+        def test_matches_message(self, foo: Foo):
+            """Wire format is the one of the original message."""
+            foo.update({'repeated_field': ['a'], 'azerty': {'sausages': 1}})
+            message = test_pb2.Foo(repeated_field=['a'])
+            message.azerty.sausages = 1
+
+            assert foo.to_protobuf() == message.SerializeToString()
+
+        @pytest.mark.parametrize('pure_python', [True, False])
+        def test_all_types_match_message(self, monkeypatch, pure_python):
+            """Every scalar type is encoded like by the original message."""
+            monkeypatch.setattr(base, '_PURE_PYTHON', pure_python)
+            scalars_cls = make_scalars_class()
+            entity = scalars_cls(SCALARS)
+            entity.update({'repeated_' + name: [value, value]
+                           for name, value in SCALARS.items()})
+            data = entity.to_protobuf()
+
+            assert data == entity.to_message().SerializeToString()
+            assert scalars_cls.from_protobuf(data) == entity
+            assert scalars_cls().to_protobuf() == b''
+
+        def test_reused_message_is_cleared(self, foo: Foo):
+            """Fields of the previous entity don't leak into a message."""
+            message = Foo({'foo': b'test', 'bar': 'x'}).to_message()
+            foo['baz'] = 1
+
+            assert Foo.from_message(foo.to_message(message)) == foo
+
+        def test_malformed_input_fails(self):
+            """Malformed input raises ``DecodeError``."""
+            with pytest.raises(DecodeError):
+                Foo.from_protobuf(b'\x0a\x05ab')
+
+        def test_unknown_enum_value_fails(self):
+            """A number unknown to the enum raises ``DecodeError``."""
+            with pytest.raises(DecodeError):
+                Foo.from_protobuf(b'\x40\x07')
+
+    class TestView:
+        """Tests for lazy views over Protobuf wire format."""
+
+        @pytest.fixture
+        def entity(self):
+            return Foo({
+                'foo': b'test',
+                'repeated_field': ['a', 'b'],
+                'composite_field': {'eggs': 1},
+                'spam': {'eggs': 2},
+                'azerty': {'sausages': -3},
+                'manufacturer': 2
+            })
+
+        def test_view_equals_entity(self, entity: Foo):
+            """All fields of a view are decoded like by ``from_protobuf``."""
+            view = Foo.view(entity.to_protobuf())
+
+            assert view == entity
+            assert repr(view) == repr(entity)
+            assert 'bar' not in view
+
+        def test_fields_are_decoded_on_access(self, entity: Foo):
+            """Composite fields are views over the same buffer."""
+            buffer = bytearray(entity.to_protobuf())
+            view = Foo.view(buffer)
+            # The buffer isn't copied until a field is decoded
+            buffer[buffer.index(b'test')] = ord('b')
+
+            assert view['foo'] == b'best'
+            assert view['azerty']['sausages'] == -3
+            assert view['sub_enum_field'] == 0
+
+        def test_write_promotes_view(self, entity: Foo):
+            """Writing to a view keeps the fields that weren't decoded."""
+            view = Foo.view(entity.to_protobuf())
+            view['composite_field']['eggs'] = 5
+            del view['spam']
+            view['bar'] = 'test'
+            entity['composite_field']['eggs'] = 5
+            del entity['spam']
+            entity['bar'] = 'test'
+
+            assert view == entity
+            assert Foo.from_protobuf(view.to_protobuf()) == entity
+
+        def test_last_member_of_oneof_wins(self):
+            """The last member of oneof in the buffer is the one present."""
+            buffer = Foo({'bar': 'x'}).to_protobuf() + \
+                Foo({'baz': 7}).to_protobuf()
+            view = Foo.view(buffer)
+
+            assert 'bar' not in view
+            assert view['baz'] == 7
+
+        def test_scattered_occurrences(self):
+            """Occurrences of a field apart in the buffer are all decoded."""
+            buffer = Foo({'repeated_field': ['a'], 'foo': b'x'}) \
+                .to_protobuf() + Foo({'repeated_field': ['b'],
+                                      'foo': b'y'}).to_protobuf()
+            view = Foo.view(buffer)
+
+            assert list(view['repeated_field']) == ['a', 'b']
+            assert view['foo'] == b'y'
+            assert view == Foo.from_protobuf(buffer)
+
+        def test_untouched_view_serializes_as_is(self, entity: Foo):
+            """Serialization of an untouched view doesn't decode it."""
+            buffer = entity.to_protobuf()
+
+            assert Foo.view(buffer).to_protobuf() == buffer
+
+        def test_malformed_buffer_fails(self):
+            """A truncated buffer raises ``DecodeError`` on access."""
+            view = Foo.view(b'\x0a\x05ab')
+
+            with pytest.raises(DecodeError):
+                view['foo']  # pylint: disable=pointless-statement
+
+        def test_unknown_enum_value_fails(self):
+            """An unknown enum number raises ``DecodeError`` on access."""
+            view = Foo.view(b'\x40\x07')
+
+            with pytest.raises(DecodeError):
+                view['manufacturer']  # pylint: disable=pointless-statement
+
+        def test_unknown_enum_value_fails_again(self):
+            """A field which failed to decode fails on every access."""
+            view = Foo.view(b'\x40\x07')
+
+            for _ in range(2):
+                with pytest.raises(DecodeError):
+                    view['manufacturer']  # pylint: disable=pointless-statement
+
+    def test_fields_are_resolved_once(self, foo: Foo):
+        """Classes of fields are resolved on first use and then reused."""
+        foo.update({'composite_field': {'eggs': 1}, 'azerty': {}})
+        other = Foo({'composite_field': {'eggs': 2}, 'azerty': {}})
+
+        for name in ('composite_field', 'azerty', 'sub_enum_field'):
+            assert foo[name].__class__ is other[name].__class__
+
+    def test_delete_composite_field(self, foo: Foo):
+        """Composite fields are unset by deletion."""
+        foo['composite_field'] = {'eggs': 1}
+        del foo['composite_field']
+
+        assert 'composite_field' not in foo
+        with pytest.raises(KeyError):
+            del foo['composite_field']
+
     def test_set_regular_field(self, foo: Foo):
         """Basic assignment."""
         expected_value = b'test'
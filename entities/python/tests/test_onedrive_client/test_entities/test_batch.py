@@ -0,0 +1,202 @@
+"""Tests for ``onedrive_client.entities.batch`` module."""
+import numpy as np
+import pytest
+
+from onedrive_client.entities.batch import _join, BytesColumn, EntityBatch
+from onedrive_client.entities.common import DirtyRemoteItem, LocalItem
+from onedrive_client.entities.onedrive import Drive, Item, UploadStatus
+# pylint: disable=no-self-use
+
+
+class TestBytesColumn:
+    """Tests for ``BytesColumn`` class."""
+
+    @pytest.fixture
+    def column(self):
+        return BytesColumn.from_values([b'foo', b'', b'foo\x00', b'bar'])
+
+    def test_values(self, column: BytesColumn):
+        """Values are retrieved as they were stored."""
+        assert len(column) == 4
+        assert column.tolist() == [b'foo', b'', b'foo\x00', b'bar']
+        assert column[-1] == b'bar'
+        assert column.lengths.tolist() == [3, 0, 4, 3]
+
+    def test_text(self):
+        """Strings are stored encoded."""
+        column = BytesColumn.from_values(['ü', 'a'], text=True)
+
+        assert column.data.tolist() == list('üa'.encode('utf-8'))
+        assert list(column) == ['ü', 'a']
+        assert (column == 'ü').tolist() == [True, False]
+
+    def test_take(self, column: BytesColumn):
+        """Values are selected by a mask or by indices."""
+        assert column[np.array([3, 0, 0])].tolist() == [b'bar', b'foo',
+                                                        b'foo']
+        mask = np.array([False, True, True, False])
+        assert column[mask].tolist() == [b'', b'foo\x00']
+
+    @pytest.mark.parametrize('value, expected', [
+        (b'foo', [True, False, False, False]),
+        (b'', [False, True, False, False]),
+        (b'baz', [False, False, False, False]),
+    ])
+    def test_equals_value(self, column: BytesColumn, value, expected):
+        """Values are compared to a value at once."""
+        assert (column == value).tolist() == expected
+        assert (column != value).tolist() == [not e for e in expected]
+
+    def test_equals_column(self, column: BytesColumn):
+        """Columns are compared element-wise."""
+        other = BytesColumn.from_values([b'foo', b'', b'foo', b'baz'])
+
+        assert (column == other).tolist() == [True, True, False, False]
+        with pytest.raises(ValueError):
+            assert column == other[np.array([0])]
+
+    def test_hashes(self, column: BytesColumn):
+        """Hashes tell apart values with zero bytes and depend on values."""
+        hashes = column.hashes()
+
+        assert hashes.dtype == np.dtype('uint64')
+        assert len(np.unique(hashes)) == 4
+        assert hashes[0] == column[np.array([1, 0])].hashes()[1]
+        assert BytesColumn.from_values([b'\x00foo']).hashes()[0] != hashes[0]
+
+
+class TestEntityBatch:
+    """Tests for ``EntityBatch`` class."""
+
+    @pytest.fixture
+    def items(self):
+        return [
+            DirtyRemoteItem({
+                'our_id': b'1',
+                'item': {'base_item': {'id': b'A', 'name': 'foo'},
+                         'size': 10, 'folder': {}}
+            }),
+            DirtyRemoteItem({'our_id': b'2'}),
+            DirtyRemoteItem({
+                'our_id': b'3',
+                'item': {'size': 30,
+                         'file': {'hashes': {'sha1_hash': b'\x00' * 20}}}
+            }),
+        ]
+
+    def test_round_trip(self, items):
+        """Entities are the same after a round-trip."""
+        batch = EntityBatch.from_entities(DirtyRemoteItem, items)
+
+        assert len(batch) == 3
+        assert batch.to_entities() == items
+
+    def test_columns(self, items):
+        """Scalar fields are arrays, composite ones have presence."""
+        batch = EntityBatch.from_entities(DirtyRemoteItem, items)
+
+        assert batch['item.size'].dtype == np.dtype('uint64')
+        assert batch['item.size'].tolist() == [10, 0, 30]
+        assert batch['item'].tolist() == [True, False, True]
+        assert batch['item.folder'].tolist() == [True, False, False]
+        assert batch['item.base_item.name'].tolist() == ['foo', '', '']
+
+    def test_enum(self):
+        """Enum fields are stored as numbers."""
+        drives = [Drive({'drive_type': 2}), Drive()]
+        batch = EntityBatch.from_entities(Drive, drives)
+
+        assert batch['drive_type'].tolist() == [2, 0]
+        assert batch.to_entities() == drives
+
+    def test_filter(self, items):
+        """Rows are selected by vectorized conditions."""
+        batch = EntityBatch.from_entities(DirtyRemoteItem, items)
+        selected = batch[(batch['item.size'] > 5) &
+                         (batch['our_id'] != b'1')]
+
+        assert selected.to_entities() == items[2:]
+        assert batch[batch['item.size'] > 100].to_entities() == []
+
+    def test_from_dicts(self):
+        """Dicts are converted to entities first."""
+        batch = EntityBatch.from_entities(LocalItem, [{'path': '/foo'}])
+
+        assert batch.to_entities() == [LocalItem({'path': '/foo'})]
+
+    def test_empty(self):
+        """An empty batch has empty columns."""
+        batch = EntityBatch.from_entities(LocalItem, [])
+
+        assert not batch
+        assert batch.to_entities() == []
+        assert batch['path'].hashes().size == 0
+
+    def test_repeated_fields_fail(self):
+        """Repeated fields can't be stored in columns."""
+        with pytest.raises(TypeError):
+            EntityBatch.from_entities(UploadStatus, [])
+
+    def test_join(self):
+        """Rows of different entity-classes are paired by keys."""
+        local = EntityBatch.from_entities(LocalItem, [
+            {'path': name} for name in ['a', 'b', 'c', 'long name', 'b']
+        ])
+        remote = EntityBatch.from_entities(Item, [
+            {'base_item': {'name': name}} for name in ['b', 'a', 'b', 'd']
+        ])
+        left, right = local.join(remote, 'path', 'base_item.name')
+
+        pairs = sorted(zip(left.tolist(), right.tolist()))
+        assert pairs == [(0, 1), (1, 0), (1, 2), (4, 0), (4, 2)]
+        assert (local['path'][left] == remote['base_item.name'][right]).all()
+
+    def test_join_hash_collisions(self, monkeypatch):
+        """Rows with equal hashes of different keys aren't paired."""
+        monkeypatch.setattr(BytesColumn, 'hashes',
+                            lambda column: np.zeros(len(column), 'uint64'))
+        local = EntityBatch.from_entities(LocalItem, [
+            {'path': name} for name in ['a', 'b', 'c']
+        ])
+        remote = EntityBatch.from_entities(LocalItem, [
+            {'path': name} for name in ['c', 'a', 'd']
+        ])
+        left, right = local.join(remote, 'path')
+
+        assert sorted(zip(left.tolist(), right.tolist())) == [(0, 1), (2, 0)]
+
+    def test_join_numbers(self):
+        """Numeric columns are joined as they are."""
+        local = EntityBatch.from_entities(LocalItem, [
+            {'metadata': {'size': size}} for size in [3, 1, 2]
+        ])
+        remote = EntityBatch.from_entities(Item, [{'size': 2}, {'size': 3}])
+        left, right = local.join(remote, 'metadata.size', 'size')
+
+        assert sorted(zip(left.tolist(), right.tolist())) == [(0, 1), (2, 0)]
+
+    def test_join_signed_and_unsigned(self):
+        """Signed and unsigned keys are compared exactly."""
+        left = np.array([2 ** 53 + 1, -1, 5, 2 ** 53], 'int64')
+        right = np.array([2 ** 53, 2 ** 64 - 1, 5, 2 ** 53 + 1], 'uint64')
+        left_indices, right_indices = _join(left, right)
+
+        assert sorted(zip(left_indices.tolist(), right_indices.tolist())) \
+            == [(0, 3), (2, 2), (3, 0)]
+        assert _join(right, left)[0].tolist() == [0, 2, 3]
+
+        drives = EntityBatch.from_entities(Drive, [{'drive_type': 1}, {}])
+        items = EntityBatch.from_entities(Item, [
+            {'size': size} for size in [2 ** 64 - 1, 0, 1]
+        ])
+        left_indices, right_indices = drives.join(items, 'drive_type', 'size')
+        assert sorted(zip(left_indices.tolist(), right_indices.tolist())) \
+            == [(0, 2), (1, 1)]
+
+    def test_join_different_types_fails(self):
+        """Bytes columns are joined only with bytes columns."""
+        local = EntityBatch.from_entities(LocalItem, [{'path': 'a'}])
+        remote = EntityBatch.from_entities(Item, [{'size': 1}])
+
+        with pytest.raises(TypeError):
+            local.join(remote, 'path', 'size')
@@ -0,0 +1,61 @@
+"""Tests for ``onedrive_client.entities.codec`` module."""
+import io
+
+from google.protobuf.message import DecodeError
+import pytest
+
+from onedrive_client.entities import codec
+from tests.proto.test import Foo
+# pylint: disable=no-self-use
+
+
+class TestCodec:
+    """Tests for length-delimited streams of entities."""
+
+    @pytest.fixture
+    def foos(self):
+        return [
+            Foo({'foo': b'first', 'repeated_field': ['a', 'b'], 'bar': 'x'}),
+            Foo(),
+            Foo({'composite_field': {'eggs': 3}, 'spam': {}}),
+        ]
+
+    def test_round_trip(self, foos):
+        """Entities are read in the order they are written."""
+        stream = io.BytesIO()
+
+        assert codec.dump(foos, stream) == 3
+        stream.seek(0)
+        assert list(codec.load(Foo, stream)) == foos
+
+    def test_empty_stream(self):
+        """Nothing is read from an empty stream."""
+        assert codec.encode([]) == b''
+        assert list(codec.decode(Foo, b'')) == []
+
+    def test_large_messages(self):
+        """Lengths take more than a byte of varint."""
+        foos = [Foo({'foo': bytes(size)}) for size in (127, 128, 70000)]
+
+        assert list(codec.decode(Foo, codec.encode(foos))) == foos
+
+    def test_load_is_lazy(self, foos):
+        """Entities are read one at a time."""
+        stream = io.BytesIO(codec.encode(foos))
+        entities = codec.load(Foo, stream)
+
+        assert next(entities) == foos[0]
+        assert stream.tell() < len(stream.getvalue())
+
+    @pytest.mark.parametrize('cut', [1, 3])
+    def test_truncated_stream_fails(self, foos, cut):
+        """A truncated stream raises ``DecodeError``."""
+        data = codec.encode(foos[:1])
+
+        with pytest.raises(DecodeError):
+            list(codec.decode(Foo, data[:cut]))
+
+    def test_truncated_length_fails(self):
+        """A stream ending within a length raises ``DecodeError``."""
+        with pytest.raises(DecodeError):
+            list(codec.decode(Foo, b'\x80'))
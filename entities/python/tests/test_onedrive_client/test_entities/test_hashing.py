@@ -0,0 +1,51 @@
+"""Tests for ``onedrive_client.entities.hashing`` module."""
+import os
+import struct
+
+from onedrive_client.entities.hashing import QuickXorHash
+# pylint: disable=no-self-use
+
+
+def quick_xor_reference(data: bytes) -> bytes:
+    """Scalar QuickXorHash as in the reference implementation by Microsoft."""
+    cells = [0, 0, 0]
+    shift = 0
+    for byte in data:
+        index, offset = shift // 64, shift % 64
+        bits = 32 if index == 2 else 64
+        cells[index] ^= (byte << offset) & ((1 << bits) - 1)
+        if offset > bits - 8:
+            cells[0 if index == 2 else index + 1] ^= byte >> (bits - offset)
+        shift = (shift + 11) % 160
+
+    result = bytearray(struct.pack('<QQI', *cells))
+    for index, byte in enumerate(struct.pack('<q', len(data))):
+        result[12 + index] ^= byte
+
+    return bytes(result)
+
+
+class TestQuickXorHash:
+    """Tests for the vectorized QuickXorHash."""
+
+    def test_empty(self):
+        """Hash of no data is zero."""
+        assert QuickXorHash().digest() == bytes(20)
+
+    def test_reference(self):
+        """Hashes of data of various lengths match the scalar ones."""
+        data = os.urandom(2000)
+        for size in [0, 1, 7, 159, 160, 161, 320, 1000, 2000]:
+            assert QuickXorHash(data[:size]).digest() == \
+                quick_xor_reference(data[:size])
+
+    def test_chunks(self):
+        """Hash doesn't depend on how the data is split into chunks."""
+        data = os.urandom(5000)
+        quick_xor = QuickXorHash()
+        offset = 0
+        for size in [3, 157, 160, 1, 1000, 479, 3200]:
+            quick_xor.update(data[offset:offset + size])
+            offset += size
+
+        assert quick_xor.digest() == QuickXorHash(data).digest()
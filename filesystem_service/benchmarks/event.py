@@ -0,0 +1,94 @@
+"""
+Benchmark of the filesystem event representation
+
+Compares Event with the former representation, which decoded paths eagerly
+and stored every event type as an instance attribute, by the number of
+events created and checked per second and by the memory used per event.
+
+Usage:
+    python benchmarks/event.py --events 200000
+"""
+
+import argparse
+import collections
+import os
+import time
+import tracemalloc
+
+from filesystem_service.monitor import Event
+
+
+Header = collections.namedtuple('Header', ['wd', 'mask', 'cookie', 'len'])
+
+
+# pylint: disable=too-few-public-methods
+class LegacyEvent(object):
+    """
+    Former representation of event
+    """
+
+    def __init__(self, event):
+        (header, type_names, path, filename) = event
+        self.cookie = header.cookie
+        self.path = path.decode('utf-8')
+        self.filename = filename.decode('utf-8')
+        self.file_path = os.path.join(self.path, self.filename)
+        self.src_path = None
+        for i_event in type_names:
+            if not hasattr(self, i_event):
+                setattr(self, i_event, True)
+
+
+def make_events(count):
+    """
+    :param count: number of events
+    :return: list of inotify events
+    """
+
+    header = Header(wd=1, mask=0x8, cookie=0, len=16)
+    return [
+        (header, ['IN_CLOSE_WRITE'], b'/home/user/OneDrive/folder',
+         'file{}.txt'.format(index).encode())
+        for index in range(count)
+    ]
+
+
+def run(name, event_class, raw_events):
+    """
+    :param name: name of the implementation
+    :param event_class: class of event
+    :param raw_events: list of inotify events
+    """
+
+    started = time.time()
+    for raw_event in raw_events:
+        event = event_class(raw_event)
+        hasattr(event, 'IN_CREATE')
+        hasattr(event, 'IN_CLOSE_WRITE')
+    elapsed = time.time() - started
+
+    tracemalloc.start()
+    events = [event_class(raw_event) for raw_event in raw_events]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print('{:>8}: {:.0f} events/s, {:.0f} bytes/event'.format(
+        name, len(raw_events) / elapsed, size / len(events)))
+
+
+def main():
+    """
+    Run the benchmark
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--events', type=int, default=200000)
+    args = parser.parse_args()
+
+    raw_events = make_events(args.events)
+    run('legacy', LegacyEvent, raw_events)
+    run('event', Event, raw_events)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of the excluded folders lookup
+
+Compares ExcludeIndex with a linear scan over prefixes for a number of
+exclusion rules, a tenth of which are glob patterns.
+
+Usage:
+    python benchmarks/exclude.py --rules 10000 --paths 100000
+"""
+
+import argparse
+import fnmatch
+import random
+import time
+
+from filesystem_service.exclude import ExcludeIndex
+
+
+def make_rules(count):
+    """
+    :param count: number of rules
+    :return: tuple of lists of folders and patterns
+    """
+
+    folders = [
+        '/root/{}/{}/excluded{}'.format(random.randrange(100),
+                                        random.randrange(100), index).encode()
+        for index in range(count - count // 10)
+    ]
+    patterns = ['pattern{}*'.format(index).encode()
+                for index in range(count // 10)]
+
+    return folders, patterns
+
+
+def make_paths(count, depth):
+    """
+    :param count: number of paths
+    :param depth: depth of the paths
+    :return: list of paths
+    """
+
+    return [
+        ('/root/' + '/'.join(str(random.randrange(100))
+                             for _ in range(depth))).encode()
+        for _ in range(count)
+    ]
+
+
+def linear(folders, patterns):
+    """
+    :param folders: excluded folders
+    :param patterns: excluded patterns
+    :return: function checking a path
+    """
+
+    def is_excluded(path):
+        names = path.split(b'/')
+        return (any(path == folder or path.startswith(folder + b'/')
+                    for folder in folders) or
+                any(fnmatch.fnmatch(name, pattern)
+                    for pattern in patterns for name in names))
+
+    return is_excluded
+
+
+def run(name, is_excluded, paths):
+    """
+    :param name: name of the implementation
+    :param is_excluded: function checking a path
+    :param paths: list of paths to check
+    """
+
+    started = time.time()
+    for path in paths:
+        is_excluded(path)
+    elapsed = time.time() - started
+    print('{:>8}: {:.0f} paths/s'.format(name, len(paths) / elapsed))
+
+
+def main():
+    """
+    Run the benchmark
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rules', type=int, default=10000)
+    parser.add_argument('--paths', type=int, default=100000)
+    parser.add_argument('--depth', type=int, default=6)
+    args = parser.parse_args()
+
+    folders, patterns = make_rules(args.rules)
+    paths = make_paths(args.paths, args.depth)
+
+    started = time.time()
+    index = ExcludeIndex(folders + patterns)
+    index.is_excluded(b'/')
+    print('Built index of {} rules in {:.3f}s'.format(args.rules,
+                                                      time.time() - started))
+
+    run('index', index.is_excluded, paths)
+    # The linear scan is too slow to check all the paths
+    run('linear', linear(folders, patterns), paths[:args.paths // 100])
+
+
+if __name__ == '__main__':
+    main()
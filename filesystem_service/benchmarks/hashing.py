@@ -0,0 +1,91 @@
+"""
+Benchmark of the content hashes of local files
+
+Measures the throughput of every hash alone, of all the hashes computed in
+a single pass over a file and of hashing a number of files in a pool of
+processes.
+
+Usage:
+    python benchmarks/hashing.py --size 256 --files 8
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+from filesystem_service.hashing import DEFAULT_BUFFER_SIZE, hash_file, \
+    hash_files
+from onedrive_client.entities.hashing import QuickXorHash
+
+
+def report(name, size, elapsed):
+    """
+    :param name: name of the measurement
+    :param size: number of bytes hashed
+    :param elapsed: time in seconds
+    """
+
+    print('{:>10}: {:.2f} GB/s'.format(name, size / elapsed / 1e9))
+
+
+def run_hash(name, update, data):
+    """
+    :param name: name of the hash
+    :param update: callable which takes a chunk of data
+    :param data: data to hash. Type: bytes
+    """
+
+    view = memoryview(data)
+    started = time.time()
+    for offset in range(0, len(data), DEFAULT_BUFFER_SIZE):
+        update(view[offset:offset + DEFAULT_BUFFER_SIZE])
+    report(name, len(data), time.time() - started)
+
+
+def main():
+    """
+    Run the benchmark
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--size', type=int, default=256,
+                        help='size of a file in MiB')
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    size = args.size * 1024 * 1024
+    data = os.urandom(size)
+
+    crc32 = [0]
+    run_hash('crc32', lambda chunk: crc32.append(zlib.crc32(chunk, crc32[-1])),
+             data)
+    run_hash('sha1', hashlib.sha1().update, data)
+    run_hash('quickxor', QuickXorHash().update, data)
+
+    root = tempfile.mkdtemp()
+    try:
+        paths = []
+        for index in range(args.files):
+            paths.append(os.path.join(root, 'file{}'.format(index)))
+            with open(paths[-1], 'wb') as stream:
+                stream.write(data)
+
+        started = time.time()
+        hash_file(paths[0])
+        report('one pass', size, time.time() - started)
+
+        started = time.time()
+        for _ in hash_files(paths, workers=args.workers, chunksize=1):
+            pass
+        report('pool', size * args.files, time.time() - started)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
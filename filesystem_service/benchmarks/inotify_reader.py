@@ -0,0 +1,108 @@
+"""
+Benchmark of the inotify event sources
+
+Feeds a watched folder with a steady stream of file modifications and
+compares the number of events received and the CPU time spent by the
+inotify.adapters generator and by the batched InotifyReader.
+
+Usage:
+    python benchmarks/inotify_reader.py --rate 50000 --duration 5
+"""
+
+import argparse
+from multiprocessing import Event as StopFlag, Process
+import os
+import shutil
+import tempfile
+import time
+
+from filesystem_service.monitor import _make_notifier, BACKENDS, Event
+
+
+def produce(folder, rate, files, stop):
+    """
+    Modify files of a folder at a given rate until stopped
+    :param folder: full path to folder
+    :param rate: number of modifications per second
+    :param files: number of files to modify in turn
+    :param stop: an instance of multiprocessing.Event
+    """
+
+    paths = [os.path.join(folder, 'file{}'.format(index))
+             for index in range(files)]
+    for path in paths:
+        open(path, 'w').close()
+
+    tick = 0.01
+    per_tick = max(1, int(rate * tick))
+    index = 0
+    deadline = time.monotonic()
+    while not stop.is_set():
+        for _ in range(per_tick):
+            os.utime(paths[index % files])
+            index += 1
+        deadline += tick
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run(backend, rate, duration, files):
+    """
+    :param backend: source of inotify events
+    :param rate: number of modifications per second
+    :param duration: time in seconds to receive events
+    :param files: number of files to modify in turn
+    """
+
+    folder = tempfile.mkdtemp()
+    notifier = _make_notifier(backend, folder.encode(),
+                              block_duration_s=0.1)
+    notifier.add_watch(folder.encode())
+
+    stop = StopFlag()
+    producer = Process(target=produce, args=(folder, rate, files, stop))
+    producer.start()
+
+    received = overflows = 0
+    started = time.monotonic()
+    cpu_started = time.process_time()
+    for raw_event in notifier.event_gen():
+        if raw_event:
+            event = Event(raw_event)
+            received += 1
+            if hasattr(event, 'IN_Q_OVERFLOW'):
+                overflows += 1
+        elif time.monotonic() - started >= duration:
+            break
+    elapsed = time.monotonic() - started
+    cpu = time.process_time() - cpu_started
+
+    stop.set()
+    producer.join()
+    shutil.rmtree(folder)
+
+    print('{:>8}: {:.0f} events/s, {:.0f}% CPU, {:.1f} us CPU/event, '
+          '{} overflows'.format(backend, received / elapsed,
+                                100 * cpu / elapsed,
+                                1e6 * cpu / max(received, 1), overflows))
+
+
+def main():
+    """
+    Run the benchmark
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rate', type=int, default=50000)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--backend', choices=BACKENDS, action='append')
+    args = parser.parse_args()
+
+    for backend in args.backend or BACKENDS:
+        run(backend, args.rate, args.duration, args.files)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark of the persistent index of local files
+
+Builds a synthetic tree of small files and measures a cold index build,
+which hashes every file, against a warm restart, which reopens the index
+and hashes only the files modified since the build.
+
+Usage:
+    python benchmarks/local_index.py --files 1000000 --modified 1000
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from filesystem_service.index import LocalIndex
+
+
+def make_tree(root, files, per_folder):
+    """
+    :param root: full path to the root folder. Type: bytes
+    :param files: number of files
+    :param per_folder: number of files in a folder
+    :return: list of full paths to the files
+    """
+
+    paths = []
+    for index in range(files):
+        if index % per_folder == 0:
+            # Two levels of folders to keep the tree realistic
+            folder = os.path.join(
+                root, str(index // per_folder // 100).encode(),
+                str(index // per_folder).encode()
+            )
+            os.makedirs(folder)
+        path = os.path.join(folder, 'file{}'.format(index).encode())
+        with open(path, 'wb') as stream:
+            stream.write(path)
+        paths.append(path)
+
+    return paths
+
+
+def sha1_hasher(path):
+    """
+    :param path: full path to file
+    :return: (crc32_hash, sha1_hash, quick_xor_hash) with SHA1 only
+    """
+
+    with open(path, 'rb') as stream:
+        return None, hashlib.sha1(stream.read()).digest(), None
+
+
+def refresh(name, database, tree):
+    """
+    Open the index and bring it up to date
+    :param name: name of the measurement
+    :param database: path to the database file
+    :param tree: full path to the root folder. Type: bytes
+    """
+
+    started = time.time()
+    index = LocalIndex(database, hasher=sha1_hasher)
+    changes = sum(1 for _ in index.refresh(tree))
+    elapsed = time.time() - started
+    count = len(index)
+    index.close()
+
+    print('{:>8}: {:.2f}s, {} changes of {} files, {:.0f} files/s'.format(
+        name, elapsed, changes, count, count / elapsed))
+
+
+def main():
+    """
+    Run the benchmark
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--files', type=int, default=1000000)
+    parser.add_argument('--per-folder', type=int, default=100)
+    parser.add_argument('--modified', type=int, default=1000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp().encode()
+    database = os.path.join(root, b'index.db').decode()
+    tree = os.path.join(root, b'tree')
+    try:
+        started = time.time()
+        paths = make_tree(tree, args.files, args.per_folder)
+        print('Made a tree of {} files in {:.2f}s'.format(
+            args.files, time.time() - started))
+
+        refresh('cold', database, tree)
+        refresh('warm', database, tree)
+
+        for path in random.sample(paths, args.modified):
+            with open(path, 'ab') as stream:
+                stream.write(b'modified')
+        refresh('modified', database, tree)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
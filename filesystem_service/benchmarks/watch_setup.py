@@ -0,0 +1,157 @@
+"""
+Benchmark of the FileSystemMonitor watch setup on a synthetic folder tree
+
+Measures time to the first delivered event and peak RSS of the monitor
+process for the streaming walker and for the legacy list built with
+os.walk.
+
+Usage:
+    python benchmarks/watch_setup.py --folders 100000 [--root /tmp/bench]
+
+Note: the number of folders must not exceed
+/proc/sys/fs/inotify/max_user_watches.
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from filesystem_service.monitor import FileSystemMonitor
+import inotify.adapters
+
+
+def make_tree(root, folders, fanout):
+    """
+    :param root: root folder of the tree
+    :param folders: number of folders to create
+    :param fanout: number of subfolders in each folder
+    :return:
+    """
+
+    level = [root]
+    created = 0
+    while created < folders:
+        next_level = []
+        for parent in level:
+            for index in range(fanout):
+                if created >= folders:
+                    return
+                folder = os.path.join(parent, str(index))
+                os.mkdir(folder)
+                next_level.append(folder)
+                created += 1
+        level = next_level
+
+
+def report(results):
+    """
+    :param results: queue to put the measurements into
+    :return:
+    """
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((time.time(), peak_rss))
+    results.close()
+    results.join_thread()
+    os._exit(0)  # pylint: disable=protected-access
+
+
+class Subscriber(object):  # pylint: disable=too-few-public-methods
+    """
+    Reports the first event
+    """
+
+    def __init__(self, results):
+        self.results = results
+
+    def update(self, _):
+        """
+        :param _: filesystem event
+        """
+
+        report(self.results)
+
+
+def run_walker(root, results):
+    """
+    :param root: root folder of the tree
+    :param results: queue to put the measurements into
+    """
+
+    monitor = FileSystemMonitor(root)
+    monitor.subscribe(Subscriber(results))
+    monitor.monitor()
+
+
+def run_os_walk(root, results):
+    """
+    :param root: root folder of the tree
+    :param results: queue to put the measurements into
+    """
+
+    notifier = inotify.adapters.Inotify()
+    for folder in [res[0] for res in os.walk(root.encode())]:
+        notifier.add_watch(folder)
+
+    for event in notifier.event_gen():
+        if event:
+            report(results)
+
+
+def measure(target, root):
+    """
+    :param target: function running the monitor
+    :param root: root folder of the tree
+    :return: tuple of time to the first event in seconds and peak RSS in KiB
+    """
+
+    results = multiprocessing.Queue()
+    probe = os.path.join(root, 'probe')
+    process = multiprocessing.Process(target=target, args=(root, results))
+
+    started = time.time()
+    process.start()
+    while results.empty():
+        with open(probe, 'w'):
+            pass
+        time.sleep(0.005)
+
+    received, peak_rss = results.get()
+    process.join()
+
+    return received - started, peak_rss
+
+
+def main():
+    """
+    Run the benchmark
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--folders', type=int, default=100000)
+    parser.add_argument('--fanout', type=int, default=10)
+    parser.add_argument('--root', default=None)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(dir=args.root)
+    try:
+        started = time.time()
+        make_tree(root, args.folders, args.fanout)
+        print('Created {} folders in {:.1f}s'.format(args.folders,
+                                                     time.time() - started))
+
+        for name, target in (('os.walk', run_os_walk),
+                             ('walker', run_walker)):
+            first_event, peak_rss = measure(target, root)
+            print('{:>8}: first event after {:.2f}s, peak RSS {:.1f} MiB'
+                  .format(name, first_event, peak_rss / 1024))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Provides coalescing of bursts of filesystem events
+"""
+
+import collections
+import time
+
+import inotify.constants
+
+
+class EventCoalescer(object):
+    """
+    Merge events of the same path that come within a time window
+
+    The window starts with the first event of a path, so a file that is
+    being written continuously is still reported once per window. A pair of
+    IN_MOVED_FROM/IN_MOVED_TO events sharing a cookie is folded into a
+    single event of the destination path with `src_path` set to the source.
+
+    A file created and deleted within the window isn't reported at all, and
+    a file deleted and created again is reported as created only, since the
+    merged event doesn't keep the order of its types.
+    """
+
+    def __init__(self, window):
+        """
+        :param window: time window in seconds. Type: float
+        """
+
+        self._window = window
+        self._pending = collections.OrderedDict()
+        self._moves = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def push(self, event, now=None):
+        """
+        :param event: an instance of Event
+        :param now: current monotonic time
+        :return:
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        if hasattr(event, 'IN_MOVED_TO') and event.cookie in self._moves:
+            src_path = self._moves.pop(event.cookie)
+            pending = self._pending.pop(src_path, None)
+            if pending is not None:
+                event.merge(pending[1])
+            event.src_path = src_path
+
+        key = event.file_path
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = (now + self._window, event)
+        elif _created_and_deleted(pending[1], event):
+            # The file existed only within the window
+            del self._pending[key]
+            return
+        else:
+            if hasattr(pending[1], 'IN_DELETE') and \
+                    hasattr(event, 'IN_CREATE'):
+                # The file was replaced, the new one is reported as created
+                pending[1].mask &= ~inotify.constants.IN_DELETE
+            pending[1].merge(event)
+            if event.src_path is not None:
+                # The file was moved over the pending one
+                pending[1].src_path = event.src_path
+                pending[1].cookie = event.cookie
+            event = pending[1]
+
+        if hasattr(event, 'IN_MOVED_FROM') and \
+                not hasattr(event, 'IN_MOVED_TO'):
+            self._moves[event.cookie] = key
+
+    def flush(self, now=None, force=False):
+        """
+        :param now: current monotonic time
+        :param force: flush all the events regardless of the window
+        :return: list of events whose window has expired, in order of arrival
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        events = []
+        while self._pending:
+            key, (deadline, event) = next(iter(self._pending.items()))
+            if deadline > now and not force:
+                break
+
+            del self._pending[key]
+            if self._moves.get(event.cookie) == key:
+                del self._moves[event.cookie]
+            events.append(event)
+
+        return events
+
+
+def _created_and_deleted(pending, event):
+    """
+    :param pending: pending event of a path, an instance of Event
+    :param event: new event of the path, an instance of Event
+    :return: whether the path was created and then deleted within the window
+    """
+
+    return hasattr(event, 'IN_DELETE') and hasattr(pending, 'IN_CREATE') and \
+        not any(hasattr(pending, name) for name in
+                ('IN_DELETE', 'IN_MOVED_FROM', 'IN_MOVED_TO'))
@@ -0,0 +1,221 @@
+"""
+Provides non-blocking dispatch of filesystem events to subscribers
+"""
+
+import collections
+import logging
+import threading
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Backpressure policies applied when a subscriber queue is full
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+RESCAN = 'rescan'
+
+POLICIES = (BLOCK, DROP_OLDEST, RESCAN)
+
+
+def deliver(subscriber, events):
+    """
+    Pass events to a subscriber. Subscribers having `update_batch` method
+    receive the whole list, the others receive events one by one.
+    :param subscriber: an instance of subscriber
+    :param events: list of Event instances
+    :return:
+    """
+
+    update_batch = getattr(subscriber, 'update_batch', None)
+    if update_batch is not None:
+        update_batch(events)
+        return
+
+    for event in events:
+        subscriber.update(event)
+
+
+def top_folders(folders):
+    """
+    :param folders: iterable of full paths to folders
+    :return: sorted list of the folders without those lying inside others
+    """
+
+    result = []
+    for folder in sorted(set(folders)):
+        if result and _is_inside(folder, result[-1]):
+            continue
+        result.append(folder)
+
+    return result
+
+
+def _is_inside(folder, top_folder):
+    """
+    :param folder: full path to folder
+    :param top_folder: full path to folder
+    :return: True if the folder is the top folder or lies inside it
+    """
+
+    return folder == top_folder or \
+        folder.startswith(top_folder.rstrip('/') + '/')
+
+
+def _is_new_folder(event):
+    """
+    :param event: an instance of Event
+    :return: True if the event reports a folder created or moved in
+    """
+
+    return hasattr(event, 'IN_ISDIR') and \
+        (hasattr(event, 'IN_CREATE') or hasattr(event, 'IN_MOVED_TO'))
+
+
+# pylint: disable=too-many-instance-attributes
+class SubscriberQueue(object):
+    """
+    Bounded queue of event batches served by a worker thread
+
+    When the queue is full, the backpressure policy decides what happens:
+        - BLOCK: the producer waits until the subscriber catches up.
+        - DROP_OLDEST: the oldest batch is dropped.
+        - RESCAN: all the queued batches are dropped.
+    Folders of dropped events are never lost silently: once the batches
+    queued before the overflow are delivered, the worker calls `rescan`
+    with the subscriber, the list of folders whose entries have to be
+    rescanned and the list of folders created or moved in by the dropped
+    events, whose whole subtrees have to be rescanned.
+    """
+
+    def __init__(self, subscriber, rescan, size, policy=BLOCK):
+        """
+        :param subscriber: an instance of subscriber
+        :param rescan: callable which takes a subscriber, a list of folders
+        and a list of subtrees and delivers current state of the entries of
+        the folders and of the whole subtrees to the subscriber
+        :param size: max number of batches in the queue
+        :param policy: backpressure policy, one of POLICIES
+        """
+
+        if policy not in POLICIES:
+            raise ValueError('Unknown backpressure policy: {}'.format(policy))
+
+        self.subscriber = subscriber
+        self._rescan = rescan
+        self._size = size
+        self._policy = policy
+        self._batches = collections.deque()
+        self._lost = set()
+        self._changed = set()
+        # Batches queued before the last overflow, they are older than the
+        # resync of the lost folders, so they are delivered first
+        self._ahead = 0
+        self._condition = threading.Condition()
+        self._worker = None
+        self._closed = False
+        self.overflows = 0
+
+    def __len__(self):
+        return len(self._batches)
+
+    def put(self, events):
+        """
+        :param events: list of Event instances
+        :return:
+        """
+
+        with self._condition:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self.__serve,
+                                                name='subscriber-queue',
+                                                daemon=True)
+                self._worker.start()
+
+            if len(self._batches) >= self._size:
+                self.__overflow()
+
+            self._batches.append(events)
+            self._condition.notify_all()
+
+    def close(self):
+        """
+        Stop the worker once the queued batches are delivered
+        :return:
+        """
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def join(self, timeout=None):
+        """
+        Wait for the worker to stop
+        :param timeout: timeout in seconds
+        :return:
+        """
+
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def __overflow(self):
+        """
+        Make room in the full queue according to the policy
+        :return:
+        """
+
+        if self._policy == BLOCK:
+            while len(self._batches) >= self._size and not self._closed:
+                self._condition.wait()
+            return
+
+        self.overflows += 1
+        if self._policy == DROP_OLDEST:
+            dropped = [self._batches.popleft()]
+        else:
+            dropped = list(self._batches)
+            self._batches.clear()
+        self._ahead = len(self._batches)
+
+        LOGGER.warning('Subscriber %r queue overflow, %d batches dropped',
+                       self.subscriber, len(dropped))
+        for batch in dropped:
+            for event in batch:
+                self._lost.add(event.path)
+                if _is_new_folder(event):
+                    self._changed.add(event.file_path)
+
+    def __serve(self):
+        """
+        Deliver queued events to the subscriber
+        :return:
+        """
+
+        while True:
+            with self._condition:
+                while not self._batches and not self._lost and \
+                        not self._closed:
+                    self._condition.wait()
+
+                if self._lost and not self._ahead:
+                    subtrees = top_folders(self._changed)
+                    lost = [folder for folder in sorted(self._lost)
+                            if not any(_is_inside(folder, top)
+                                       for top in subtrees)]
+                    self._lost, self._changed = set(), set()
+                    events = None
+                elif self._batches:
+                    lost, subtrees = None, None
+                    events = self._batches.popleft()
+                    if self._ahead:
+                        self._ahead -= 1
+                    self._condition.notify_all()
+                else:
+                    return
+
+            try:
+                if lost is not None:
+                    self._rescan(self.subscriber, lost, subtrees)
+                else:
+                    deliver(self.subscriber, events)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception('Subscriber %r failed', self.subscriber)
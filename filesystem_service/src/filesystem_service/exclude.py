@@ -0,0 +1,176 @@
+"""
+Provides an index of folders excluded from monitoring
+"""
+
+import re
+
+
+_SEP = b'/'
+_END = None
+_WILDCARDS = re.compile(br'[*?[]')
+
+
+def _translate(pattern):
+    """
+    Translate glob pattern to regular expression
+
+    Unlike fnmatch, wildcards don't match path separators except '**'
+    :param pattern: glob pattern. Type: bytes
+    :return: regular expression. Type: bytes
+    """
+
+    index, length = 0, len(pattern)
+    result = []
+    while index < length:
+        char = pattern[index:index + 1]
+        index += 1
+        if char == b'*':
+            if pattern[index:index + 1] == b'*':
+                index += 1
+                result.append(b'.*')
+            else:
+                result.append(b'[^/]*')
+        elif char == b'?':
+            result.append(b'[^/]')
+        elif char == b'[':
+            end = pattern.find(b']', index + 1)
+            if end < 0:
+                result.append(b'\\[')
+                continue
+            chars = pattern[index:end].replace(b'\\', b'\\\\')
+            if chars.startswith(b'!'):
+                chars = b'^' + chars[1:]
+            result.append(b'[' + chars + b']')
+            index = end + 1
+        else:
+            result.append(re.escape(char))
+
+    return b''.join(result)
+
+
+# pylint: disable=too-many-instance-attributes
+class ExcludeIndex(object):
+    """
+    Index of folders excluded from monitoring together with their subtrees
+
+    Full paths are kept in a trie of path components and plain names in a
+    set, so a path is checked in O(path depth) regardless of the number of
+    excludes. Names and patterns without a slash (e.g. 'node_modules') match
+    any component of a path below the root, the others match the path from
+    its start. Glob patterns are compiled once into a single regular
+    expression.
+    """
+
+    def __init__(self, folders=(), root=None):
+        """
+        :param folders: initial folders or glob patterns. Type: bytes
+        :param root: monitored folder, names aren't matched against its
+        parents. Type: bytes
+        """
+
+        self._root = root.rstrip(_SEP) if root else b''
+        self._trie = {}
+        self._names = set()
+        self._items = []
+        self._name_patterns = []
+        self._path_patterns = []
+        self._name_regex = None
+        self._path_regex = None
+        for folder in folders:
+            self.add(folder)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __contains__(self, path):
+        return self.is_excluded(path)
+
+    def add(self, folder):
+        """
+        :param folder: full path to folder or glob pattern. Type: bytes
+        :return:
+        """
+
+        self._items.append(folder)
+        is_pattern = _WILDCARDS.search(folder) is not None
+        if _SEP not in folder:
+            if is_pattern:
+                self._name_patterns.append(_translate(folder))
+                self._name_regex = None
+            else:
+                self._names.add(folder)
+            return
+
+        if is_pattern:
+            self._path_patterns.append(_translate(folder.rstrip(_SEP)))
+            self._path_regex = None
+            return
+
+        node = self._trie
+        for name in self.__split(folder):
+            node = node.setdefault(name, {})
+        node[_END] = True
+
+    def is_excluded(self, path):
+        """
+        :param path: full path to folder. Type: bytes
+        :return: True if the path or one of its parents is excluded
+        """
+
+        names = self.__split(path)
+        relative = self.__relative(path)
+        if self._names and not self._names.isdisjoint(
+                names if relative is path else self.__split(relative)):
+            return True
+
+        node = self._trie
+        for name in names:
+            node = node.get(name)
+            if node is None:
+                break
+            if _END in node:
+                return True
+
+        if self._name_patterns:
+            if self._name_regex is None:
+                self._name_regex = re.compile(
+                    b'(?:^|/)(?:' + b'|'.join(self._name_patterns) +
+                    b')(?:/|$)'
+                )
+            if self._name_regex.search(relative):
+                return True
+
+        if self._path_patterns:
+            if self._path_regex is None:
+                self._path_regex = re.compile(
+                    b'(?:' + b'|'.join(self._path_patterns) + b')(?:/|$)'
+                )
+            if self._path_regex.match(path):
+                return True
+
+        return False
+
+    def __relative(self, path):
+        """
+        :param path: full path. Type: bytes
+        :return: part of the path below the root, the path itself if it's
+        outside of the root
+        """
+
+        root = self._root
+        if root and path.startswith(root) and \
+                path[len(root):len(root) + 1] in (b'', _SEP):
+            return path[len(root):]
+        return path
+
+    @staticmethod
+    def __split(path):
+        """
+        :param path: full path. Type: bytes
+        :return: list of path components
+        """
+
+        return [name for name in path.split(_SEP) if name]
@@ -0,0 +1,335 @@
+"""
+Provides monitoring of a whole filesystem with a single fanotify mark
+
+fanotify reports a directory entry event with a handle of the directory and
+the name of the entry (FAN_REPORT_DFID_NAME, Linux 5.9+), so there's no need
+for a watch per folder. Both fanotify_init and open_by_handle_at, which is
+used to resolve directory handles to paths, require CAP_SYS_ADMIN and
+CAP_DAC_READ_SEARCH, i.e. a root process or a privileged container.
+"""
+
+import collections
+import ctypes
+import logging
+import os
+import struct
+
+from .reader import BufferedReader, DEFAULT_BLOCK_DURATION, \
+    DEFAULT_BUFFER_SIZE, InotifyHeader
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 65536
+
+# fanotify_init flags
+FAN_CLOEXEC = 0x1
+FAN_CLASS_NOTIF = 0x0
+FAN_REPORT_DIR_FID = 0x400
+FAN_REPORT_NAME = 0x800
+FAN_REPORT_DFID_NAME = FAN_REPORT_DIR_FID | FAN_REPORT_NAME
+
+# fanotify_mark flags
+FAN_MARK_ADD = 0x1
+FAN_MARK_FILESYSTEM = 0x100
+
+# Event types share their values with the inotify ones
+FAN_MODIFY = 0x2
+FAN_ATTRIB = 0x4
+FAN_CLOSE_WRITE = 0x8
+FAN_MOVED_FROM = 0x40
+FAN_MOVED_TO = 0x80
+FAN_CREATE = 0x100
+FAN_DELETE = 0x200
+FAN_DELETE_SELF = 0x400
+FAN_MOVE_SELF = 0x800
+FAN_Q_OVERFLOW = 0x4000
+FAN_ONDIR = 0x40000000
+
+FAN_EVENTS = (FAN_MODIFY | FAN_ATTRIB | FAN_CLOSE_WRITE | FAN_MOVED_FROM |
+              FAN_MOVED_TO | FAN_CREATE | FAN_DELETE | FAN_DELETE_SELF |
+              FAN_MOVE_SELF | FAN_ONDIR)
+
+FAN_EVENT_INFO_TYPE_DFID_NAME = 2
+
+_AT_FDCWD = -100
+
+# struct fanotify_event_metadata
+_METADATA = struct.Struct('IBBHQii')
+# struct fanotify_event_info_header followed by __kernel_fsid_t
+_INFO = struct.Struct('BBH8x')
+# struct file_handle without f_handle
+_HANDLE = struct.Struct('Ii')
+
+_LIBC = ctypes.CDLL(None, use_errno=True)
+_LIBC.fanotify_init.argtypes = [ctypes.c_uint, ctypes.c_uint]
+_LIBC.fanotify_mark.argtypes = [ctypes.c_int, ctypes.c_uint,
+                                ctypes.c_uint64, ctypes.c_int,
+                                ctypes.c_char_p]
+_LIBC.open_by_handle_at.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                    ctypes.c_int]
+
+
+def _check(result):
+    """
+    :param result: result of a libc call
+    :return: the result
+    :raise OSError: the call has failed
+    """
+
+    if result < 0:
+        code = ctypes.get_errno()
+        raise OSError(code, os.strerror(code))
+
+    return result
+
+
+class HandleCache(object):
+    """
+    LRU cache of directory handles resolved to paths
+
+    Cached paths are indexed by their parent folders, so a moved or deleted
+    folder drops only the handles of its own subtree.
+    """
+
+    def __init__(self, mount_fd, size=DEFAULT_CACHE_SIZE):
+        """
+        :param mount_fd: descriptor of any file of the filesystem
+        :param size: max number of cached handles
+        """
+
+        self._mount_fd = mount_fd
+        self._size = size
+        self._paths = collections.OrderedDict()
+        self._handles = {}
+        # Parent folders to their children that are cached or have cached
+        # descendants
+        self._children = {}
+
+    def __len__(self):
+        return len(self._paths)
+
+    def resolve(self, handle):
+        """
+        :param handle: struct file_handle. Type: bytes
+        :return: full path to the directory, None if it has gone. Type: bytes
+        """
+
+        path = self._paths.get(handle)
+        if path is not None:
+            self._paths.move_to_end(handle)
+            return path
+
+        try:
+            descriptor = _check(_LIBC.open_by_handle_at(
+                self._mount_fd, handle, os.O_PATH | os.O_DIRECTORY
+            ))
+        except OSError as exc:
+            LOGGER.debug('Failed to resolve directory handle: %s', exc)
+            return None
+
+        try:
+            path = os.readlink('/proc/self/fd/{}'.format(descriptor).encode())
+        finally:
+            os.close(descriptor)
+
+        # The path may still be cached with the handle of a replaced folder
+        stale = self._handles.get(path)
+        if stale is not None:
+            del self._paths[stale]
+
+        self._paths[handle] = path
+        self._handles[path] = handle
+        self.__link(path)
+        if len(self._paths) > self._size:
+            _, evicted = self._paths.popitem(last=False)
+            del self._handles[evicted]
+            self.__unlink(evicted)
+
+        return path
+
+    def invalidate(self, path):
+        """
+        Forget a directory with its subtree, e.g. after it has been moved
+        :param path: full path to the directory. Type: bytes
+        :return:
+        """
+
+        stack = [path]
+        while stack:
+            folder = stack.pop()
+            handle = self._handles.pop(folder, None)
+            if handle is not None:
+                del self._paths[handle]
+            stack.extend(self._children.pop(folder, ()))
+
+        self.__unlink(path)
+
+    def __link(self, path):
+        """
+        Add a cached path to the children of its ancestors
+        :param path: full path to the directory. Type: bytes
+        :return:
+        """
+
+        parent = os.path.dirname(path)
+        while parent != path:
+            children = self._children.setdefault(parent, set())
+            if path in children:
+                break
+            children.add(path)
+            path, parent = parent, os.path.dirname(parent)
+
+    def __unlink(self, path):
+        """
+        Remove a path which is neither cached nor has cached descendants
+        from the children of its ancestors
+        :param path: full path to the directory. Type: bytes
+        :return:
+        """
+
+        while path not in self._handles and not self._children.get(path):
+            self._children.pop(path, None)
+            parent = os.path.dirname(path)
+            children = self._children.get(parent)
+            if parent == path or children is None:
+                break
+            children.discard(path)
+            path = parent
+
+
+class FanotifyReader(BufferedReader):
+    """
+    Replacement of inotify.adapters.Inotify which watches a whole filesystem
+
+    Events of the filesystem outside the root folder are skipped. Events are
+    yielded as (header, None, path, filename) tuples with inotify event types
+    in the header mask. fanotify has no move cookies, so a pair of
+    IN_MOVED_FROM/IN_MOVED_TO events gets a cookie of its own.
+    """
+
+    # A single mark covers all the subfolders of the root
+    RECURSIVE = True
+
+    def __init__(self, root, block_duration_s=DEFAULT_BLOCK_DURATION,
+                 buffer_size=DEFAULT_BUFFER_SIZE,
+                 cache_size=DEFAULT_CACHE_SIZE):
+        """
+        :param root: full path to the monitored folder. Type: bytes
+        :param block_duration_s: time in seconds to wait for events before
+        yielding None, or a callable returning it
+        :param buffer_size: size of the read buffer in bytes
+        :param cache_size: max number of directory paths cached
+        :raise OSError: fanotify isn't available, e.g. EPERM without
+        privileges or EINVAL on kernels older than 5.9
+        """
+
+        super(FanotifyReader, self).__init__(block_duration_s, buffer_size)
+        self._root = root.rstrip(b'/') or b'/'
+        self._prefix = self._root.rstrip(b'/') + b'/'
+        self._cookie = 0
+        self._mount_fd = None
+        try:
+            self._mount_fd = os.open(root, os.O_RDONLY | os.O_DIRECTORY)
+            self._fd = _check(_LIBC.fanotify_init(
+                FAN_CLASS_NOTIF | FAN_CLOEXEC | FAN_REPORT_DFID_NAME,
+                os.O_RDONLY
+            ))
+            _check(_LIBC.fanotify_mark(
+                self._fd, FAN_MARK_ADD | FAN_MARK_FILESYSTEM, FAN_EVENTS,
+                _AT_FDCWD, root
+            ))
+        except OSError:
+            self.close()
+            raise
+
+        self._handles = HandleCache(self._mount_fd, cache_size)
+        self._open(self._fd)
+
+    def close(self):
+        """
+        Release the fanotify descriptors
+        :return:
+        """
+
+        super(FanotifyReader, self).close()
+        if self._mount_fd is not None:
+            os.close(self._mount_fd)
+            self._mount_fd = None
+
+    def add_watch(self, path, mask=None):
+        """
+        Folders of the root are watched already
+        :param path: full path to folder. Type: bytes
+        :param mask: ignored
+        :return:
+        """
+
+    def remove_watch(self, path, superficial=False):
+        """
+        Folders of the root are watched until the reader is closed
+        :param path: full path to folder. Type: bytes
+        :param superficial: ignored
+        :return:
+        """
+
+    def parse(self, view):
+        """
+        :param view: chunk of whole fanotify events. Type: memoryview
+        :return: generator of (header, None, path, filename) events of the
+        root folder
+        """
+
+        offset, size = 0, len(view)
+        while offset < size:
+            (event_len, _, _, metadata_len, mask, _, _) = \
+                _METADATA.unpack_from(view, offset)
+            if mask & FAN_Q_OVERFLOW:
+                yield InotifyHeader(-1, mask, 0, 0), None, b'', b''
+            else:
+                event = self.__parse_event(
+                    mask, view[offset + metadata_len:offset + event_len]
+                )
+                if event is not None:
+                    yield event
+            offset += event_len
+
+    def __parse_event(self, mask, info):
+        """
+        :param mask: fanotify event types
+        :param info: information records of the event. Type: memoryview
+        :return: (header, None, path, filename) event, None if it's outside
+        the root folder
+        """
+
+        offset = 0
+        while offset < len(info):
+            (info_type, _, length) = _INFO.unpack_from(info, offset)
+            if info_type == FAN_EVENT_INFO_TYPE_DFID_NAME:
+                record = info[offset + _INFO.size:offset + length]
+                break
+            offset += length
+        else:
+            return None
+
+        (handle_bytes, _) = _HANDLE.unpack_from(record)
+        end = _HANDLE.size + handle_bytes
+        path = self._handles.resolve(bytes(record[:end]))
+        filename = bytes(record[end:]).split(b'\0', 1)[0]
+        if path is None or filename == b'.':
+            return None
+        if path != self._root and not path.startswith(self._prefix):
+            return None
+
+        if mask & FAN_ONDIR and mask & (FAN_MOVED_FROM | FAN_DELETE):
+            self._handles.invalidate(os.path.join(path, filename))
+
+        cookie = 0
+        if mask & FAN_MOVED_FROM:
+            self._cookie += 1
+            cookie = self._cookie
+        elif mask & FAN_MOVED_TO:
+            cookie = self._cookie
+
+        return (InotifyHeader(0, mask, cookie, len(filename)), None, path,
+                filename)
@@ -0,0 +1,83 @@
+"""
+Provides content hashes of local files as OneDrive computes them
+"""
+
+import collections
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import struct
+import zlib
+
+from onedrive_client.entities.hashing import QuickXorHash
+
+
+# Size of the buffer files are read by
+DEFAULT_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Fields of HashesFacet entity, raw bytes rather than encoded strings
+Hashes = collections.namedtuple('Hashes', ['crc32_hash', 'sha1_hash',
+                                           'quick_xor_hash'])
+
+_BUFFER = None
+
+
+def hash_file(path, buffer=None):
+    """
+    Compute all the hashes in a single pass over a file
+    :param path: full path to file
+    :param buffer: bytearray to read the file into, it's allocated once per
+    process if None
+    :return: an instance of Hashes
+    """
+
+    global _BUFFER  # pylint: disable=global-statement
+    if buffer is None:
+        if _BUFFER is None:
+            _BUFFER = bytearray(DEFAULT_BUFFER_SIZE)
+        buffer = _BUFFER
+
+    view = memoryview(buffer)
+    crc32 = 0
+    sha1 = hashlib.sha1()
+    quick_xor = QuickXorHash()
+    with open(path, 'rb', buffering=0) as stream:
+        while True:
+            size = stream.readinto(buffer)
+            if not size:
+                break
+            chunk = view[:size]
+            crc32 = zlib.crc32(chunk, crc32)
+            sha1.update(chunk)
+            quick_xor.update(chunk)
+
+    return Hashes(struct.pack('<I', crc32), sha1.digest(),
+                  quick_xor.digest())
+
+
+def hash_files(paths, workers=None, chunksize=16):
+    """
+    Compute hashes of files in a pool of processes
+    :param paths: iterable of full paths to files
+    :param workers: number of processes, number of CPUs if None
+    :param chunksize: number of files passed to a process at once
+    :return: generator of (path, Hashes) in the order of paths, Hashes is
+    None if the file couldn't be read
+    """
+
+    paths = list(paths)
+    with ProcessPoolExecutor(workers) as executor:
+        for path, hashes in zip(paths, executor.map(_hash_file, paths,
+                                                    chunksize=chunksize)):
+            yield path, hashes
+
+
+def _hash_file(path):
+    """
+    :param path: full path to file
+    :return: an instance of Hashes, None if the file couldn't be read
+    """
+
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
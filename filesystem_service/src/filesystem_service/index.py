@@ -0,0 +1,325 @@
+"""
+Provides persistent index of local files
+"""
+
+import collections
+import logging
+import os
+import sqlite3
+from stat import S_ISREG
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Number of changed files written to the database in a transaction
+DEFAULT_BATCH_SIZE = 10000
+
+# Size and modified time (ns) are the fields of LocalItemMetadata entity,
+# hashes are those of HashesFacet entity
+IndexEntry = collections.namedtuple('IndexEntry', [
+    'inode', 'size', 'modified', 'crc32_hash', 'sha1_hash', 'quick_xor_hash'
+])
+
+_NO_HASHES = (None, None, None)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    folder BLOB NOT NULL,
+    name BLOB NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    modified INTEGER NOT NULL,
+    crc32_hash BLOB,
+    sha1_hash BLOB,
+    quick_xor_hash BLOB,
+    PRIMARY KEY (folder, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_inode ON files (inode);
+"""
+
+_COLUMNS = ', '.join(IndexEntry._fields)
+
+
+def _subtree(folder):
+    """
+    :param folder: full path to folder. Type: bytes
+    :return: SQL condition and its parameters matching the folder with its
+    subfolders
+    """
+
+    prefix = folder.rstrip(b'/') + b'/'
+    # '0' follows '/' in ASCII, so the range covers all the subfolders
+    return ('(folder = ? OR (folder >= ? AND folder < ?))',
+            (folder, prefix, prefix[:-1] + b'0'))
+
+
+def _walk(root, is_excluded, visited):
+    """
+    :param root: full path to the root folder. Type: bytes
+    :param is_excluded: callable which takes a folder and returns True
+    if the folder isn't indexed
+    :param visited: set to add the walked folders to
+    :return: generator of (folder, entries) with os.DirEntry lists
+    """
+
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as iterator:
+                entries = list(iterator)
+        except OSError as exc:
+            LOGGER.debug('Failed to scan %r: %s', folder, exc)
+            continue
+
+        visited.add(folder)
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir and (is_excluded is None or
+                           not is_excluded(entry.path)):
+                stack.append(entry.path)
+
+        yield folder, entries
+
+
+class LocalIndex(object):
+    """
+    Persistent index of local files with their metadata and content hashes
+
+    Files are keyed by their folder and name. A refresh compares the index
+    with the tree and hashes only the files whose (inode, size, modified)
+    have changed, so a warm restart costs a stat per file.
+    """
+
+    def __init__(self, path, hasher=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        :param path: path to the database file, ':memory:' for a transient
+        index. Type: string
+        :param hasher: callable which takes a full path to file and returns
+        its (crc32_hash, sha1_hash, quick_xor_hash), e.g.
+        filesystem_service.hashing.hash_file. Hashes aren't stored if it's
+        None.
+        :param batch_size: max number of changed files written in a single
+        transaction
+        """
+
+        self._hasher = hasher
+        self._batch_size = batch_size
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(_SCHEMA)
+
+    def __len__(self):
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM files'
+        ).fetchone()[0]
+
+    def __contains__(self, path):
+        return self.get(path) is not None
+
+    def close(self):
+        """
+        Close the database
+        :return:
+        """
+
+        self._connection.close()
+
+    def get(self, path):
+        """
+        :param path: full path to file. Type: bytes
+        :return: an instance of IndexEntry, None if the file isn't indexed
+        """
+
+        folder, name = os.path.split(path)
+        row = self._connection.execute(
+            'SELECT {} FROM files WHERE folder = ? AND name = ?'.format(
+                _COLUMNS
+            ), (folder, name)
+        ).fetchone()
+
+        return None if row is None else IndexEntry(*row)
+
+    def find(self, inode):
+        """
+        :param inode: inode number
+        :return: list of full paths to the indexed files with the inode
+        """
+
+        return [os.path.join(folder, name) for folder, name in
+                self._connection.execute(
+                    'SELECT folder, name FROM files WHERE inode = ?', (inode,)
+                )]
+
+    def update(self, path):
+        """
+        Bring a single file up to date, e.g. after its event
+        :param path: full path to file. Type: bytes
+        :return: an instance of IndexEntry, None if it isn't a regular file
+        """
+
+        old = self.get(path)
+        try:
+            stat = os.stat(path, follow_symlinks=False)
+            entry = self.__entry(path, stat, old)
+        except OSError:
+            entry = None
+
+        with self._connection:
+            if entry is None:
+                self.__delete([path])
+            elif entry is not old:
+                self.__insert([(path, entry)])
+
+        return entry
+
+    def remove(self, path):
+        """
+        Drop a file or a folder with its subtree
+        :param path: full path to file or folder. Type: bytes
+        :return:
+        """
+
+        condition, parameters = _subtree(path)
+        with self._connection:
+            self.__delete([path])
+            self._connection.execute(
+                'DELETE FROM files WHERE ' + condition, parameters
+            )
+
+    def refresh(self, root, is_excluded=None):
+        """
+        Compare the index with the tree and bring it up to date
+        :param root: full path to the root folder. Type: bytes
+        :param is_excluded: callable which takes a folder and returns True
+        if the folder isn't indexed
+        :return: generator of (path, entry) of the changed files, the entry
+        is None if the file has gone. The changes are committed as the
+        generator is consumed.
+        """
+
+        visited = set()
+        changed, removed = [], []
+        try:
+            for folder, entries in _walk(root, is_excluded, visited):
+                for path, entry in self.__compare(folder, entries):
+                    if entry is None:
+                        removed.append(path)
+                    else:
+                        changed.append((path, entry))
+                    yield path, entry
+
+                if len(changed) + len(removed) >= self._batch_size:
+                    self.__commit(changed, removed)
+
+            condition, parameters = _subtree(root)
+            stale = [folder for (folder,) in self._connection.execute(
+                'SELECT DISTINCT folder FROM files WHERE ' + condition,
+                parameters
+            ) if folder not in visited]
+            for folder in stale:
+                for (name,) in self._connection.execute(
+                        'SELECT name FROM files WHERE folder = ?', (folder,)
+                ).fetchall():
+                    path = os.path.join(folder, name)
+                    removed.append(path)
+                    yield path, None
+        finally:
+            self.__commit(changed, removed)
+
+    def __compare(self, folder, entries):
+        """
+        :param folder: full path to folder. Type: bytes
+        :param entries: list of os.DirEntry of the folder
+        :return: list of (path, entry) of the changed files, the entry is
+        None if the file has gone
+        """
+
+        # Hashes aren't needed to find the changed files
+        known = {row[0]: row[1:] for row in self._connection.execute(
+            'SELECT name, inode, size, modified FROM files WHERE folder = ?',
+            (folder,)
+        )}
+
+        changes = []
+        for entry in entries:
+            old = known.pop(entry.name, None)
+            try:
+                new = self.__entry(entry.path,
+                                   entry.stat(follow_symlinks=False), old)
+            except OSError as exc:
+                LOGGER.debug('Failed to index %r: %s', entry.path, exc)
+                continue
+
+            if new is None:
+                if old is not None:
+                    changes.append((entry.path, None))
+            elif new is not old:
+                changes.append((entry.path, new))
+
+        for name in known:
+            changes.append((os.path.join(folder, name), None))
+
+        return changes
+
+    def __entry(self, path, stat, old):
+        """
+        :param path: full path to file. Type: bytes
+        :param stat: os.stat_result of the file
+        :param old: indexed IndexEntry of the file or its first three
+        fields, None if the file isn't indexed
+        :return: the old entry if the file hasn't changed, a new entry with
+        fresh hashes otherwise, None if it isn't a regular file
+        """
+
+        if not S_ISREG(stat.st_mode):
+            return None
+
+        if old is not None and \
+                old[:3] == (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+            return old
+
+        hashes = _NO_HASHES if self._hasher is None else self._hasher(path)
+        return IndexEntry(stat.st_ino, stat.st_size, stat.st_mtime_ns,
+                          *hashes)
+
+    def __commit(self, changed, removed):
+        """
+        Write changes to the database and clear the lists
+        :param changed: list of (path, entry) of new or changed files
+        :param removed: list of full paths to removed files
+        :return:
+        """
+
+        with self._connection:
+            self.__insert(changed)
+            self.__delete(removed)
+        del changed[:]
+        del removed[:]
+
+    def __insert(self, changed):
+        """
+        :param changed: list of (path, entry) of new or changed files
+        :return:
+        """
+
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO files (folder, name, {}) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)'.format(_COLUMNS),
+            (os.path.split(path) + tuple(entry) for path, entry in changed)
+        )
+
+    def __delete(self, removed):
+        """
+        :param removed: list of full paths to removed files
+        :return:
+        """
+
+        self._connection.executemany(
+            'DELETE FROM files WHERE folder = ? AND name = ?',
+            (os.path.split(path) for path in removed)
+        )
@@ -2,25 +2,124 @@
 Provides functionality to monitor local filesystem changes
 """
 
+import logging
 import os
 
 import inotify.adapters
+import inotify.calls
+import inotify.constants
 
+from .coalesce import EventCoalescer
+from .dispatch import BLOCK, deliver, SubscriberQueue
+from .exclude import ExcludeIndex
+from .fanotify import FanotifyReader
+from .reader import DEFAULT_BLOCK_DURATION, InotifyHeader, InotifyReader
+from .rescan import RescanEngine
+from .walker import FolderWalker
 
+
+LOGGER = logging.getLogger(__name__)
+
+# Sources of inotify events
+ADAPTER = 'adapter'
+NATIVE = 'native'
+FANOTIFY = 'fanotify'
+
+BACKENDS = (ADAPTER, NATIVE, FANOTIFY)
+
+# Number of watches added between reads of pending events while watches
+# of a large tree are set up
+WATCH_CHUNK_SIZE = 256
+
+
+def _make_notifier(backend, root, **kwargs):
+    """
+    :param backend: source of inotify events, one of BACKENDS
+    :param root: full path to the monitored folder. Type: bytes
+    :param kwargs: keyword arguments of the inotify adapter
+    :return: inotify adapter which reports queue overflows
+    """
+
+    if backend == FANOTIFY:
+        try:
+            return FanotifyReader(root, **kwargs)
+        except OSError as exc:
+            LOGGER.warning('fanotify is not available, falling back to '
+                           'inotify: %s', exc)
+            backend = NATIVE
+    if backend == NATIVE:
+        return InotifyReader(**kwargs)
+    if backend != ADAPTER:
+        raise ValueError('Unknown inotify backend: {}'.format(backend))
+
+    notifier = inotify.adapters.Inotify(**kwargs)
+    # The adapter drops events of unknown watch descriptors while
+    # the kernel reports a queue overflow with the descriptor -1
+    # pylint: disable=protected-access, no-member
+    notifier._Inotify__watches_r[-1] = b''
+
+    return notifier
+
+
+# pylint: disable=too-many-instance-attributes
 class FileSystemMonitor(object):
     """
     Monitor local filesystem changes and inform subscribers
     """
 
-    def __init__(self, folder):
+    # pylint: disable=too-many-arguments
+    def __init__(self, folder, progress=None, coalesce_window=0,
+                 queue_size=0, backpressure=BLOCK, track_state=False,
+                 backend=ADAPTER):
         """
         :param folder: folder to be watched. Type: string
+        :param progress: callable which takes a number of folders put under
+        watch so far, it's called periodically while watches are set up
+        :param coalesce_window: time window in seconds to merge events of
+        the same path within, 0 to pass every event as it comes
+        :param queue_size: max number of event batches queued for each
+        subscriber, 0 to notify subscribers synchronously
+        :param backpressure: policy applied to a full subscriber queue,
+        see filesystem_service.dispatch
+        :param track_state: keep the state of the whole tree, so a rescan
+        after an inotify queue overflow reports only the actual changes.
+        Otherwise everything found in the rescanned subtrees is reported.
+        :param backend: source of inotify events, one of BACKENDS. NATIVE
+        reads the inotify descriptor in large chunks, which keeps up with
+        heavy event streams at a lower CPU cost. FANOTIFY watches the whole
+        filesystem of the folder with a single mark instead of a watch per
+        folder, it needs root privileges and Linux 5.9+, otherwise NATIVE
+        is used.
         """
 
         self._root_folder = folder.encode()
-        self._exclude_folders = set()
+        self._exclude_folders = ExcludeIndex(root=self._root_folder)
         self._subscribers = set()
-        self._notifier = inotify.adapters.Inotify()
+        self._queues = {}
+        self._queue_size = queue_size
+        self._backpressure = backpressure
+        self._progress = progress
+        self._raw_events = 0
+        self._emitted_events = 0
+        self._track_state = track_state
+        self._rescan = RescanEngine(
+            is_excluded=self._exclude_folders.is_excluded
+        )
+
+        if coalesce_window:
+            self._coalescer = EventCoalescer(coalesce_window)
+            self._block_duration = min(coalesce_window, 1)
+        else:
+            self._coalescer = None
+            self._block_duration = DEFAULT_BLOCK_DURATION
+        # Events are read without waiting while watches are set up
+        self._setting_up = False
+        self._notifier = _make_notifier(
+            backend, self._root_folder,
+            block_duration_s=self.__get_block_duration
+        )
+        # The notifier watches subfolders on its own
+        self._recursive = getattr(self._notifier, 'RECURSIVE', False)
 
     @property
     def subscribers(self):
@@ -30,6 +129,16 @@ class FileSystemMonitor(object):
 
         return self._subscribers
 
+    @property
+    def stats(self):
+        """
+        :return: numbers of events received from inotify and emitted to
+        subscribers
+        """
+
+        return {'raw_events': self._raw_events,
+                'emitted_events': self._emitted_events}
+
     def subscribe(self, subs):
         """
         Register new subscriber
@@ -39,6 +148,10 @@ class FileSystemMonitor(object):
 
         if subs not in self.subscribers:
             self._subscribers.add(subs)
+            if self._queue_size:
+                self._queues[subs] = SubscriberQueue(
+                    subs, self.__resync, self._queue_size, self._backpressure
+                )
 
     def unsubscribe(self, subs):
         """
@@ -48,10 +161,15 @@ class FileSystemMonitor(object):
         """
 
         self._subscribers.remove(subs)
+        queue = self._queues.pop(subs, None)
+        if queue is not None:
+            queue.close()
 
     def add_exclude_folder(self, folder):
         """
-        :param folder:full path to folder. Type: string
+        Exclude folder with its subtree from monitoring
+        :param folder: full path to folder or glob pattern, patterns without
+        a slash match a folder name at any depth. Type: string
         :return:
         """
 
@@ -59,19 +177,29 @@ class FileSystemMonitor(object):
 
     def __gen_watch_list(self):
         """
-        :return: list of directoried to watch without excludes
+        :return: iterable of directories to watch without excludes
         """
 
-        return [res[0] for res in os.walk(self._root_folder)
-                if res[0] not in self._exclude_folders]
+        return FolderWalker(self._root_folder,
+                            is_excluded=self._exclude_folders.is_excluded,
+                            progress=self._progress)
 
-    def __add_watch(self, folder):
+    def __add_watch(self, folder, record=True):
         """
-        :param folder: full path to folder to be watched. Type: string
+        :param folder: full path to folder to be watched. Type: bytes
+        :param record: store the state of the folder if the state is tracked
         :return:
         """
 
-        self._notifier.add_watch(folder.encode())
+        try:
+            self._notifier.add_watch(folder)
+        except inotify.calls.InotifyError as exc:
+            # The folder has gone before the watch was added
+            LOGGER.debug('Failed to watch %r: %s', folder, exc)
+            return
+
+        if record and self._track_state:
+            self._rescan.record(folder)
 
     def __remove_watch(self, folder):
         """
@@ -88,41 +216,314 @@ class FileSystemMonitor(object):
         :return:
         """
 
-        for folder in self.__gen_watch_list():
-            self._notifier.add_watch(folder)
+        events = self._notifier.event_gen()
+        if self._recursive and not self._track_state:
+            self.__add_watch(self._root_folder)
+        else:
+            # Events of the folders watched so far are handled between
+            # chunks, so they don't wait for the whole tree to be set up
+            self._setting_up = True
+            try:
+                for count, folder in enumerate(self.__gen_watch_list(), 1):
+                    self.__add_watch(folder)
+                    if count % WATCH_CHUNK_SIZE == 0:
+                        self.__read_pending(events)
+            finally:
+                self._setting_up = False
+
+        for event in events:
+            self.__process(event)
+
+    def __get_block_duration(self):
+        """
+        :return: time in seconds for the notifier to wait for events
+        """
+
+        return 0 if self._setting_up else self._block_duration
+
+    def __read_pending(self, events):
+        """
+        Handle the events which are ready without waiting for more
+        :param events: generator of events of the notifier
+        :return:
+        """
+
+        for event in events:
+            self.__process(event)
+            if event is None:
+                return
+
+    def __process(self, event):
+        """
+        :param event: raw inotify event or None after a wait for events
+        :return:
+        """
+
+        if event:
+            self._raw_events += 1
+            self.__handle(Event(event))
+
+        if self._coalescer is not None:
+            self.__dispatch(self._coalescer.flush())
+
+    def __handle(self, file_object):
+        """
+        Process a raw inotify event
+        :param file_object: an instance of Event
+        :return:
+        """
+
+        path = file_object.raw_path
+        if hasattr(file_object, 'IN_Q_OVERFLOW'):
+            LOGGER.warning('Inotify queue overflow, rescanning watched '
+                           'folders')
+            self.__publish(file_object)
+            visited = set()
+            for folder, recursive in self._rescan.affected(
+                    self._root_folder):
+                self.__recover(folder, recursive, visited)
+            return
+
+        if self._recursive and self._exclude_folders.is_excluded(path):
+            return
+
+        if hasattr(file_object, 'IN_IGNORED'):
+            # The kernel has dropped the watch. Nothing is lost if the folder
+            # has gone, otherwise (e.g. it was unmounted) it's rescanned.
+            self._notifier.remove_watch(path, superficial=True)
+            if os.path.isdir(path):
+                self.__recover(path)
+            return
+
+        self._rescan.touch(path)
+        self._rescan.update(path, file_object.raw_filename)
+        self.__update_watches(file_object)
+        self.__publish(file_object)
+
+    def __recover(self, folder, recursive=True, visited=None):
+        """
+        Report changes of a subtree whose events were lost
+        :param folder: full path to folder. Type: bytes
+        :param recursive: rescan the whole subtree, otherwise the folder
+        and its new subfolders only
+        :param visited: set of folders rescanned so far, see
+        RescanEngine.rescan
+        :return:
+        """
+
+        for type_names, path, filename in self._rescan.rescan(
+                folder, recursive, visited):
+            file_object = _make_event(type_names, path, filename)
+            # The state of new folders is recorded by the rescan itself
+            self.__update_watches(file_object, record=False)
+            self.__publish(file_object)
+
+    def __publish(self, file_object):
+        """
+        Pass an event to subscribers or to the coalescing stage
+        :param file_object: an instance of Event
+        :return:
+        """
+
+        if self._coalescer is None:
+            self.__dispatch([file_object])
+        else:
+            self._coalescer.push(file_object)
+
+    def __update_watches(self, file_object, record=True):
+        """
+        Keep watches in line with the folders tree
+        :param file_object: an instance of Event
+        :param record: store the state of new folders if the state is tracked
+        :return:
+        """
+
+        # Removing a watch on folder 'cause it was deleted
+        if hasattr(file_object, 'IN_DELETE'):
+            self.__remove_watch(file_object.file_path)
+
+        # Adding a watch on folder 'cause we're being recursive
+        if hasattr(file_object, 'IN_CREATE') and \
+                os.path.isdir(file_object.file_path):
+            folder = os.path.join(file_object.raw_path,
+                                  file_object.raw_filename)
+            if not self._exclude_folders.is_excluded(folder):
+                self.__add_watch(folder, record)
+
+    def __dispatch(self, events):
+        """
+        Pass events to subscribers directly or through their queues
+        :param events: list of Event instances
+        :return:
+        """
+
+        if not events:
+            return
+
+        self._emitted_events += len(events)
+        for subscriber in self._subscribers:
+            queue = self._queues.get(subscriber)
+            if queue is None:
+                deliver(subscriber, events)
+            else:
+                queue.put(events)
+
+    def __resync(self, subscriber, folders, subtrees):
+        """
+        Deliver current state of folders to a subscriber that lost events
+
+        Every rescanned folder is reported with an IN_Q_OVERFLOW event
+        followed by IN_CREATE events of its entries. Only the entries of
+        the folders are rescanned, the subtrees are walked as a whole since
+        they were created or moved in while the events were lost.
+        :param subscriber: an instance of subscriber
+        :param folders: list of full paths to folders. Type: string
+        :param subtrees: list of full paths to folders. Type: string
+        :return:
+        """
+
+        for folder in folders:
+            self.__resync_folder(subscriber, folder.encode())
 
-        for event in self._notifier.event_gen():
-            if event:
-                for subscriber in self._subscribers:
-                    file_object = Event(event)
-                    subscriber.update(file_object)
+        is_excluded = self._exclude_folders.is_excluded
+        for top_folder in subtrees:
+            walker = FolderWalker(top_folder.encode(), is_excluded=is_excluded)
+            for folder in walker:
+                self.__resync_folder(subscriber, folder)
 
-                    # Removing a watch on folder 'cause it was deleted
-                    if hasattr(file_object, 'IN_DELETE'):
-                        self.__remove_watch(file_object.file_path)
+    @staticmethod
+    def __resync_folder(subscriber, folder):
+        """
+        Deliver current entries of a folder to a subscriber
+        :param subscriber: an instance of subscriber
+        :param folder: full path to folder. Type: bytes
+        :return:
+        """
+
+        events = [_make_event(['IN_Q_OVERFLOW', 'IN_ISDIR'], folder, b'')]
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    type_names = ['IN_CREATE']
+                    if entry.is_dir(follow_symlinks=False):
+                        type_names.append('IN_ISDIR')
+                    events.append(_make_event(type_names, folder, entry.name))
+        except OSError as exc:
+            LOGGER.debug('Failed to rescan %r: %s', folder, exc)
+            return
 
-                    # Adding a watch on folder 'cause we're being recursive
-                    if hasattr(file_object, 'IN_CREATE') and \
-                            os.path.isdir(file_object.file_path):
-                        self.__add_watch(file_object.file_path)
+        deliver(subscriber, events)
+
+
+def _make_event(type_names, path, filename):
+    """
+    Make a synthetic event
+    :param type_names: list of inotify event types
+    :param path: full path to folder. Type: bytes
+    :param filename: name of the file in the folder. Type: bytes
+    :return: an instance of Event
+    """
+
+    return Event((InotifyHeader(wd=-1, mask=0, cookie=0, len=len(filename)),
+                  type_names, path, filename))
+
+
+_MASKS = {name: bit for bit, name in inotify.constants.MASK_LOOKUP.items()}
+_NAMES_MASKS = {}
+
+
+def _names_to_mask(type_names):
+    """
+    :param type_names: list of inotify event types
+    :return: bitmask of the event types
+    """
+
+    key = tuple(type_names)
+    mask = _NAMES_MASKS.get(key)
+    if mask is None:
+        mask = 0
+        for name in key:
+            mask |= _MASKS[name]
+        _NAMES_MASKS[key] = mask
+
+    return mask
 
 
-# pylint: disable=too-few-public-methods, too-many-instance-attributes
 class Event(object):
     """
     Object of local filesystem event
+
+    Event types are kept as a bitmask and are exposed as attributes,
+    e.g. `hasattr(event, 'IN_CREATE')`. Paths are decoded on first access.
     """
 
+    __slots__ = ('cookie', 'mask', 'src_path', 'raw_path', 'raw_filename',
+                 '_path', '_filename', '_file_path')
+
     def __init__(self, event):
         """
-        :param event:  inotify event
+        :param event: inotify event, event types are taken from the header
+        mask if type names are None
         """
 
         (header, type_names, path, filename) = event
         self.cookie = header.cookie
-        self.path = path.decode('utf-8')
-        self.filename = filename.decode('utf-8')
-        self.file_path = os.path.join(self.path, self.filename)
-        for i_event in type_names:
-            if not hasattr(self, i_event):
-                setattr(self, i_event, True)
+        if type_names is None:
+            self.mask = header.mask
+        else:
+            self.mask = _names_to_mask(type_names)
+        self.src_path = None
+        self.raw_path = path
+        self.raw_filename = filename
+        self._path = None
+        self._filename = None
+        self._file_path = None
+
+    def __getattr__(self, name):
+        bit = _MASKS.get(name)
+        if bit is not None and self.mask & bit:
+            return True
+
+        raise AttributeError(name)
+
+    @property
+    def path(self):
+        """
+        :return: full path to the folder of the event. Type: string
+        """
+
+        if self._path is None:
+            self._path = self.raw_path.decode('utf-8')
+
+        return self._path
+
+    @property
+    def filename(self):
+        """
+        :return: name of the file in the folder. Type: string
+        """
+
+        if self._filename is None:
+            self._filename = self.raw_filename.decode('utf-8')
+
+        return self._filename
+
+    @property
+    def file_path(self):
+        """
+        :return: full path to the file. Type: string
+        """
+
+        if self._file_path is None:
+            self._file_path = os.path.join(self.path, self.filename)
+
+        return self._file_path
+
+    def merge(self, other):
+        """
+        Add event types of another event of the same path
+        :param other: an instance of Event
+        :return:
+        """
+
+        self.mask |= other.mask
@@ -0,0 +1,181 @@
+"""
+Provides batched reading of inotify events straight from its descriptor
+"""
+
+import abc
+import collections
+import logging
+import os
+import select
+import struct
+
+import inotify.calls
+import inotify.constants
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_DURATION = 1
+# Room for a few thousand events, the kernel returns only whole ones
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+_HEADER = struct.Struct('iIII')
+
+InotifyHeader = collections.namedtuple('InotifyHeader',
+                                       ['wd', 'mask', 'cookie', 'len'])
+
+
+class BufferedReader(object, metaclass=abc.ABCMeta):
+    """
+    Base of readers of event descriptors in large chunks
+
+    A readable descriptor is read once into a preallocated buffer and all
+    the events of the chunk are parsed in place through a memoryview.
+    Event types are left in the header mask, so events are yielded as
+    (header, None, path, filename) tuples.
+    """
+
+    def __init__(self, block_duration_s=DEFAULT_BLOCK_DURATION,
+                 buffer_size=DEFAULT_BUFFER_SIZE):
+        """
+        :param block_duration_s: time in seconds to wait for events before
+        yielding None, or a callable returning it
+        :param buffer_size: size of the read buffer in bytes
+        """
+
+        self._block_duration = block_duration_s
+        self._buffer = bytearray(buffer_size)
+        self._fd = None
+        self._epoll = None
+
+    def __del__(self):
+        self.close()
+
+    def _open(self, descriptor):
+        """
+        :param descriptor: event descriptor to be read
+        :return:
+        """
+
+        self._fd = descriptor
+        self._epoll = select.epoll()
+        self._epoll.register(self._fd, select.EPOLLIN)
+
+    def close(self):
+        """
+        Release the event descriptor
+        :return:
+        """
+
+        if self._epoll is not None:
+            self._epoll.close()
+            self._epoll = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def read(self):
+        """
+        Read a chunk of events, blocks while there are none
+        :return: list of (header, None, path, filename) events
+        """
+
+        try:
+            size = os.readv(self._fd, [self._buffer])
+        except InterruptedError:
+            return []
+
+        return list(self.parse(memoryview(self._buffer)[:size]))
+
+    @abc.abstractmethod
+    def parse(self, view):
+        """
+        :param view: chunk of whole events. Type: memoryview
+        :return: generator of (header, None, path, filename) events
+        """
+
+    def event_gen(self):
+        """
+        :return: endless generator of events, None is yielded after every
+        wait for events
+        """
+
+        while True:
+            duration = self._block_duration
+            if callable(duration):
+                duration = duration()
+            if self._epoll.poll(duration):
+                yield from self.read()
+
+            yield None
+
+
+class InotifyReader(BufferedReader):
+    """
+    Replacement of inotify.adapters.Inotify which reads the inotify
+    descriptor in large chunks
+    """
+
+    # Every folder needs a watch of its own
+    RECURSIVE = False
+
+    def __init__(self, block_duration_s=DEFAULT_BLOCK_DURATION,
+                 buffer_size=DEFAULT_BUFFER_SIZE):
+        """
+        :param block_duration_s: time in seconds to wait for events before
+        yielding None, or a callable returning it
+        :param buffer_size: size of the read buffer in bytes
+        """
+
+        super(InotifyReader, self).__init__(block_duration_s, buffer_size)
+        self._watches = {}
+        # The kernel reports a queue overflow with the descriptor -1
+        self._paths = {-1: b''}
+        self._open(inotify.calls.inotify_init())
+
+    def add_watch(self, path, mask=inotify.constants.IN_ALL_EVENTS):
+        """
+        :param path: full path to folder. Type: bytes
+        :param mask: inotify event types to watch
+        :return:
+        """
+
+        descriptor = inotify.calls.inotify_add_watch(self._fd, path, mask)
+        self._watches[path] = descriptor
+        self._paths[descriptor] = path
+
+    def remove_watch(self, path, superficial=False):
+        """
+        :param path: full path to folder. Type: bytes
+        :param superficial: forget the watch only, e.g. when the kernel has
+        already removed it
+        :return:
+        """
+
+        descriptor = self._watches.pop(path, None)
+        if descriptor is None:
+            return
+
+        if self._paths.get(descriptor) == path:
+            del self._paths[descriptor]
+        if not superficial:
+            inotify.calls.inotify_rm_watch(self._fd, descriptor)
+
+    def parse(self, view):
+        """
+        :param view: chunk of whole inotify events. Type: memoryview
+        :return: generator of (header, None, path, filename) events of
+        known watch descriptors
+        """
+
+        paths = self._paths
+        offset, size = 0, len(view)
+        while offset < size:
+            header = InotifyHeader._make(_HEADER.unpack_from(view, offset))
+            offset += _HEADER.size
+            end = offset + header.len
+            path = paths.get(header.wd)
+            if path is not None:
+                filename = bytes(view[offset:end]).rstrip(b'\0')
+                yield header, None, path, filename
+            offset = end
@@ -0,0 +1,235 @@
+"""
+Provides incremental rescan of folders whose inotify events were lost
+"""
+
+import collections
+import logging
+import os
+from stat import S_ISDIR
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_ACTIVITY_WINDOW = 60
+
+EntryState = collections.namedtuple('EntryState',
+                                    ['inode', 'size', 'mtime', 'is_dir'])
+
+
+def _scan(folder):
+    """
+    :param folder: full path to folder. Type: bytes
+    :return: dict of entry names to their EntryState, None if the folder
+    can't be read
+    """
+
+    state = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                state[entry.name] = EntryState(stat.st_ino, stat.st_size,
+                                               stat.st_mtime_ns, is_dir)
+    except OSError as exc:
+        LOGGER.debug('Failed to scan %r: %s', folder, exc)
+        return None
+
+    return state
+
+
+def _type_names(name, entry):
+    """
+    :param name: inotify event type
+    :param entry: an instance of EntryState
+    :return: list of inotify event types
+    """
+
+    return [name, 'IN_ISDIR'] if entry.is_dir else [name]
+
+
+class RescanEngine(object):
+    """
+    Keeps the last known state of watched folders and the folders that had
+    events recently, so lost events could be restored by rescanning the
+    recently active folders, or the whole watched tree if there were none.
+
+    The state of a folder is a dict of entry names to (inode, size, mtime,
+    is_dir). A rescan compares it with the current state and reports the
+    differences as inotify-like (type_names, path, filename) tuples.
+    """
+
+    def __init__(self, is_excluded=None,
+                 activity_window=DEFAULT_ACTIVITY_WINDOW):
+        """
+        :param is_excluded: callable which takes a folder and returns True
+        if the folder isn't monitored
+        :param activity_window: time in seconds a folder is rescanned first
+        on a queue overflow after its last event
+        """
+
+        self._is_excluded = is_excluded
+        self._activity_window = activity_window
+        self._folders = {}
+        self._active = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._folders)
+
+    def touch(self, folder, now=None):
+        """
+        Note an event in a folder
+        :param folder: full path to folder. Type: bytes
+        :param now: current monotonic time
+        :return:
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        self._active.pop(folder, None)
+        self._active[folder] = now
+
+        expired = now - self._activity_window
+        while self._active:
+            oldest, touched = next(iter(self._active.items()))
+            if touched >= expired:
+                break
+            del self._active[oldest]
+
+    def affected(self, root, now=None):
+        """
+        :param root: root folder of the monitor. Type: bytes
+        :param now: current monotonic time
+        :return: sorted list of (folder, recursive) pairs to be rescanned.
+        Folders that had events within the activity window are rescanned
+        alone since lost events most likely concern them, the root is
+        rescanned recursively only if there was no recent activity
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        expired = now - self._activity_window
+        folders = sorted(folder for folder, touched in self._active.items()
+                         if touched >= expired)
+        self._active.clear()
+
+        if not folders:
+            return [(root, True)]
+
+        return [(folder, False) for folder in folders]
+
+    def record(self, folder):
+        """
+        Store the current state of a folder
+        :param folder: full path to folder. Type: bytes
+        :return:
+        """
+
+        state = _scan(folder)
+        if state is not None:
+            self._folders[folder] = state
+
+    def update(self, folder, name):
+        """
+        Refresh the state of a single entry after its event
+        :param folder: full path to folder. Type: bytes
+        :param name: name of the entry. Type: bytes
+        :return:
+        """
+
+        state = self._folders.get(folder)
+        if state is None or not name:
+            return
+
+        path = os.path.join(folder, name)
+        try:
+            stat = os.lstat(path)
+        except OSError:
+            entry = state.pop(name, None)
+            if entry is not None and entry.is_dir:
+                self.forget(path)
+            return
+
+        entry = EntryState(stat.st_ino, stat.st_size, stat.st_mtime_ns,
+                           S_ISDIR(stat.st_mode))
+        old = state.get(name)
+        if old is not None and old.is_dir and old.inode != entry.inode:
+            self.forget(path)
+        state[name] = entry
+
+    def forget(self, folder):
+        """
+        Drop the state of a folder with its subtree
+        :param folder: full path to folder. Type: bytes
+        :return:
+        """
+
+        state = self._folders.pop(folder, None)
+        if state is None:
+            return
+
+        for name, entry in state.items():
+            if entry.is_dir:
+                self.forget(os.path.join(folder, name))
+
+    # pylint: disable=too-many-branches
+    def rescan(self, folder, recursive=True, visited=None):
+        """
+        Compare the subtree of a folder with its last known state
+        :param folder: full path to folder. Type: bytes
+        :param recursive: rescan all subfolders, otherwise only those
+        which are new or replaced according to the known state
+        :param visited: set of folders already rescanned, they are skipped
+        and the rescanned ones are added to it
+        :return: generator of (type_names, path, filename) differences,
+        the state is updated as the generator is consumed
+        """
+
+        stack = [folder]
+        while stack:
+            folder = stack.pop()
+            if visited is not None:
+                if folder in visited:
+                    continue
+                visited.add(folder)
+            has_state = folder in self._folders
+            known = self._folders.get(folder, {})
+            current = _scan(folder)
+            if current is None:
+                self.forget(folder)
+                continue
+
+            for name, entry in current.items():
+                old = known.get(name)
+                if old is None:
+                    yield _type_names('IN_CREATE', entry), folder, name
+                elif old.inode != entry.inode or old.is_dir != entry.is_dir:
+                    yield _type_names('IN_DELETE', old), folder, name
+                    yield _type_names('IN_CREATE', entry), folder, name
+                    if old.is_dir:
+                        self.forget(os.path.join(folder, name))
+                elif not entry.is_dir and (old.size != entry.size or
+                                           old.mtime != entry.mtime):
+                    yield ['IN_MODIFY'], folder, name
+
+                if entry.is_dir:
+                    path = os.path.join(folder, name)
+                    if recursive or (has_state and
+                                     path not in self._folders):
+                        if self._is_excluded is None or \
+                                not self._is_excluded(path):
+                            stack.append(path)
+
+            for name in known.keys() - current.keys():
+                old = known[name]
+                yield _type_names('IN_DELETE', old), folder, name
+                if old.is_dir:
+                    self.forget(os.path.join(folder, name))
+
+            self._folders[folder] = current
@@ -0,0 +1,199 @@
+"""
+Provides streaming traversal of a local folder tree
+"""
+
+import logging
+import os
+import queue
+import threading
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_PROGRESS_INTERVAL = 10000
+
+_DONE = object()
+
+
+# pylint: disable=too-few-public-methods, too-many-instance-attributes
+class FolderWalker(object):
+    """
+    Stream folders of a tree with os.scandir
+
+    The tree is walked depth-first by a background thread which holds only
+    the scandir iterators of the current branch. Found folders are passed
+    to the consumer through a bounded queue in chunks, so the memory usage
+    doesn't depend on the size of the tree and the consumer can start
+    working with the first folders while the rest of the tree is walked.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, root, is_excluded=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 chunk_size=DEFAULT_CHUNK_SIZE, progress=None,
+                 progress_interval=DEFAULT_PROGRESS_INTERVAL):
+        """
+        :param root: root folder of the tree. Type: bytes
+        :param is_excluded: callable which takes a folder and returns True
+        if the folder has to be skipped together with its subtree
+        :param queue_size: max number of chunks waiting for the consumer
+        :param chunk_size: max number of folders in a chunk
+        :param progress: callable which takes a number of folders walked
+        so far, it's called every `progress_interval` folders and once the
+        walk is finished
+        :param progress_interval: number of folders between progress reports
+        """
+
+        self._root = root
+        self._is_excluded = is_excluded
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._chunk_size = chunk_size
+        self._progress = progress
+        self._progress_interval = progress_interval
+        self._stop = threading.Event()
+        self._error = None
+        self.count = 0
+
+    def __iter__(self):
+        """
+        :return: generator of folders in the tree, root folder comes first
+        """
+
+        producer = threading.Thread(target=self.__produce,
+                                    name='folder-walker', daemon=True)
+        producer.start()
+
+        try:
+            while True:
+                chunk = self._queue.get()
+                if chunk is _DONE:
+                    break
+
+                for folder in chunk:
+                    yield folder
+
+                    self.count += 1
+                    if self.count % self._progress_interval == 0:
+                        self.__report()
+        finally:
+            self._stop.set()
+
+        producer.join()
+        if self._error is not None:
+            raise self._error  # pylint: disable=raising-bad-type
+
+        self.__report()
+
+    def __report(self):
+        """
+        Report walk progress
+        :return:
+        """
+
+        LOGGER.debug('%d folders walked in %r', self.count, self._root)
+        if self._progress is not None:
+            self._progress(self.count)
+
+    def __put(self, item):
+        """
+        :param item: chunk of folders or end-of-walk marker
+        :return: False if the consumer has gone away
+        """
+
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def __produce(self):
+        """
+        Walk the tree and fill the queue
+        :return:
+        """
+
+        try:
+            self.__walk()
+        except Exception as exc:  # pylint: disable=broad-except
+            self._error = exc
+        finally:
+            self.__put(_DONE)
+
+    @staticmethod
+    def __scandir(folder):
+        """
+        :param folder: full path to folder. Type: bytes
+        :return: scandir iterator or None if the folder can't be read
+        """
+
+        try:
+            return os.scandir(folder)
+        except OSError as exc:
+            LOGGER.debug('Skipping %r: %s', folder, exc)
+            return None
+
+    def __walk(self):  # pylint: disable=too-many-branches
+        """
+        Depth-first walk of the tree
+        :return:
+        """
+
+        if self.__is_excluded(self._root):
+            return
+
+        root_iterator = self.__scandir(self._root)
+        if root_iterator is None:
+            return
+
+        chunk = [self._root]
+        stack = [root_iterator]
+
+        while stack:
+            try:
+                entry = next(stack[-1])
+            except StopIteration:
+                stack.pop().close()
+                continue
+            except OSError as exc:
+                LOGGER.debug('Failed to read folder entry: %s', exc)
+                stack.pop().close()
+                continue
+
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+
+            if not is_dir:
+                continue
+
+            if self.__is_excluded(entry.path):
+                continue
+
+            chunk.append(entry.path)
+            if len(chunk) >= self._chunk_size:
+                if not self.__put(chunk):
+                    break
+                chunk = []
+
+            iterator = self.__scandir(entry.path)
+            if iterator is not None:
+                stack.append(iterator)
+
+        for iterator in stack:
+            iterator.close()
+
+        if chunk:
+            self.__put(chunk)
+
+    def __is_excluded(self, folder):
+        """
+        :param folder: full path to folder. Type: bytes
+        :return: True if the folder has to be skipped
+        """
+
+        return self._is_excluded is not None and self._is_excluded(folder)
@@ -0,0 +1,139 @@
+"""
+Module with unittests for the filesystem events coalescing
+"""
+
+import unittest
+
+from filesystem_service.coalesce import EventCoalescer
+
+from .utils.monitor import gen_event_object
+
+
+class EventCoalescerTest(unittest.TestCase):
+    """
+    Tests for the filesystem events coalescing
+    """
+
+    def setUp(self):
+        self.coalescer = EventCoalescer(1)
+
+    def test_merge_burst(self):
+        """
+        Events of the same path within the window are merged into one
+        """
+
+        self.coalescer.push(gen_event_object(['IN_CREATE']), now=0)
+        for _ in range(100):
+            self.coalescer.push(gen_event_object(['IN_MODIFY']), now=0.5)
+        self.coalescer.push(gen_event_object(['IN_CLOSE_WRITE']), now=0.9)
+
+        self.assertEqual(self.coalescer.flush(now=0.9), [])
+
+        events = self.coalescer.flush(now=1)
+        self.assertEqual(len(events), 1)
+        for attr in ['IN_CREATE', 'IN_MODIFY', 'IN_CLOSE_WRITE']:
+            self.assertTrue(hasattr(events[0], attr), attr)
+
+    def test_window_of_first_event(self):
+        """
+        Continuous events of a path are emitted once per window
+        """
+
+        self.coalescer.push(gen_event_object(['IN_MODIFY']), now=0)
+        self.coalescer.push(gen_event_object(['IN_MODIFY']), now=0.9)
+        self.assertEqual(len(self.coalescer.flush(now=1)), 1)
+
+        self.coalescer.push(gen_event_object(['IN_MODIFY']), now=1.5)
+        self.assertEqual(len(self.coalescer.flush(now=2.5)), 1)
+
+    def test_keep_order_of_paths(self):
+        """
+        Events of different paths aren't merged and keep their order
+        """
+
+        for filename in [b'b', b'a', b'b', b'c']:
+            self.coalescer.push(gen_event_object(['IN_MODIFY'], filename),
+                                now=0)
+
+        events = self.coalescer.flush(now=1)
+        self.assertEqual([event.filename for event in events],
+                         ['b', 'a', 'c'])
+
+    def test_fold_move(self):
+        """
+        IN_MOVED_FROM/IN_MOVED_TO pair with the same cookie becomes one event
+        """
+
+        self.coalescer.push(
+            gen_event_object(['IN_MOVED_FROM'], b'old', cookie=7), now=0
+        )
+        self.coalescer.push(
+            gen_event_object(['IN_MOVED_TO'], b'new', cookie=7), now=0.1
+        )
+
+        events = self.coalescer.flush(force=True)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].file_path, '/tmp/onedrive/new')
+        self.assertEqual(events[0].src_path, '/tmp/onedrive/old')
+        self.assertTrue(hasattr(events[0], 'IN_MOVED_FROM'))
+        self.assertTrue(hasattr(events[0], 'IN_MOVED_TO'))
+
+    def test_unpaired_move(self):
+        """
+        IN_MOVED_FROM without a pair is emitted as is once the window expires
+        """
+
+        self.coalescer.push(
+            gen_event_object(['IN_MOVED_FROM'], b'old', cookie=7), now=0
+        )
+        self.assertEqual(len(self.coalescer.flush(now=1)), 1)
+
+        self.coalescer.push(
+            gen_event_object(['IN_MOVED_TO'], b'new', cookie=7), now=1
+        )
+        events = self.coalescer.flush(force=True)
+        self.assertEqual(len(events), 1)
+        self.assertIsNone(events[0].src_path)
+
+    def test_move_over_pending(self):
+        """
+        A file renamed over a path with a pending event keeps its source
+        """
+
+        self.coalescer.push(gen_event_object(['IN_MODIFY'], b'new'), now=0)
+        self.coalescer.push(
+            gen_event_object(['IN_MOVED_FROM'], b'old', cookie=7), now=0.1
+        )
+        self.coalescer.push(
+            gen_event_object(['IN_MOVED_TO'], b'new', cookie=7), now=0.2
+        )
+
+        events = self.coalescer.flush(force=True)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].file_path, '/tmp/onedrive/new')
+        self.assertEqual(events[0].src_path, '/tmp/onedrive/old')
+        self.assertTrue(hasattr(events[0], 'IN_MOVED_TO'))
+
+    def test_create_and_delete(self):
+        """
+        A file created and deleted within the window isn't reported
+        """
+
+        self.coalescer.push(gen_event_object(['IN_CREATE']), now=0)
+        self.coalescer.push(gen_event_object(['IN_MODIFY']), now=0.1)
+        self.coalescer.push(gen_event_object(['IN_DELETE']), now=0.2)
+
+        self.assertEqual(self.coalescer.flush(force=True), [])
+
+    def test_delete_and_create(self):
+        """
+        A file deleted and created again is reported as created
+        """
+
+        self.coalescer.push(gen_event_object(['IN_DELETE']), now=0)
+        self.coalescer.push(gen_event_object(['IN_CREATE']), now=0.1)
+
+        events = self.coalescer.flush(force=True)
+        self.assertEqual(len(events), 1)
+        self.assertTrue(hasattr(events[0], 'IN_CREATE'))
+        self.assertFalse(hasattr(events[0], 'IN_DELETE'))
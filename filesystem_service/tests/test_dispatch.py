@@ -0,0 +1,256 @@
+"""
+Module with unittests for the non-blocking dispatch of events
+"""
+# pylint: disable=protected-access, no-member
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from filesystem_service.dispatch import BLOCK, DROP_OLDEST, RESCAN, \
+    SubscriberQueue, top_folders
+from filesystem_service.monitor import FileSystemMonitor
+
+from .utils.monitor import gen_event_object
+
+
+class SlowSubscriber(object):
+    """
+    Subscriber emulator which waits for a permission to handle events
+    """
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.batches = []
+        self.rescans = []
+        self.log = []
+        self.done = threading.Event()
+
+    def update_batch(self, events):
+        """
+        :param events: list of events
+        """
+
+        self.gate.wait()
+        self.batches.append(events)
+        self.log.append(events[0].filename)
+        self.done.set()
+
+    def rescan(self, subscriber, folders, subtrees):
+        """
+        :param subscriber: an instance of subscriber
+        :param folders: list of folders to rescan
+        :param subtrees: list of subtrees to rescan
+        """
+
+        assert subscriber is self
+        self.rescans.append((folders, subtrees))
+        self.log.append(None)
+
+
+def fill(policy, size=2, batches=5):
+    """
+    :param policy: backpressure policy
+    :param size: size of the queue
+    :param batches: number of batches to put
+    :return: tuple of subscriber and its queue after the batches are put
+    """
+
+    subscriber = SlowSubscriber()
+    queue = SubscriberQueue(subscriber, subscriber.rescan, size, policy)
+    for index in range(batches):
+        queue.put([gen_event_object(filename=str(index).encode())])
+
+    return subscriber, queue
+
+
+def drain(subscriber, queue):
+    """
+    :param subscriber: an instance of SlowSubscriber
+    :param queue: subscriber's queue
+    """
+
+    subscriber.gate.set()
+    queue.close()
+    queue.join(5)
+
+
+class SubscriberQueueTest(unittest.TestCase):
+    """
+    Tests for the subscriber queue
+    """
+
+    def assert_rescanned(self, subscriber):
+        """
+        :param subscriber: an instance of SlowSubscriber
+        """
+
+        # The worker may rescan between overflows
+        self.assertTrue(subscriber.rescans)
+        for rescan in subscriber.rescans:
+            self.assertEqual(rescan, (['/tmp/onedrive'], []))
+
+    def test_deliver_in_order(self):
+        """
+        Events are delivered in order while the queue isn't full
+        """
+
+        subscriber, queue = fill(DROP_OLDEST, size=10)
+        drain(subscriber, queue)
+
+        self.assertEqual([batch[0].filename for batch in subscriber.batches],
+                         ['0', '1', '2', '3', '4'])
+        self.assertFalse(subscriber.rescans)
+        self.assertEqual(queue.overflows, 0)
+
+    def test_drop_oldest(self):
+        """
+        The oldest batches are dropped and their folders are rescanned
+        """
+
+        subscriber, queue = fill(DROP_OLDEST)
+        drain(subscriber, queue)
+
+        self.assertGreater(queue.overflows, 0)
+        self.assertEqual(subscriber.batches[-1][0].filename, '4')
+        self.assertLess(len(subscriber.batches), 5)
+        self.assert_rescanned(subscriber)
+
+    def test_drop_oldest_order(self):
+        """
+        Batches queued before an overflow are delivered before the rescan
+        """
+
+        subscriber, queue = fill(DROP_OLDEST, size=3)
+        drain(subscriber, queue)
+
+        delivered = subscriber.log[:-2]
+        self.assertEqual(subscriber.log[-2:], [None, '4'])
+        self.assertEqual(delivered, sorted(delivered))
+        self.assertEqual(len(subscriber.rescans), 1)
+
+    def test_collapse_to_rescan(self):
+        """
+        All the queued batches are dropped and their folders are rescanned
+        """
+
+        subscriber, queue = fill(RESCAN)
+        drain(subscriber, queue)
+
+        self.assertGreater(queue.overflows, 0)
+        self.assertEqual(subscriber.batches[-1][0].filename, '4')
+        self.assert_rescanned(subscriber)
+
+    def test_rescan_new_folders(self):
+        """
+        Subtrees of folders created by the dropped events are rescanned
+        """
+
+        subscriber = SlowSubscriber()
+        queue = SubscriberQueue(subscriber, subscriber.rescan, 1, RESCAN)
+        queue.put([gen_event_object()])
+        while queue._batches:
+            time.sleep(0.01)
+        queue.put([gen_event_object(('IN_CREATE', 'IN_ISDIR'), b'new')])
+        queue.put([gen_event_object()])
+        drain(subscriber, queue)
+
+        self.assertEqual(subscriber.rescans,
+                         [(['/tmp/onedrive'], ['/tmp/onedrive/new'])])
+
+    def test_block(self):
+        """
+        The producer waits for the subscriber when the queue is full
+        """
+
+        subscriber = SlowSubscriber()
+        queue = SubscriberQueue(subscriber, subscriber.rescan, 1, BLOCK)
+        queue.put([gen_event_object()])
+        subscriber.done.clear()
+        producer = threading.Thread(
+            target=lambda: [queue.put([gen_event_object()])
+                            for _ in range(2)]
+        )
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive(), 'Producer was not blocked')
+
+        subscriber.gate.set()
+        producer.join(5)
+        drain(subscriber, queue)
+
+        self.assertEqual(len(subscriber.batches), 3)
+        self.assertEqual(queue.overflows, 0)
+
+    def test_unknown_policy(self):
+        """
+        Unknown backpressure policy is rejected
+        """
+
+        with self.assertRaises(ValueError):
+            SubscriberQueue(SlowSubscriber(), None, 1, 'unknown')
+
+    def test_top_folders(self):
+        """
+        Nested folders are rescanned with their top folder
+        """
+
+        self.assertEqual(top_folders(['/a/b', '/a', '/ab', '/c/d', '/a/b/c']),
+                         ['/a', '/ab', '/c/d'])
+
+
+class ResyncTest(unittest.TestCase):
+    """
+    Tests for the delivery of subtree state after lost events
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.root, 'subdir'))
+        with open(os.path.join(self.root, 'subdir', 'file'), 'w'):
+            pass
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def resync(self, folders, subtrees):
+        """
+        :param folders: list of folders to rescan
+        :param subtrees: list of subtrees to rescan
+        :return: tuple of sorted paths of rescanned folders and of entries
+        """
+
+        monitor = FileSystemMonitor(self.root, queue_size=1,
+                                    backpressure=RESCAN)
+        subscriber = SlowSubscriber()
+        subscriber.gate.set()
+        monitor._FileSystemMonitor__resync(subscriber, folders, subtrees)
+
+        events = [event for batch in subscriber.batches for event in batch]
+        overflows = [event.path for event in events
+                     if hasattr(event, 'IN_Q_OVERFLOW')]
+        created = [event.file_path for event in events
+                   if hasattr(event, 'IN_CREATE')]
+
+        return sorted(overflows), sorted(created)
+
+    def test_resync_folder(self):
+        """
+        Subscriber receives current entries of the lost folder only
+        """
+
+        self.assertEqual(self.resync([self.root], []),
+                         ([self.root], [os.path.join(self.root, 'subdir')]))
+
+    def test_resync_subtree(self):
+        """
+        Subscriber receives current state of the new subtree
+        """
+
+        subdir = os.path.join(self.root, 'subdir')
+        self.assertEqual(self.resync([self.root], [subdir]),
+                         ([self.root, subdir],
+                          [subdir, os.path.join(subdir, 'file')]))
@@ -0,0 +1,94 @@
+"""
+Module with unittests for the index of excluded folders
+"""
+
+import unittest
+
+from filesystem_service.exclude import ExcludeIndex
+
+
+class ExcludeIndexTest(unittest.TestCase):
+    """
+    Tests for the index of excluded folders
+    """
+
+    def setUp(self):
+        self.index = ExcludeIndex([b'/test/exclude', b'/test/build/'])
+
+    def test_exclude_folder(self):
+        """
+        Excluded folder itself is excluded
+        """
+
+        self.assertTrue(self.index.is_excluded(b'/test/exclude'))
+        self.assertTrue(self.index.is_excluded(b'/test/build'))
+
+    def test_exclude_subtree(self):
+        """
+        Subfolders of an excluded folder are excluded
+        """
+
+        self.assertTrue(self.index.is_excluded(b'/test/exclude/a/b'))
+        self.assertIn(b'/test/build/a', self.index)
+
+    def test_not_excluded(self):
+        """
+        Parents, siblings and folders sharing a name prefix aren't excluded
+        """
+
+        for path in [b'/test', b'/test/other', b'/test/exclude2',
+                     b'/test/excl']:
+            self.assertFalse(self.index.is_excluded(path), path)
+
+    def test_name_pattern(self):
+        """
+        Patterns without a slash match a folder name at any depth
+        """
+
+        self.index.add(b'node_modules')
+        self.index.add(b'*.egg-info')
+
+        self.assertTrue(self.index.is_excluded(b'/test/node_modules'))
+        self.assertTrue(self.index.is_excluded(b'/test/a/node_modules/b'))
+        self.assertTrue(self.index.is_excluded(b'/test/foo.egg-info'))
+        self.assertFalse(self.index.is_excluded(b'/test/node_modules2'))
+        self.assertFalse(self.index.is_excluded(b'/test/egg-info'))
+
+    def test_names_below_root(self):
+        """
+        Names and name patterns don't match parents of the monitored root
+        """
+
+        index = ExcludeIndex([b'tmp', b'*.cache'], root=b'/tmp/x.cache/')
+
+        for path in [b'/tmp/x.cache', b'/tmp/x.cache/src',
+                     b'/tmp/x.cache/src/a']:
+            self.assertFalse(index.is_excluded(path), path)
+        self.assertTrue(index.is_excluded(b'/tmp/x.cache/src/tmp'))
+        self.assertTrue(index.is_excluded(b'/tmp/x.cache/a.cache/b'))
+        self.assertTrue(index.is_excluded(b'/var/tmp'))
+
+    def test_path_pattern(self):
+        """
+        Patterns with a slash match the path from its start
+        """
+
+        self.index.add(b'/test/*/cache')
+        self.index.add(b'/test/**/tmp[0-9]')
+
+        self.assertTrue(self.index.is_excluded(b'/test/a/cache'))
+        self.assertTrue(self.index.is_excluded(b'/test/a/cache/b'))
+        self.assertFalse(self.index.is_excluded(b'/test/a/b/cache'))
+        self.assertTrue(self.index.is_excluded(b'/test/a/b/tmp1'))
+        self.assertFalse(self.index.is_excluded(b'/test/a/b/tmpx'))
+
+    def test_iterate(self):
+        """
+        Index iterates over added folders and patterns
+        """
+
+        self.index.add(b'node_modules')
+
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(list(self.index), [b'/test/exclude', b'/test/build/',
+                                            b'node_modules'])
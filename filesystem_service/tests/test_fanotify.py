@@ -0,0 +1,227 @@
+"""
+Module with unittests for the fanotify backend
+
+fanotify needs CAP_SYS_ADMIN and CAP_DAC_READ_SEARCH, so most of the tests
+run only as root on the host or in a privileged container.
+"""
+# pylint: disable=protected-access
+
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from filesystem_service import fanotify, monitor
+from filesystem_service.fanotify import FanotifyReader, HandleCache
+from filesystem_service.reader import InotifyReader
+
+from . import test_fsmonitor
+from .utils.consts import FOLDER
+from .utils.monitor import get_monitor_instance
+
+
+def fanotify_available():
+    """
+    :return: True if fanotify can be used in this environment
+    """
+
+    try:
+        FanotifyReader(tempfile.gettempdir().encode()).close()
+    except OSError:
+        return False
+
+    return True
+
+
+FANOTIFY_AVAILABLE = fanotify_available()
+
+
+class FallbackTest(unittest.TestCase):
+    """
+    Tests for the fallback to inotify
+    """
+
+    def test_fallback(self):
+        """
+        inotify is used when fanotify isn't permitted
+        """
+
+        error = OSError(errno.EPERM, os.strerror(errno.EPERM))
+        with mock.patch.object(monitor, 'FanotifyReader',
+                               side_effect=error):
+            instance = get_monitor_instance(FOLDER, backend=monitor.FANOTIFY)
+
+        self.assertIsInstance(instance._notifier, InotifyReader,
+                              'Monitor did not fall back to inotify')
+        self.assertFalse(instance._recursive, 'Folders are not watched')
+
+
+class HandleCacheTest(unittest.TestCase):
+    """
+    Tests for the cache of directory handles
+    """
+
+    FOLDERS = [b'a', b'a/b', b'a/b/c', b'a/bc', b'd']
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp().encode()
+        for folder in self.FOLDERS:
+            os.mkdir(os.path.join(self.root, folder))
+
+        # Handles are the relative paths, resolved by opening the folders
+        libc = mock.patch.object(fanotify, '_LIBC')
+        libc.start().open_by_handle_at.side_effect = \
+            lambda mount_fd, handle, flags: os.open(
+                os.path.join(self.root, handle), os.O_RDONLY | os.O_DIRECTORY
+            )
+        self.addCleanup(libc.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def cached(self, cache):
+        """
+        :param cache: an instance of HandleCache
+        :return: sorted list of cached handles
+        """
+
+        return sorted(handle for handle in self.FOLDERS
+                      if handle in cache._paths)
+
+    def test_invalidate(self):
+        """
+        Only the subtree of an invalidated folder is dropped
+        """
+
+        cache = HandleCache(-1)
+        for handle in self.FOLDERS:
+            cache.resolve(handle)
+
+        cache.invalidate(os.path.join(self.root, b'a/b'))
+
+        self.assertEqual(self.cached(cache), [b'a', b'a/bc', b'd'])
+        self.assertEqual(cache.resolve(b'a/b/c'),
+                         os.path.join(self.root, b'a/b/c'))
+        self.assertEqual(len(cache), 4)
+
+    def test_evict(self):
+        """
+        Evicted folders aren't dropped again by invalidation
+        """
+
+        cache = HandleCache(-1, size=2)
+        for handle in [b'a/b/c', b'a/bc', b'd']:
+            cache.resolve(handle)
+
+        cache.invalidate(os.path.join(self.root, b'a'))
+
+        self.assertEqual(self.cached(cache), [b'd'])
+        self.assertNotIn(os.path.join(self.root, b'a'), cache._children)
+
+
+@unittest.skipUnless(FANOTIFY_AVAILABLE, 'fanotify is not permitted')
+class FanotifyReaderTest(unittest.TestCase):
+    """
+    Tests for the fanotify reader
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp().encode()
+        self.outside = tempfile.mkdtemp().encode()
+        self.reader = FanotifyReader(self.root, block_duration_s=0.1,
+                                     cache_size=2)
+
+    def tearDown(self):
+        self.reader.close()
+        shutil.rmtree(self.root)
+        shutil.rmtree(self.outside)
+
+    def read(self):
+        """
+        :return: list of (mask, path, filename, cookie) of available events
+        """
+
+        events = []
+        for event in self.reader.event_gen():
+            if event is None:
+                break
+            header, _, path, filename = event
+            events.append((header.mask, path, filename, header.cookie))
+
+        return events
+
+    def test_subfolders(self):
+        """
+        Events of nested folders are reported without watches of their own
+        """
+
+        nested = os.path.join(self.root, b'a', b'b', b'c')
+        os.makedirs(nested)
+        self.read()
+        with open(os.path.join(nested, b'file'), 'w'):
+            pass
+
+        events = self.read()
+        self.assertIn((nested, b'file'),
+                      [(path, filename) for mask, path, filename, _ in events
+                       if mask & 0x100],
+                      'Create event is missing')
+
+    def test_outside_root(self):
+        """
+        Events of the filesystem outside the root are skipped
+        """
+
+        with open(os.path.join(self.outside, b'file'), 'w'):
+            pass
+
+        self.assertEqual(self.read(), [], 'Events outside root reported')
+
+    def test_move(self):
+        """
+        A moved folder is reported under its new path and a pair of move
+        events shares a cookie
+        """
+
+        os.mkdir(os.path.join(self.root, b'old'))
+        with open(os.path.join(self.root, b'old', b'file'), 'w'):
+            pass
+        self.read()
+
+        os.rename(os.path.join(self.root, b'old'),
+                  os.path.join(self.root, b'new'))
+        moves = self.read()
+        with open(os.path.join(self.root, b'new', b'other'), 'w'):
+            pass
+
+        self.assertEqual([(mask & 0xff, filename, cookie)
+                          for mask, _, filename, cookie in moves],
+                         [(0x40, b'old', 1), (0x80, b'new', 1)],
+                         'Wrong move events')
+        self.assertIn(os.path.join(self.root, b'new'),
+                      [path for _, path, _, _ in self.read()],
+                      'Stale path of the moved folder')
+
+    def test_cache_size(self):
+        """
+        Number of cached paths is limited
+        """
+
+        for name in [b'a', b'b', b'c']:
+            os.mkdir(os.path.join(self.root, name))
+            with open(os.path.join(self.root, name, b'file'), 'w'):
+                pass
+
+        self.assertEqual(len(self.read()), 6, 'Events were lost')
+        self.assertEqual(len(self.reader._handles), 2, 'Cache is unbound')
+
+
+@unittest.skipUnless(FANOTIFY_AVAILABLE, 'fanotify is not permitted')
+class FanotifyMonitorTest(test_fsmonitor.MonitorTest):
+    """
+    Tests for the monitoring with fanotify
+    """
+
+    MONITOR_KWARGS = {'backend': monitor.FANOTIFY}
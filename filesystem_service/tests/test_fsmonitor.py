@@ -4,11 +4,19 @@ Module with unittests for the filesystem monitor
 # pylint: disable=protected-access
 
 import os
+import pickle
+import shutil
+import tempfile
 import unittest
 
-from .utils.consts import EXCLUDE_FOLDER, FOLDER, TEST_FILE, TEST_SUBDIR
-from .utils.monitor import EVENTS, gen_event_object, gen_events_list, \
-    get_monitor_instance, SecondSubscriber, SEVENTS, Subscriber
+from filesystem_service.monitor import Event, WATCH_CHUNK_SIZE
+
+from .utils.consts import EXCLUDE_FOLDER, FOLDER, FPATH, TEST_FILE, \
+    TEST_SUBDIR
+from .utils.monitor import BATCHES, BatchSubscriber, EVENTS, \
+    gen_batches_list, gen_event_object, gen_events_list, \
+    get_monitor_instance, InotifyEvent, SecondSubscriber, SEVENTS, \
+    Subscriber
 
 
 class FileSystemMonitorTest(unittest.TestCase):
@@ -90,6 +98,58 @@ class FileSystemMonitorTest(unittest.TestCase):
         self.assertEqual(b'/test', self.monitor._root_folder)
 
 
+class StopMonitor(Exception):
+    """
+    Raised to leave the endless loop of the monitor
+    """
+
+
+class SetupEventsTest(unittest.TestCase):
+    """
+    Tests for the events which come while watches are set up
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.events = []
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def update(self, event):
+        """
+        :param event: inotify event
+        """
+
+        self.events.append(event)
+
+    def gen_watch_list(self):
+        """
+        :return: generator of folders to watch, which writes a file after
+        the first one and stops the monitor after one more chunk
+        """
+
+        folder = self.folder.encode()
+        yield folder
+        open(os.path.join(self.folder, TEST_FILE), 'w').close()
+        for _ in range(WATCH_CHUNK_SIZE):
+            yield folder
+        raise StopMonitor()
+
+    def test_events_before_setup_end(self):
+        """
+        Events of watched folders are delivered before all watches are set
+        """
+
+        monitor = get_monitor_instance(self.folder, [self])
+        monitor._FileSystemMonitor__gen_watch_list = self.gen_watch_list
+        with self.assertRaises(StopMonitor):
+            monitor.monitor()
+
+        self.assertIn(TEST_FILE, [event.filename for event in self.events],
+                      'Events were not read while watches were set up')
+
+
 class EventTest(unittest.TestCase):
     """
     Tests for the filesystem event class
@@ -120,18 +180,84 @@ class EventTest(unittest.TestCase):
 
         self.assertEqual(self.event.filename, 'test', 'Wrong attribute value')
 
+    def test_event_slots(self):
+        """
+        Verify that event types are kept in the mask without instance dict
+        """
+
+        self.assertFalse(hasattr(self.event, '__dict__'), 'Event has dict')
+        self.assertFalse(hasattr(self.event, 'IN_CREATE'),
+                         'Unexpected event attribute')
+        self.assertFalse(hasattr(self.event, 'IN_UNKNOWN'),
+                         'Unexpected event attribute')
+        self.assertEqual(self.event.mask, 0x9, 'Wrong event mask')
+
+    def test_event_header_mask(self):
+        """
+        Verify that event types are taken from the header without names
+        """
+
+        event = Event((InotifyEvent(wd=1, mask=0x40000100, cookie=0, len=4),
+                       None, b'/tmp/onedrive', b'test'))
+
+        self.assertTrue(hasattr(event, 'IN_CREATE'), 'Missing attribute')
+        self.assertTrue(hasattr(event, 'IN_ISDIR'), 'Missing attribute')
+        self.assertFalse(hasattr(event, 'IN_DELETE'), 'Wrong attribute')
+
+    def test_event_lazy_path(self):
+        """
+        Verify that paths are decoded on first access only
+        """
+
+        event = gen_event_object(filename='тест'.encode())
+
+        self.assertIsNone(event._path, 'Path was decoded eagerly')
+        self.assertEqual(event.file_path, '/tmp/onedrive/тест',
+                         'Wrong attribute value')
+        self.assertEqual(event.raw_filename, 'тест'.encode(),
+                         'Wrong attribute value')
+
+    def test_event_merge(self):
+        """
+        Verify that merged event has event types of both events
+        """
+
+        other = gen_event_object(type_names=['IN_MODIFY'])
+        self.event.merge(other)
+
+        for attr in ['IN_CLOSE_WRITE', 'IN_ACCESS', 'IN_MODIFY']:
+            self.assertTrue(hasattr(self.event, attr),
+                            'Missing event attributes')
+
+    def test_event_pickle(self):
+        """
+        Verify that event survives passing to another process
+        """
+
+        event = pickle.loads(pickle.dumps(self.event))
+
+        self.assertTrue(hasattr(event, 'IN_CLOSE_WRITE'), 'Missing attribute')
+        self.assertEqual(event.file_path, '/tmp/onedrive/test',
+                         'Wrong attribute value')
+
 
 class MonitorTest(unittest.TestCase):
     """
     Tests for the filesystem event's monitoring functionality
     """
 
+    # Keyword arguments of the monitor
+    MONITOR_KWARGS = {}
+
     @classmethod
     def setUpClass(cls):
         if not os.path.exists(FOLDER):
             os.mkdir(FOLDER)
+        del EVENTS[:]
+        del SEVENTS[:]
         gen_events_list(get_monitor_instance(FOLDER, [Subscriber(),
-                                                      SecondSubscriber()]))
+                                                      SecondSubscriber()],
+                                             **cls.MONITOR_KWARGS))
 
     def test_empty_events(self):
         """
@@ -186,3 +312,32 @@ class MonitorTest(unittest.TestCase):
 
         self.assertEqual(delete_event.filename, TEST_SUBDIR,
                          'Delete event for {} is missing'.format(TEST_SUBDIR))
+
+
+class CoalesceMonitorTest(unittest.TestCase):
+    """
+    Tests for the monitoring with coalescing of events
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if not os.path.exists(FOLDER):
+            os.mkdir(FOLDER)
+        gen_batches_list(get_monitor_instance(FOLDER, [BatchSubscriber()],
+                                              coalesce_window=0.5))
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(FPATH)
+
+    def test_burst_is_merged(self):
+        """
+        A burst of writes to a file is delivered as a single event
+        """
+
+        events = [event for batch in BATCHES for event in batch
+                  if event.file_path == FPATH]
+
+        self.assertEqual(len(events), 1, 'Events were not merged')
+        self.assertTrue(hasattr(events[0], 'IN_MODIFY'),
+                        'Modify event is missing')
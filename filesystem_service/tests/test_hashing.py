@@ -0,0 +1,68 @@
+"""
+Module with unittests for the content hashes of local files
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+
+from filesystem_service.hashing import hash_file, hash_files
+from onedrive_client.entities.hashing import QuickXorHash
+
+
+class HashFileTest(unittest.TestCase):
+    """
+    Tests for the hashing of files
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.data = {}
+        for index, size in enumerate([0, 100, 100000]):
+            path = os.path.join(self.root, 'file{}'.format(index))
+            self.data[path] = os.urandom(size)
+            with open(path, 'wb') as stream:
+                stream.write(self.data[path])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def check(self, path, hashes):
+        """
+        :param path: full path to file
+        :param hashes: an instance of Hashes
+        """
+
+        data = self.data[path]
+        self.assertEqual(hashes.crc32_hash,
+                         zlib.crc32(data).to_bytes(4, 'little'), 'Wrong CRC32')
+        self.assertEqual(hashes.sha1_hash, hashlib.sha1(data).digest(),
+                         'Wrong SHA1')
+        self.assertEqual(hashes.quick_xor_hash, QuickXorHash(data).digest(),
+                         'Wrong QuickXorHash')
+
+    def test_hash_file(self):
+        """
+        All the hashes are computed with a buffer smaller than the file
+        """
+
+        for path in self.data:
+            self.check(path, hash_file(path, bytearray(4096)))
+
+    def test_hash_files(self):
+        """
+        Files are hashed in a pool of processes
+        """
+
+        missing = os.path.join(self.root, 'missing')
+        results = list(hash_files(list(self.data) + [missing], workers=2,
+                                  chunksize=1))
+
+        self.assertEqual([path for path, _ in results],
+                         list(self.data) + [missing], 'Wrong order')
+        for path, hashes in results[:-1]:
+            self.check(path, hashes)
+        self.assertIsNone(results[-1][1], 'Missing file has hashes')
@@ -0,0 +1,152 @@
+"""
+Module with unittests for the persistent index of local files
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from filesystem_service.index import LocalIndex
+
+
+def touch(path, data=''):
+    """
+    :param path: full path to file
+    :param data: content of the file
+    """
+
+    with open(path, 'w') as stream:
+        stream.write(data)
+
+
+class LocalIndexTest(unittest.TestCase):
+    """
+    Tests for the persistent index of local files
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp().encode()
+        self.database = os.path.join(self.root, b'index.db')
+        self.tree = os.path.join(self.root, b'tree')
+        for folder in [b'a', b'a/b', b'c']:
+            os.makedirs(os.path.join(self.tree, folder))
+        for path in [b'file', b'a/file', b'a/b/file', b'c/file']:
+            touch(os.path.join(self.tree, path), 'data')
+
+        self.hashed = []
+        self.index = self.open()
+        list(self.index.refresh(self.tree))
+        del self.hashed[:]
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.root)
+
+    def open(self):
+        """
+        :return: an instance of LocalIndex
+        """
+
+        return LocalIndex(self.database.decode(), hasher=self.hasher)
+
+    def hasher(self, path):
+        """
+        :param path: full path to file
+        :return: fake hashes of the file
+        """
+
+        self.hashed.append(os.path.relpath(path, self.tree))
+        return b'crc', b'sha1', os.path.basename(path)
+
+    def refresh(self, is_excluded=None):
+        """
+        :param is_excluded: callable which takes a folder and returns True
+        if the folder isn't indexed
+        :return: dict of relative paths to the changed entries
+        """
+
+        return {os.path.relpath(path, self.tree): entry
+                for path, entry in self.index.refresh(self.tree, is_excluded)}
+
+    def test_initial(self):
+        """
+        All the files are indexed with their metadata and hashes
+        """
+
+        self.assertEqual(len(self.index), 4, 'Wrong number of entries')
+        entry = self.index.get(os.path.join(self.tree, b'a', b'b', b'file'))
+        self.assertEqual(entry.size, 4, 'Wrong size')
+        self.assertEqual(entry.quick_xor_hash, b'file', 'Wrong hashes')
+        self.assertNotIn(os.path.join(self.tree, b'a'), self.index,
+                         'Folders are indexed')
+
+    def test_warm_restart(self):
+        """
+        Unchanged files aren't hashed again after reopening
+        """
+
+        self.index.close()
+        self.index = self.open()
+
+        self.assertEqual(self.refresh(), {}, 'Unchanged files reported')
+        self.assertEqual(self.hashed, [], 'Unchanged files hashed')
+
+    def test_changes(self):
+        """
+        Only the changed files are hashed and reported
+        """
+
+        touch(os.path.join(self.tree, b'a', b'file'), 'modified')
+        touch(os.path.join(self.tree, b'c', b'new'))
+        os.remove(os.path.join(self.tree, b'file'))
+
+        changes = self.refresh()
+
+        self.assertEqual(set(changes), {b'a/file', b'c/new', b'file'},
+                         'Wrong changes')
+        self.assertIsNone(changes[b'file'], 'Removed file has an entry')
+        self.assertEqual(changes[b'a/file'].size, 8, 'Wrong size')
+        self.assertEqual(sorted(self.hashed), [b'a/file', b'c/new'],
+                         'Wrong files hashed')
+        self.assertEqual(len(self.index), 4, 'Wrong number of entries')
+
+    def test_removed_folder(self):
+        """
+        Files of removed and excluded folders are dropped
+        """
+
+        shutil.rmtree(os.path.join(self.tree, b'a'))
+        excluded = os.path.join(self.tree, b'c')
+
+        changes = self.refresh(lambda folder: folder == excluded)
+
+        self.assertEqual(changes, {b'a/file': None, b'a/b/file': None,
+                                   b'c/file': None}, 'Wrong changes')
+        self.assertEqual(len(self.index), 1, 'Wrong number of entries')
+
+    def test_update(self):
+        """
+        A single file is brought up to date
+        """
+
+        path = os.path.join(self.tree, b'c', b'file')
+        inode = os.stat(path).st_ino
+        os.rename(path, os.path.join(self.tree, b'moved'))
+
+        self.assertIsNone(self.index.update(path), 'Removed file has entry')
+        entry = self.index.update(os.path.join(self.tree, b'moved'))
+
+        self.assertEqual(self.index.find(inode),
+                         [os.path.join(self.tree, b'moved')],
+                         'Wrong paths of inode')
+        self.assertEqual(entry.inode, inode, 'Wrong inode')
+
+    def test_remove(self):
+        """
+        A folder is dropped with its subtree
+        """
+
+        self.index.remove(os.path.join(self.tree, b'a'))
+
+        self.assertEqual(len(self.index), 2, 'Wrong number of entries')
@@ -0,0 +1,120 @@
+"""
+Module with unittests for the batched inotify reader
+"""
+# pylint: disable=protected-access
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from filesystem_service.monitor import Event, FileSystemMonitor, NATIVE
+from filesystem_service.reader import InotifyReader
+import inotify.constants
+
+from . import test_fsmonitor
+from .utils.consts import FOLDER
+
+
+def pack_event(descriptor, mask, filename=b'', cookie=0):
+    """
+    :param descriptor: watch descriptor
+    :param mask: inotify event types
+    :param filename: name of the file. Type: bytes
+    :param cookie: cookie of the event
+    :return: raw inotify event with the name padded as the kernel does
+    """
+
+    length = (len(filename) // 16 + 1) * 16 if filename else 0
+    return struct.pack('iIII', descriptor, mask, cookie, length) + \
+        filename.ljust(length, b'\0')
+
+
+class InotifyReaderTest(unittest.TestCase):
+    """
+    Tests for the batched inotify reader
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp().encode()
+        self.reader = InotifyReader(block_duration_s=0.1)
+
+    def tearDown(self):
+        self.reader.close()
+        shutil.rmtree(self.root)
+
+    def test_parse(self):
+        """
+        All the events of a chunk are parsed, unknown descriptors are skipped
+        """
+
+        self.reader.add_watch(self.root)
+        descriptor = self.reader._watches[self.root]
+        chunk = (pack_event(descriptor, inotify.constants.IN_CREATE,
+                            b'first', cookie=1) +
+                 pack_event(descriptor + 1, inotify.constants.IN_DELETE,
+                            b'unknown') +
+                 pack_event(-1, inotify.constants.IN_Q_OVERFLOW) +
+                 pack_event(descriptor, inotify.constants.IN_MODIFY,
+                            b'x' * 16))
+
+        events = list(self.reader.parse(memoryview(chunk)))
+
+        self.assertEqual([(header.mask, path, filename)
+                          for header, _, path, filename in events],
+                         [(inotify.constants.IN_CREATE, self.root, b'first'),
+                          (inotify.constants.IN_Q_OVERFLOW, b'', b''),
+                          (inotify.constants.IN_MODIFY, self.root, b'x' * 16)])
+        self.assertEqual(events[0][0].cookie, 1, 'Wrong cookie')
+        self.assertIsNone(events[0][1], 'Type names are not deferred')
+
+    def test_read_batch(self):
+        """
+        Events written in a burst are read in a single chunk
+        """
+
+        self.reader.add_watch(self.root)
+        for index in range(100):
+            os.mkdir(os.path.join(self.root, str(index).encode()))
+
+        events = []
+        for event in self.reader.event_gen():
+            if event is None:
+                break
+            events.append(Event(event))
+
+        created = [event.filename for event in events
+                   if hasattr(event, 'IN_CREATE')]
+        self.assertEqual(created, [str(index) for index in range(100)],
+                         'Events were lost')
+        self.assertTrue(all(hasattr(event, 'IN_ISDIR') for event in events),
+                        'Event types were lost')
+
+    def test_remove_watch(self):
+        """
+        Events of removed watches are not reported
+        """
+
+        self.reader.add_watch(self.root)
+        self.reader.remove_watch(self.root)
+        os.mkdir(os.path.join(self.root, b'folder'))
+
+        self.assertEqual(next(self.reader.event_gen()), None,
+                         'Events of removed watch were reported')
+
+    def test_unknown_backend(self):
+        """
+        Unknown backend is rejected
+        """
+
+        with self.assertRaises(ValueError):
+            FileSystemMonitor(FOLDER, backend='unknown')
+
+
+class NativeMonitorTest(test_fsmonitor.MonitorTest):
+    """
+    Tests for the monitoring with the batched inotify reader
+    """
+
+    MONITOR_KWARGS = {'backend': NATIVE}
@@ -0,0 +1,241 @@
+"""
+Module with unittests for the incremental rescan of lost events
+"""
+
+import os
+import shutil
+import tempfile
+from time import sleep
+import unittest
+
+from filesystem_service.rescan import RescanEngine
+
+from .utils.monitor import get_monitor_instance, OVERFLOW_EVENTS, \
+    SlowSubscriber, start_monitor_process
+
+
+MAX_QUEUED_EVENTS = '/proc/sys/fs/inotify/max_queued_events'
+
+
+def touch(path, data=''):
+    """
+    :param path: full path to file
+    :param data: content of the file
+    """
+
+    with open(path, 'w') as stream:
+        stream.write(data)
+
+
+class RescanEngineTest(unittest.TestCase):
+    """
+    Tests for the rescan engine
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp().encode()
+        os.mkdir(os.path.join(self.root, b'subdir'))
+        os.mkdir(os.path.join(self.root, b'gone'))
+        for name in [b'same', b'modified', b'deleted', b'replaced']:
+            touch(os.path.join(self.root, name))
+        touch(os.path.join(self.root, b'subdir', b'file'))
+
+        self.engine = RescanEngine()
+        for folder in [self.root, os.path.join(self.root, b'subdir'),
+                       os.path.join(self.root, b'gone')]:
+            self.engine.record(folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def changes(self, folder, recursive=True, visited=None):
+        """
+        :param folder: folder to rescan
+        :param recursive: rescan all the subfolders
+        :param visited: set of folders rescanned so far
+        :return: set of (type_names, relative path) tuples
+        """
+
+        return {(tuple(type_names),
+                 os.path.relpath(os.path.join(path, name), self.root))
+                for type_names, path, name in self.engine.rescan(
+                    folder, recursive, visited)}
+
+    def test_no_changes(self):
+        """
+        Nothing is reported for an unchanged tree
+        """
+
+        self.assertEqual(self.changes(self.root), set())
+
+    def test_changes(self):
+        """
+        Created, modified, deleted and replaced entries are reported
+        """
+
+        touch(os.path.join(self.root, b'modified'), 'data')
+        os.remove(os.path.join(self.root, b'deleted'))
+        os.remove(os.path.join(self.root, b'replaced'))
+        touch(os.path.join(self.root, b'replaced'))
+        os.rmdir(os.path.join(self.root, b'gone'))
+        os.mkdir(os.path.join(self.root, b'new'))
+        touch(os.path.join(self.root, b'new', b'file'))
+        touch(os.path.join(self.root, b'subdir', b'new'))
+
+        self.assertEqual(self.changes(self.root), {
+            (('IN_MODIFY',), b'modified'),
+            (('IN_DELETE',), b'deleted'),
+            (('IN_DELETE',), b'replaced'),
+            (('IN_CREATE',), b'replaced'),
+            (('IN_DELETE', 'IN_ISDIR'), b'gone'),
+            (('IN_CREATE', 'IN_ISDIR'), b'new'),
+            (('IN_CREATE',), b'new/file'),
+            (('IN_CREATE',), b'subdir/new'),
+        })
+        self.assertEqual(self.changes(self.root), set())
+
+    def test_not_recursive(self):
+        """
+        Known subfolders aren't rescanned unless the rescan is recursive
+        """
+
+        touch(os.path.join(self.root, b'subdir', b'new'))
+
+        self.assertEqual(self.changes(self.root, recursive=False), set())
+        self.assertEqual(self.changes(self.root),
+                         {(('IN_CREATE',), b'subdir/new')})
+
+    def test_not_recursive_new_folder(self):
+        """
+        New subfolders are rescanned by a rescan which isn't recursive
+        """
+
+        os.mkdir(os.path.join(self.root, b'new'))
+        touch(os.path.join(self.root, b'new', b'file'))
+        visited = set()
+
+        self.assertEqual(self.changes(self.root, False, visited), {
+            (('IN_CREATE', 'IN_ISDIR'), b'new'),
+            (('IN_CREATE',), b'new/file'),
+        })
+        self.assertEqual(visited, {self.root, os.path.join(self.root, b'new')})
+
+        touch(os.path.join(self.root, b'new', b'other'))
+        self.assertEqual(
+            self.changes(os.path.join(self.root, b'new'), False, visited),
+            set()
+        )
+
+    def test_unknown_not_recursive(self):
+        """
+        Subfolders of a folder without a known state aren't rescanned by a
+        rescan which isn't recursive
+        """
+
+        engine = RescanEngine()
+        changes = {os.path.join(path, name) for _, path, name in
+                   engine.rescan(self.root, recursive=False)}
+
+        self.assertEqual(len(changes), 6)
+        self.assertEqual(len(engine), 1)
+
+    def test_unknown_folder(self):
+        """
+        Everything is reported for a folder without a known state
+        """
+
+        engine = RescanEngine()
+        changes = {os.path.join(path, name)
+                   for _, path, name in engine.rescan(self.root)}
+
+        self.assertEqual(len(changes), 7)
+        self.assertEqual(len(engine), 3)
+
+    def test_update(self):
+        """
+        Entry state is refreshed after an event
+        """
+
+        touch(os.path.join(self.root, b'modified'), 'data')
+        self.engine.update(self.root, b'modified')
+        shutil.rmtree(os.path.join(self.root, b'subdir'))
+        self.engine.update(self.root, b'subdir')
+
+        self.assertEqual(self.changes(self.root), set())
+        self.assertEqual(len(self.engine), 2)
+
+    def test_affected(self):
+        """
+        Folders that had events within the window are rescanned alone, the
+        root is rescanned recursively only without them
+        """
+
+        engine = RescanEngine(activity_window=10)
+        engine.touch(b'/root/old', now=0)
+        engine.touch(b'/root/a/b', now=5)
+        engine.touch(b'/root/a', now=6)
+        engine.touch(b'/root/c', now=7)
+
+        self.assertEqual(engine.affected(b'/root', now=12), [
+            (b'/root/a', False), (b'/root/a/b', False), (b'/root/c', False)
+        ])
+        self.assertEqual(engine.affected(b'/root', now=12),
+                         [(b'/root', True)])
+
+        engine.touch(b'/root', now=13)
+        self.assertEqual(engine.affected(b'/root', now=13),
+                         [(b'/root', False)])
+
+
+@unittest.skipUnless(os.access(MAX_QUEUED_EVENTS, os.W_OK),
+                     'Changing max_queued_events is not permitted')
+class OverflowTest(unittest.TestCase):
+    """
+    Tests for the monitoring with inotify queue overflows
+    """
+
+    FILES = 200
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp()
+
+        with open(MAX_QUEUED_EVENTS) as stream:
+            max_queued_events = stream.read()
+        with open(MAX_QUEUED_EVENTS, 'w') as stream:
+            stream.write('16')
+        try:
+            monitor = get_monitor_instance(cls.root, [SlowSubscriber()],
+                                           track_state=True)
+        finally:
+            with open(MAX_QUEUED_EVENTS, 'w') as stream:
+                stream.write(max_queued_events)
+
+        process = start_monitor_process(monitor)
+        for index in range(cls.FILES):
+            touch(os.path.join(cls.root, str(index)))
+        sleep(3)
+        process.terminate()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+
+    def test_overflow_reported(self):
+        """
+        Queue overflow is reported to subscribers
+        """
+
+        self.assertTrue([event for event in OVERFLOW_EVENTS
+                         if hasattr(event, 'IN_Q_OVERFLOW')],
+                        'Overflow event is missing')
+
+    def test_no_lost_files(self):
+        """
+        Every created file is reported despite the overflow
+        """
+
+        created = {event.filename for event in OVERFLOW_EVENTS
+                   if hasattr(event, 'IN_CREATE')}
+
+        self.assertEqual(created, {str(index) for index in range(self.FILES)})
@@ -0,0 +1,118 @@
+"""
+Module with unittests for the streaming folder walker
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from filesystem_service.walker import FolderWalker
+
+
+def make_tree(root, depth, fanout):
+    """
+    :param root: root folder of the tree
+    :param depth: depth of the tree
+    :param fanout: number of subfolders in each folder
+    :return: list of all folders in the tree including the root
+    """
+
+    folders = [root]
+    level = [root]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for index in range(fanout):
+                folder = os.path.join(parent, 'dir{}'.format(index))
+                os.mkdir(folder)
+                next_level.append(folder)
+        folders.extend(next_level)
+        level = next_level
+
+    with open(os.path.join(root, 'file'), 'w'):
+        pass
+
+    return folders
+
+
+class FolderWalkerTest(unittest.TestCase):
+    """
+    Tests for the streaming folder walker
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.folders = [folder.encode()
+                        for folder in make_tree(self.root, 3, 4)]
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_walk_all_folders(self):
+        """
+        Every folder of the tree is yielded once, root comes first
+        """
+
+        walked = list(FolderWalker(self.root.encode()))
+
+        self.assertEqual(walked[0], self.root.encode())
+        self.assertEqual(sorted(walked), sorted(self.folders))
+
+    def test_walk_small_queue(self):
+        """
+        The walk isn't affected by the size of the queue and chunks
+        """
+
+        walker = FolderWalker(self.root.encode(), queue_size=1, chunk_size=1)
+
+        self.assertEqual(sorted(walker), sorted(self.folders))
+
+    def test_skip_excluded(self):
+        """
+        Excluded folders aren't yielded and their subtrees aren't walked
+        """
+
+        excluded = self.folders[1]
+        walker = FolderWalker(self.root.encode(),
+                              is_excluded=lambda folder: folder == excluded)
+        walked = list(walker)
+
+        self.assertNotIn(excluded, walked)
+        self.assertFalse([folder for folder in walked
+                          if folder.startswith(excluded + b'/')])
+
+    def test_progress(self):
+        """
+        Progress is reported periodically and once the walk is finished
+        """
+
+        reports = []
+        walker = FolderWalker(self.root.encode(), progress=reports.append,
+                              progress_interval=10)
+        list(walker)
+
+        self.assertEqual(reports[-1], len(self.folders))
+        self.assertEqual(reports[:-1],
+                         list(range(10, len(self.folders) + 1, 10)))
+
+    def test_stop_early(self):
+        """
+        The consumer can stop the walk at any moment
+        """
+
+        walker = FolderWalker(self.root.encode(), queue_size=1, chunk_size=1)
+        for index, _ in enumerate(walker):
+            if index == 2:
+                break
+
+        self.assertEqual(walker.count, 2)
+
+    def test_missing_root(self):
+        """
+        Nothing is yielded if the root can't be read
+        """
+
+        missing = os.path.join(self.root, 'missing').encode()
+
+        self.assertEqual(list(FolderWalker(missing)), [])
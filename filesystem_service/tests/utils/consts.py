@@ -9,5 +9,6 @@ FOLDER = '/tmp/test'
 EXCLUDE_FOLDER = os.path.join(FOLDER, 'exclude')
 TEST_FILE = 'testfile'
 TEST_SUBDIR = 'subdir'
+FPATH = os.path.join(FOLDER, TEST_FILE)
 SUBDIR_PATH = os.path.join(FOLDER, TEST_SUBDIR)
 SUBDIR_FPATH = os.path.join(SUBDIR_PATH, TEST_FILE)
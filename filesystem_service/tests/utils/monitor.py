@@ -9,13 +9,15 @@ from time import sleep
 
 from filesystem_service.monitor import Event, FileSystemMonitor
 
-from .consts import SUBDIR_FPATH, SUBDIR_PATH
+from .consts import FPATH, SUBDIR_FPATH, SUBDIR_PATH
 
 
 InotifyEvent = collections.namedtuple('_INOTIFY_EVENT',
                                       ['wd', 'mask', 'cookie', 'len'])
 EVENTS = Manager().list()
 SEVENTS = Manager().list()
+BATCHES = Manager().list()
+OVERFLOW_EVENTS = Manager().list()
 
 
 # pylint: disable=too-few-public-methods
@@ -49,29 +51,65 @@ class SecondSubscriber(object):
         SEVENTS.append(event)
 
 
+class BatchSubscriber(object):
+    """
+    Subscriber emulator receiving batches of events
+    """
+
+    @staticmethod
+    def update_batch(events):
+        """
+        :param events: list of inotify events
+        add batches to shared list variable
+        """
+
+        BATCHES.append(events)
+
+
+class SlowSubscriber(object):
+    """
+    Subscriber emulator which stalls on the first event
+    """
+
+    @staticmethod
+    def update(event):
+        """
+        :param event: inotify event
+        add events to shared list variable
+        """
+
+        if not OVERFLOW_EVENTS:
+            sleep(1)
+        OVERFLOW_EVENTS.append(event)
+
+
 # pylint: disable=dangerous-default-value
-def get_monitor_instance(folder='/test', subscribers=[]):
+def get_monitor_instance(folder='/test', subscribers=[], **kwargs):
     """
     :param folder: folder to be watched
     :param subscribers: list of subscriber instances
+    :param kwargs: keyword arguments of the monitor
     :return: an instance of FileSystemMonitor
     """
 
-    monitor = FileSystemMonitor(folder)
+    monitor = FileSystemMonitor(folder, **kwargs)
     for subscriber in subscribers:
         monitor.subscribe(subscriber)
 
     return monitor
 
 
-def gen_event_object():
+def gen_event_object(type_names=('IN_CLOSE_WRITE', 'IN_ACCESS'),
+                     filename=b'test', cookie=0):
     """
+    :param type_names: inotify event types
+    :param filename: name of the file in the watched folder
+    :param cookie: cookie of the event
     :return: an instance of Event
     """
 
-    i_event = (InotifyEvent(wd=1, mask=8, cookie=0, len=16),
-               ['IN_CLOSE_WRITE', 'IN_ACCESS'], b'/tmp/onedrive',
-               b'test')
+    i_event = (InotifyEvent(wd=1, mask=8, cookie=cookie, len=16),
+               list(type_names), b'/tmp/onedrive', filename)
 
     return Event(i_event)
 
@@ -105,3 +143,18 @@ def gen_events_list(monitor):
     os.system('rm -rf {}'.format(SUBDIR_PATH))
     sleep(1)
     process.terminate()
+
+
+def gen_batches_list(monitor):
+    """
+    :param monitor: an instance of monitor
+    Fills shared variable with batches of events written in a burst
+    """
+
+    process = start_monitor_process(monitor)
+    with open(FPATH, 'w') as stream:
+        for _ in range(100):
+            stream.write('data')
+            stream.flush()
+    sleep(1)
+    process.terminate()
@@ -0,0 +1,121 @@
+"""
+Benchmark of ranged parallel downloads
+
+Serves a file from a local HTTP server which supports ranges and limits the
+throughput of every connection, as a remote server does, and measures a
+single stream against parallel ranges.
+
+Usage:
+    python benchmarks/download.py --size 64 --rate 8 --workers 8
+"""
+
+import argparse
+import http.server
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+
+from onedrive_service.download import RangedDownloader
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Sends ranges of the data at a limited rate
+    """
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Send the requested range
+        """
+
+        data = self.server.data
+        start, end = 0, len(data)
+        if 'Range' in self.headers:
+            first, last = self.headers['Range'].split('=')[1].split('-')
+            start, end = int(first), min(int(last) + 1, end)
+
+        self.send_response(206 if 'Range' in self.headers else 200)
+        self.send_header('Content-Length', str(end - start))
+        self.end_headers()
+
+        # Latency of the first byte, then chunks at the rate
+        time.sleep(self.server.latency)
+        chunk = 64 * 1024
+        view = memoryview(data)
+        for offset in range(start, end, chunk):
+            self.wfile.write(view[offset:min(offset + chunk, end)])
+            time.sleep(chunk / self.server.rate)
+
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """
+    Threaded server with the data to send
+    """
+
+    daemon_threads = True
+    data = b''
+    rate = 1
+    latency = 0
+
+
+def run(name, url, root, size, **kwargs):
+    """
+    :param name: name of the measurement
+    :param url: url of the content
+    :param root: folder to download into
+    :param size: size of the content in bytes
+    :param kwargs: keyword arguments of RangedDownloader
+    """
+
+    dst_file = os.path.join(root, name)
+    started = time.time()
+    RangedDownloader(**kwargs).download(url, dst_file, size)
+    elapsed = time.time() - started
+    print('{:>10}: {:.2f} s, {:.1f} MiB/s'.format(
+        name, elapsed, size / elapsed / 1024 / 1024
+    ))
+
+
+def main():
+    """
+    Run the benchmark
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--size', type=int, default=64,
+                        help='size of the file in MiB')
+    parser.add_argument('--rate', type=int, default=8,
+                        help='throughput of a connection in MiB/s')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='time to the first byte in seconds')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--range-size', type=int, default=4,
+                        help='size of a range in MiB')
+    args = parser.parse_args()
+
+    size = args.size * 1024 * 1024
+    server = Server(('127.0.0.1', 0), Handler)
+    server.data = os.urandom(size)
+    server.rate = args.rate * 1024 * 1024
+    server.latency = args.latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/content'.format(server.server_address[1])
+
+    root = tempfile.mkdtemp()
+    try:
+        run('stream', url, root, size, workers=1, range_size=size)
+        run('ranges', url, root, size, workers=args.workers,
+            range_size=args.range_size * 1024 * 1024)
+    finally:
+        shutil.rmtree(root)
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
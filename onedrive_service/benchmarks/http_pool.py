@@ -0,0 +1,157 @@
+"""
+Benchmark of the pooled HTTP provider
+
+Sends metadata requests through OneDriveUtil to a local stand-in of the API
+and measures the latency of a call with the default provider, which opens a
+connection per request, and with the pooled one. With --tls the stand-in
+serves HTTPS with a self-signed certificate made by openssl, so the cost of
+the handshakes is included.
+
+Usage:
+    python benchmarks/http_pool.py --calls 500 --tls
+"""
+
+import argparse
+import http.server
+import json
+import os
+import shutil
+import socketserver
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+from onedrive_service.http_provider import PooledHttpProvider
+from onedrive_service.util import OneDriveUtil
+import onedrivesdk
+import requests.adapters
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Sends metadata of an item
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go in separate writes
+    disable_nagle_algorithm = True
+    body = json.dumps({'id': 'item', 'name': 'file', 'size': 1}).encode()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Send the item
+        """
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """
+    Threaded server
+    """
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Connections dropped without TLS shutdown aren't of interest
+        pass
+
+
+class AuthProvider(object):  # pylint: disable=too-few-public-methods
+    """
+    Leaves requests unauthenticated
+    """
+
+    def authenticate_request(self, request):
+        """
+        :param request: request to authenticate
+        """
+
+
+def make_certificate(root):
+    """
+    :param root: folder to put the certificate and the key in
+    :return: tuple of paths to the certificate and the key
+    """
+
+    cert = os.path.join(root, 'cert.pem')
+    key = os.path.join(root, 'key.pem')
+    subprocess.check_call([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+        '-days', '1', '-subj', '/CN=127.0.0.1',
+        '-addext', 'subjectAltName=IP:127.0.0.1',
+        '-keyout', key, '-out', cert
+    ], stderr=subprocess.DEVNULL)
+
+    return cert, key
+
+
+def run(name, url, provider, calls):
+    """
+    :param name: name of the measurement
+    :param url: base url of the stand-in
+    :param provider: HTTP provider of the client
+    :param calls: number of calls
+    """
+
+    util = OneDriveUtil(onedrivesdk.OneDriveClient(url, AuthProvider(),
+                                                   provider))
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        util.get_item(item_id='item')
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    print('{:>10}: mean {:.2f} ms, p50 {:.2f} ms, p95 {:.2f} ms'.format(
+        name, statistics.mean(latencies) * 1000,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.95)] * 1000
+    ))
+
+
+def main():
+    """
+    Run the benchmark
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--tls', action='store_true')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    server = Server(('127.0.0.1', 0), Handler)
+    scheme = 'http'
+    if args.tls:
+        cert, key = make_certificate(root)
+        server.socket = ssl.wrap_socket(server.socket, keyfile=key,
+                                        certfile=cert, server_side=True)
+        # Both providers trust the certificate
+        requests.adapters.DEFAULT_CA_BUNDLE_PATH = cert
+        scheme = 'https'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = '{}://127.0.0.1:{}/'.format(scheme, server.server_address[1])
+
+    try:
+        run('default', url, onedrivesdk.HttpProvider(), args.calls)
+        pooled = PooledHttpProvider()
+        run('pooled', url, pooled, args.calls)
+        print('{:>10}: {}'.format('metrics', pooled.metrics.to_dict()))
+    finally:
+        server.shutdown()
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+""" Provides asyncio variant of the service to interact with remote API """
+# pylint: disable=too-many-arguments
+import asyncio
+import json
+
+import aiohttp
+import onedrivesdk
+from onedrivesdk.error import OneDriveError
+from onedrivesdk.request.children_collection import \
+    ChildrenCollectionResponse
+from onedrivesdk.request.item_delta_collection import \
+    ItemDeltaCollectionResponse
+
+from .delta import changes, first_request, next_page_request
+from .http_provider import retry_after
+
+
+# Max number of requests in flight at once
+DEFAULT_CONCURRENCY = 100
+# Max number of connections to a single host
+DEFAULT_LIMIT_PER_HOST = 10
+# Size of the chunks a download is written by
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class AsyncOneDriveUtil(object):
+    """
+    Provides access to the OneDrive API from an event loop
+
+    Methods are coroutines, delta is an asynchronous generator, with the
+    same arguments and results as those of OneDriveUtil. Requests are built
+    and authenticated by the onedrivesdk client and sent with aiohttp.
+    A semaphore bounds the requests in flight and the connector bounds the
+    connections per host. Requests go through the RequestScheduler of the
+    client's http provider if it has one, so they share its rate limits
+    and Retry-After pauses with the synchronous requests.
+    """
+
+    def __init__(self, client, token=None, concurrency=DEFAULT_CONCURRENCY,
+                 limit_per_host=DEFAULT_LIMIT_PER_HOST, loop=None):
+        """
+        :param client: onedrivesdk.OneDriveClient
+        :param token: str, delta token
+        :param concurrency: integer, max number of requests in flight
+        :param limit_per_host: integer, max number of connections per host
+        :param loop: event loop, the current one if None
+        """
+        self.token = token
+        self.client = client
+        self._loop = loop or asyncio.get_event_loop()
+        self._scheduler = getattr(client.http_provider, 'scheduler', None)
+        self._semaphore = asyncio.Semaphore(concurrency, loop=self._loop)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency,
+                                           limit_per_host=limit_per_host,
+                                           loop=self._loop),
+            loop=self._loop
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the connections
+        :return:
+        """
+        await self._session.close()
+
+    async def get_item(self, item_id=None, item_path=None):
+        """
+        Get metadata for a OneDrive item
+        :param item_id:
+        :param item_path:
+        :return: onedrivesdk.Item
+        """
+        req = self.client.item(id=item_id, path=item_path).request()
+
+        return onedrivesdk.Item(await self._send_json(req, 'GET'))
+
+    async def get_items(self, item_id=None, item_path=None):
+        """
+        Get children of a OneDrive item
+        :param item_id:
+        :param item_path:
+        :return: onedrivesdk.ChildrenCollectionPage
+        """
+        req = self.client.item(id=item_id, path=item_path).children.request()
+        response = await self._send_json(req, 'GET')
+
+        return ChildrenCollectionResponse(response).collection_page
+
+    async def delta(self, checkpoint=None):
+        """
+        Streams last changes from OneDrive page by page
+        The token is committed after the last page is consumed
+        :param checkpoint: DeltaCheckpoint
+        :return: async generator of DirtyRemoteItem
+        """
+        self.token, req = first_request(self.client, self.token, checkpoint)
+        page = None
+        while req is not None:
+            response = await self._send_json(req, 'GET')
+            page = ItemDeltaCollectionResponse(response).collection_page
+            for change in changes(page):
+                yield change
+            req = next_page_request(page, self.client, self.token,
+                                    checkpoint)
+
+        self.token = page.token
+
+    async def download(self, dst_file, item_id=None, item_path=None):
+        """
+        Download a OneDrive Item contents
+        :param dst_file: str, local destination file
+        :param item_id:
+        :param item_path:
+        :return:
+        """
+        req = self.client.item(id=item_id, path=item_path).content.request()
+        async with self._semaphore:
+            response = await self._request(req, 'GET')
+            async with response:
+                await self._check(response)
+                with open(dst_file, 'wb') as stream:
+                    while True:
+                        chunk = await response.content.read(
+                            DOWNLOAD_CHUNK_SIZE
+                        )
+                        if not chunk:
+                            break
+                        stream.write(chunk)
+
+    async def simple_upload(self, name, src_file, parent_id=None,
+                            parent_path=None):
+        """
+        Simple item upload to OneDrive
+        It's available for items with less than 4 MB of content
+        :param name:
+        :param src_file: str, path to file to upload
+        :param parent_id:
+        :param parent_path:
+        :return: onedrivesdk.Item
+        """
+        item = self.client.item(id=parent_id, path=parent_path)
+        req = item.children[name].content.request()
+        with open(src_file, 'rb') as stream:
+            data = stream.read()
+
+        return onedrivesdk.Item(await self._send_json(req, 'PUT', data=data))
+
+    async def create_upload_session(self, name, parent_path):
+        """
+        Init an upload session
+        :param name:
+        :param parent_path:
+        :return: onedrivesdk.UploadSession
+        """
+        item = onedrivesdk.ChunkedUploadSessionDescriptor()
+        item.name = name
+        req = self.client.item(path=parent_path).create_session(item) \
+            .request()
+
+        return onedrivesdk.UploadSession(await self._send_json(
+            req, 'POST', content={'item': item.to_dict()}
+        ))
+
+    async def upload_session(self, upload_url, data, total, next_range=0):
+        """
+        Upload the file, or a portion of the file
+        :param upload_url: str, url to upload
+        :param data: data to include in the body of the request
+        :param total: integer, all fragments size in bytes
+        :param next_range: integer, next expected ranges value to determine
+        where to start the next fragment
+        :return: onedrivesdk.UploadSession
+        """
+        req = onedrivesdk.ItemRequestBuilder(upload_url, self.client) \
+            .request()
+        last_range = min(next_range + len(data), total) - 1
+        headers = {
+            'Content-Range': 'bytes {}-{}/{}'.format(next_range, last_range,
+                                                     total),
+            'Content-Length': str(len(data))
+        }
+
+        return onedrivesdk.UploadSession(await self._send_json(
+            req, 'PUT', data=data, headers=headers
+        ))
+
+    async def upload_session_status(self, upload_url):
+        """
+        Check the upload session status
+        :param upload_url:
+        :return: onedrivesdk.UploadSession
+        """
+        req = onedrivesdk.ItemRequestBuilder(upload_url, self.client) \
+            .request()
+
+        return onedrivesdk.UploadSession(await self._send_json(req, 'GET'))
+
+    async def cancel_upload_session(self, upload_url):
+        """
+        Cancel an upload session
+        :param upload_url: str
+        :return:
+        """
+        req = onedrivesdk.ItemRequestBuilder(upload_url, self.client) \
+            .request()
+        await self._send_json(req, 'DELETE')
+
+    async def _request(self, req, method, content=None, data=None,
+                       headers=None):
+        """
+        Authenticate an onedrivesdk request and send it
+        The authentication runs in the default executor, as refreshing of
+        the token is a blocking request
+        :param req: onedrivesdk.RequestBase built for the operation
+        :param method: str, HTTP method
+        :param content: dict sent as JSON body
+        :param data: bytes sent as body
+        :param headers: dict of additional headers
+        :return: aiohttp.ClientResponse to be released by the caller
+        """
+        await self._loop.run_in_executor(
+            None, self.client.auth_provider.authenticate_request, req
+        )
+        # onedrivesdk keeps the headers of a request private
+        all_headers = dict(req._headers)  # pylint: disable=protected-access
+        all_headers.update(headers or {})
+
+        async def send():
+            """
+            :return: aiohttp.ClientResponse
+            """
+            return await self._session.request(method, req.request_url,
+                                               headers=all_headers,
+                                               json=content, data=data)
+
+        if self._scheduler is None:
+            return await send()
+
+        return await self._scheduler.send_async(method, req.request_url, send,
+                                                self._loop)
+
+    async def _send_json(self, req, method, content=None, data=None,
+                         headers=None):
+        """
+        :param req: onedrivesdk.RequestBase
+        :param method: str
+        :param content: dict
+        :param data: bytes
+        :param headers: dict
+        :return: dict, JSON body of the response, None if it's empty
+        """
+        async with self._semaphore:
+            response = await self._request(req, method, content, data,
+                                           headers)
+            async with response:
+                await self._check(response)
+                text = await response.text()
+
+        return json.loads(text) if text else None
+
+    @staticmethod
+    async def _check(response):
+        """
+        Raise the error of a response as onedrivesdk does
+        :param response: aiohttp.ClientResponse
+        :return:
+        """
+        if response.status < 400:
+            return
+
+        text = await response.text()
+        try:
+            error = json.loads(text)['error']
+        except (ValueError, KeyError, TypeError):
+            error = {'code': 'generalException', 'message': text}
+        exc = OneDriveError(error, response.status)
+        exc.retry_after = retry_after(response.headers)
+        raise exc
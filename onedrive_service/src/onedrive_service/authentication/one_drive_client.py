@@ -6,6 +6,8 @@ from onedrivesdk.helpers import GetAuthCodeServer
 
 from .base_client import BaseOneDriveClient
 from .session import Session
+from ..http_provider import DEFAULT_POOL_SIZE, PooledHttpProvider
+from ..scheduler import RequestScheduler
 
 
 API_BASE_URL = 'https://api.onedrive.com/v1.0/'
@@ -23,7 +25,13 @@ class OneDriveClient(BaseOneDriveClient):
         client_id = config['auth']['client_id']
         scopes = config['auth']['scopes']
 
-        http_provider = onedrivesdk.HttpProvider()
+        http_config = config.get('http', {})
+        pool_size = http_config.get('pool_size', DEFAULT_POOL_SIZE)
+        scheduler = None
+        if http_config.get('scheduler') is not None:
+            scheduler = RequestScheduler(**http_config['scheduler'])
+
+        http_provider = PooledHttpProvider(pool_size, scheduler=scheduler)
         auth_provider = onedrivesdk.AuthProvider(http_provider, client_id,
                                                  scopes, session_type=Session)
 
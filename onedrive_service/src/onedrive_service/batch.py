@@ -0,0 +1,235 @@
+""" Provides batching of metadata operations into JSON batch requests
+"""
+from concurrent.futures import Future
+import json
+import logging
+import threading
+
+import onedrivesdk
+from onedrivesdk.error import OneDriveError
+import requests
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Max number of requests in a batch the service accepts
+MAX_BATCH_SIZE = 20
+# Time in seconds an operation waits for others to join its batch
+DEFAULT_BATCH_DELAY = 0.05
+
+
+def item_url(item_id=None, item_path=None, segment=None):
+    """
+    Url of an item relative to the service
+    :param item_id: str
+    :param item_path: str
+    :param segment: str, e.g. 'children'
+    :return: str
+    """
+    if item_id is not None:
+        url = '/drive/items/{}'.format(item_id)
+        return url + '/' + segment if segment else url
+
+    url = '/drive/root:/{}'.format((item_path or '').strip('/'))
+    return url + ':/' + segment if segment else url
+
+
+def parent_reference(parent_id=None, parent_path=None):
+    """
+    :param parent_id: str
+    :param parent_path: str
+    :return: dict of parentReference
+    """
+    if parent_id is not None:
+        return {'id': parent_id}
+
+    return {'path': '/drive/root:/{}'.format((parent_path or '').strip('/'))}
+
+
+class _Operation(object):  # pylint: disable=too-few-public-methods
+    """
+    Request waiting in a batch with the future of its result
+    """
+
+    __slots__ = ('request', 'future', 'convert')
+
+    def __init__(self, request, convert):
+        self.request = request
+        self.future = Future()
+        self.convert = convert
+
+    def resolve(self, response):
+        """
+        Set the result or the error of the response to the future
+        :param response: dict, a response of the batch
+        :return:
+        """
+        status = response.get('status', 500)
+        body = response.get('body') or {}
+        if status >= 400:
+            error = body.get('error') if isinstance(body, dict) else None
+            self.future.set_exception(OneDriveError(
+                dict(error or {}), status
+            ))
+        else:
+            self.future.set_result(self.convert(body))
+
+
+class BatchRequester(object):
+    """
+    Collects operations into JSON batch requests
+
+    Every operation returns a future of its result. A batch is sent once it
+    has `max_size` operations or `delay` seconds after its first operation,
+    whichever comes first. Errors of single operations are set to their
+    futures, errors of the whole batch to all of them.
+    """
+
+    def __init__(self, util, max_size=MAX_BATCH_SIZE,
+                 delay=DEFAULT_BATCH_DELAY):
+        """
+        :param util: an instance of OneDriveUtil
+        :param max_size: integer, max number of operations in a batch
+        :param delay: time in seconds before a batch is sent anyway
+        """
+        self._util = util
+        self._max_size = min(max_size, MAX_BATCH_SIZE)
+        self._delay = delay
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def get_item(self, item_id=None, item_path=None):
+        """
+        Get metadata for a OneDrive item
+        :param item_id:
+        :param item_path:
+        :return: Future of onedrivesdk.Item
+        """
+        return self.submit('GET', item_url(item_id, item_path),
+                           convert=onedrivesdk.Item)
+
+    def move_item(self, item_id=None, item_path=None,
+                  parent_id=None, parent_path=None):
+        """
+        Move an item on OneDrive
+        :param item_id: str, the item to update
+        :param item_path: str
+        :param parent_id: str, new parent id
+        :param parent_path: str
+        :return: Future of onedrivesdk.Item
+        """
+        body = {'parentReference': parent_reference(parent_id, parent_path)}
+
+        return self.submit('PATCH', item_url(item_id, item_path), body,
+                           convert=onedrivesdk.Item)
+
+    def delete_item(self, item_id=None, item_path=None):
+        """
+        Delete an Item in OneDrive
+        :param item_id: str, item id to delete
+        :param item_path: str, item path to delete
+        :return: Future of None
+        """
+        return self.submit('DELETE', item_url(item_id, item_path))
+
+    def create_folder(self, name, parent_id=None, parent_path=None):
+        """
+        Create a new folder in OneDrive
+        :param name: str, new folder name
+        :param parent_id: str, parent id
+        :param parent_path: str, parent path
+        :return: Future of onedrivesdk.Item
+        """
+        body = {'name': name, 'folder': {}}
+
+        return self.submit('POST', item_url(parent_id, parent_path,
+                                            'children'),
+                           body, convert=onedrivesdk.Item)
+
+    def submit(self, method, url, body=None, convert=None):
+        """
+        Add an operation to the current batch
+        :param method: str, HTTP method
+        :param url: str, url relative to the service
+        :param body: dict, JSON body of the request
+        :param convert: callable which takes the body of the response and
+        returns the result, the result is None if it isn't set
+        :return: concurrent.futures.Future
+        """
+        request = {'method': method, 'url': url}
+        if body is not None:
+            request['body'] = body
+            request['headers'] = {'Content-Type': 'application/json'}
+        operation = _Operation(request, convert or (lambda body: None))
+
+        with self._lock:
+            self._pending.append(operation)
+            full = len(self._pending) >= self._max_size
+            if not full and self._timer is None and self._delay is not None:
+                self._timer = threading.Timer(self._delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if full:
+            self.flush()
+
+        return operation.future
+
+    def flush(self):
+        """
+        Send the pending operations
+        :return:
+        """
+        while True:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                operations = self._pending[:self._max_size]
+                del self._pending[:self._max_size]
+            if not operations:
+                return
+            self._send(operations)
+
+    def _send(self, operations):
+        """
+        :param operations: list of _Operation
+        :return:
+        """
+        batch = [dict(operation.request, id=str(index))
+                 for index, operation in enumerate(operations)]
+
+        try:
+            req = onedrivesdk.ItemRequestBuilder(
+                self._util.client.base_url + '$batch', self._util.client
+            ).request()
+            req.method = 'POST'
+            req.content_type = 'application/json'
+            responses = json.loads(
+                req.send(content={'requests': batch}).content
+            )['responses']
+        except (OneDriveError, requests.RequestException, ValueError,
+                KeyError) as exc:
+            LOGGER.warning('Batch of %d operations failed: %s',
+                           len(operations), exc)
+            for operation in operations:
+                operation.future.set_exception(exc)
+            return
+
+        by_id = {response.get('id'): response for response in responses}
+        for index, operation in enumerate(operations):
+            response = by_id.get(str(index))
+            if response is None:
+                operation.future.set_exception(OneDriveError(
+                    {'code': 'generalException',
+                     'message': 'No response in the batch'}, 500
+                ))
+            else:
+                operation.resolve(response)
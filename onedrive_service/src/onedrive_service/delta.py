@@ -0,0 +1,146 @@
+""" Provides conversion of remote changes to entities and checkpoints of
+delta
+"""
+import json
+import logging
+import os
+
+from onedrive_client.entities.common import DirtyRemoteItem
+from onedrivesdk.request.item_delta import ItemDeltaRequest
+
+from .download import hashes_facet
+from .upload import epoch_seconds
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def dirty_remote_item(item):
+    """
+    Convert an item of delta to DirtyRemoteItem entity
+    :param item: onedrivesdk.Item
+    :return: DirtyRemoteItem, the id of the item serves as our_id since it's
+    unique within a drive
+    """
+    raw = item.to_dict()
+    base_item = {
+        'id': item.id.encode(),
+        'e_tag': (item.e_tag or '').encode(),
+        'c_tag': (item.c_tag or '').encode(),
+        'last_modified_date_time':
+            epoch_seconds(item.last_modified_date_time) or 0,
+        'name': item.name or ''
+    }
+
+    entity = {'base_item': base_item, 'size': item.size or 0}
+    if 'file' in raw:
+        facet = hashes_facet(item)
+        entity['file'] = {} if facet is None else {'hashes': facet}
+    for name in ('folder', 'package', 'deleted'):
+        if name in raw:
+            entity[name] = {}
+
+    return DirtyRemoteItem({'our_id': item.id.encode(), 'item': entity})
+
+
+def changes(page):
+    """
+    Convert items of a page of delta as they're consumed
+    :param page: onedrivesdk.ItemDeltaCollectionPage
+    :return: generator of DirtyRemoteItem
+    """
+    return (dirty_remote_item(item) for item in page)
+
+
+def first_request(client, token, checkpoint=None):
+    """
+    :param client: onedrivesdk.OneDriveClient
+    :param token: str, delta token, None to enumerate the whole drive
+    :param checkpoint: DeltaCheckpoint, its token takes precedence and a
+    round it stopped in is resumed
+    :return: tuple of the token the round starts from and the request of
+    its first page
+    """
+    if checkpoint is not None:
+        token = checkpoint.token or token
+        if checkpoint.next_link is not None:
+            return token, ItemDeltaRequest(checkpoint.next_link, client, None)
+
+    return token, client.item(path='/').delta(token).request()
+
+
+def next_page_request(page, client, token, checkpoint=None):
+    """
+    Called once the changes of a page are processed, the progress is saved
+    to the checkpoint
+    :param page: onedrivesdk.ItemDeltaCollectionPage
+    :param client: onedrivesdk.OneDriveClient
+    :param token: str, the token the round started from
+    :param checkpoint: DeltaCheckpoint
+    :return: ItemDeltaRequest of the next page, None after the last one
+    """
+    req = ItemDeltaRequest.get_next_page_request(page, client, None)
+    if checkpoint is not None:
+        if req is None:
+            checkpoint.save(page.token)
+        else:
+            # next_page_link of onedrivesdk returns the delta link
+            checkpoint.save(token, req.request_url)
+
+    return req
+
+
+class DeltaCheckpoint(object):
+    """
+    Keeps the delta token in a JSON file, so a restart of the service
+    continues from the last known snapshot instead of enumerating the drive
+
+    The file is replaced atomically. Within a round the link to the next page
+    is kept along with the token the round started from, so a round
+    interrupted between pages resumes from the first unprocessed page.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: str, path to the checkpoint file
+        """
+        self._path = path
+        self.token = None
+        self.next_link = None
+        self.load()
+
+    def load(self):
+        """
+        Read the checkpoint, a missing or broken file means a full
+        enumeration
+        :return:
+        """
+        try:
+            with open(self._path) as stream:
+                state = json.load(stream)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            LOGGER.warning('Delta checkpoint %s is ignored: %s',
+                           self._path, exc)
+            return
+
+        self.token = state.get('token')
+        self.next_link = state.get('next_link')
+
+    def save(self, token, next_link=None):
+        """
+        Replace the checkpoint file atomically
+        :param token: str, delta token
+        :param next_link: str, link to the next page of the current round,
+        None once the round is completed
+        :return:
+        """
+        tmp_file = self._path + '.tmp'
+        with open(tmp_file, 'w') as stream:
+            json.dump({'token': token, 'next_link': next_link}, stream)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.replace(tmp_file, self._path)
+        self.token = token
+        self.next_link = next_link
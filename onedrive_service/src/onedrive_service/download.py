@@ -0,0 +1,332 @@
+""" Provides parallel download of large files by ranges
+"""
+# pylint: disable=too-many-arguments
+# pylint: disable=too-few-public-methods
+import base64
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import struct
+import zlib
+
+from onedrive_client.entities.hashing import QuickXorHash
+from onedrive_client.entities.onedrive import HashesFacet
+import requests
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RANGE_SIZE = 16 * 1024 * 1024
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 3
+# Size of the chunks a response is written by
+WRITE_SIZE = 1024 * 1024
+
+PART_SUFFIX = '.part'
+STATE_SUFFIX = '.part.json'
+
+
+class DownloadError(Exception):
+    """
+    Downloaded content doesn't match the item
+    """
+
+
+def hashes_facet(item):
+    """
+    Convert the hashes of an item to HashesFacet entity
+    :param item: onedrivesdk.Item
+    :return: HashesFacet, hashes are raw bytes, None if the item has none
+    """
+    if item.file is None or item.file.hashes is None:
+        return None
+
+    hashes = item.file.hashes
+    facet = HashesFacet()
+    if hashes.crc32_hash:
+        facet['crc32_hash'] = bytes.fromhex(hashes.crc32_hash)
+    if hashes.sha1_hash:
+        facet['sha1_hash'] = bytes.fromhex(hashes.sha1_hash)
+    # Not a property of onedrivesdk.Hashes
+    quick_xor = hashes.to_dict().get('quickXorHash')
+    if quick_xor:
+        facet['quick_xor_hash'] = base64.b64decode(quick_xor)
+
+    return facet
+
+
+def verify(path, facet):
+    """
+    Compare content of a file with the hashes
+    :param path: str, path to file
+    :param facet: HashesFacet or None
+    :return: bool, False if a hash doesn't match
+    """
+    if facet is None or not (facet['crc32_hash'] or facet['sha1_hash'] or
+                             facet['quick_xor_hash']):
+        LOGGER.warning('No hashes to verify %s with', path)
+        return True
+
+    crc32 = 0
+    sha1 = hashlib.sha1()
+    quick_xor = QuickXorHash()
+    buffer = bytearray(WRITE_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as stream:
+        while True:
+            size = stream.readinto(buffer)
+            if not size:
+                break
+            crc32 = zlib.crc32(view[:size], crc32)
+            sha1.update(view[:size])
+            quick_xor.update(view[:size])
+
+    expected = [(facet['crc32_hash'], struct.pack('<I', crc32)),
+                (facet['sha1_hash'], sha1.digest()),
+                (facet['quick_xor_hash'], quick_xor.digest())]
+
+    return all(actual == value for value, actual in expected if value)
+
+
+class RangedDownloader(object):
+    """
+    Downloads a file by ranges in parallel
+
+    Ranges are written into a preallocated part file next to the
+    destination. The ranges written so far are recorded in a state file,
+    so an interrupted download continues with the rest of them. The part
+    file replaces the destination once the content matches the hashes.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, range_size=DEFAULT_RANGE_SIZE,
+                 retries=DEFAULT_RETRIES, session=None):
+        """
+        :param workers: integer, max number of ranges in flight
+        :param range_size: integer, size of a range in bytes
+        :param retries: integer, number of attempts to get a range again
+        :param session: requests.Session to send the requests through
+        """
+        self._workers = workers
+        self._range_size = range_size
+        self._retries = retries
+        self._session = session or requests.Session()
+
+    def download(self, download_url, dst_file, size, facet=None):
+        """
+        Download a file
+        :param download_url: str, pre-authenticated url of the content
+        :param dst_file: str, local destination file
+        :param size: integer, size of the content in bytes
+        :param facet: HashesFacet to verify the content with
+        :return:
+        """
+        part_file = dst_file + PART_SUFFIX
+        state_file = dst_file + STATE_SUFFIX
+        key = {'size': size, 'hashes': self._hashes_key(facet)}
+        done = self._load_state(state_file, part_file, key)
+
+        fileno = os.open(part_file, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if not done:
+                self._allocate(fileno, size)
+            state = dict(key, done=done)
+            written = set(map(tuple, done))
+            ranges = [item for item in self._ranges(size)
+                      if item not in written]
+            self._fetch_ranges(download_url, fileno, ranges, state,
+                               state_file)
+            os.fsync(fileno)
+        finally:
+            os.close(fileno)
+
+        if not verify(part_file, facet):
+            os.remove(part_file)
+            self._remove_state(state_file)
+            raise DownloadError('Content of {} doesn\'t match its hashes'
+                                .format(dst_file))
+
+        os.replace(part_file, dst_file)
+        self._remove_state(state_file)
+
+    def _fetch_ranges(self, download_url, fileno, ranges, state,
+                      state_file):
+        """
+        :param download_url: str
+        :param fileno: integer, descriptor of the part file
+        :param ranges: list of (start, end) ranges to get
+        :param state: dict to record the written ranges in
+        :param state_file: str, path to the state file
+        :return:
+        """
+        pending = set()
+        with concurrent.futures.ThreadPoolExecutor(self._workers) as executor:
+            for start, end in ranges:
+                if len(pending) >= self._workers:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    self._collect(done, fileno, state, state_file)
+                pending.add(executor.submit(self._fetch, download_url,
+                                            fileno, start, end))
+
+            done, _ = concurrent.futures.wait(pending)
+            self._collect(done, fileno, state, state_file)
+
+    def _collect(self, futures, fileno, state, state_file):
+        """
+        Record the written ranges once they are on disk
+        :param futures: set of completed futures of ranges
+        :param fileno: integer, descriptor of the part file
+        :param state: dict
+        :param state_file: str
+        :return:
+        """
+        written = []
+        errors = []
+        for future in futures:
+            try:
+                written.append(list(future.result()))
+            except (requests.RequestException, DownloadError) as exc:
+                errors.append(exc)
+
+        if written:
+            os.fdatasync(fileno)
+            state['done'].extend(written)
+            self._save_state(state_file, state)
+        if errors:
+            raise errors[0]
+
+    def _fetch(self, download_url, fileno, start, end):
+        """
+        Get a range and write it into the part file
+        :param download_url: str
+        :param fileno: integer, descriptor of the part file
+        :param start: integer, first byte of the range
+        :param end: integer, byte after the last one of the range
+        :return: tuple of start and end
+        """
+        attempt = 0
+        while True:
+            try:
+                self._fetch_once(download_url, fileno, start, end)
+                return start, end
+            except (requests.RequestException, DownloadError) as exc:
+                attempt += 1
+                if attempt > self._retries:
+                    raise
+                LOGGER.warning('Range %d-%d of %s failed, retrying: %s',
+                               start, end - 1, download_url, exc)
+
+    def _fetch_once(self, download_url, fileno, start, end):
+        """
+        :param download_url: str
+        :param fileno: integer, descriptor of the part file
+        :param start: integer
+        :param end: integer
+        :return:
+        """
+        headers = {'Range': 'bytes={}-{}'.format(start, end - 1)}
+        with self._session.get(download_url, headers=headers,
+                               stream=True) as response:
+            response.raise_for_status()
+            if response.status_code != 206 and start != 0:
+                raise DownloadError('Server ignored the range')
+
+            offset = start
+            for chunk in response.iter_content(WRITE_SIZE):
+                chunk = chunk[:end - offset]
+                view = memoryview(chunk)
+                while view:
+                    written = os.pwrite(fileno, view, offset)
+                    offset += written
+                    view = view[written:]
+                if offset >= end:
+                    break
+
+        if offset != end:
+            raise DownloadError('Range {}-{} is incomplete'.format(start,
+                                                                   end - 1))
+
+    def _ranges(self, size):
+        """
+        :param size: integer, size of the content in bytes
+        :return: generator of (start, end) ranges
+        """
+        for start in range(0, size, self._range_size):
+            yield start, min(start + self._range_size, size)
+
+    @staticmethod
+    def _allocate(fileno, size):
+        """
+        Reserve the space of the whole file
+        :param fileno: integer
+        :param size: integer
+        :return:
+        """
+        os.ftruncate(fileno, size)
+        if size:
+            try:
+                os.posix_fallocate(fileno, 0, size)
+            except OSError as exc:
+                LOGGER.debug('Failed to preallocate %d bytes: %s', size, exc)
+
+    @staticmethod
+    def _hashes_key(facet):
+        """
+        :param facet: HashesFacet or None
+        :return: str identifying the content
+        """
+        if facet is None:
+            return None
+
+        return (facet['sha1_hash'] or facet['crc32_hash'] or
+                facet['quick_xor_hash']).hex()
+
+    def _load_state(self, state_file, part_file, key):
+        """
+        :param state_file: str
+        :param part_file: str
+        :param key: dict identifying the content being downloaded
+        :return: list of [start, end] ranges already written, empty if the
+        download starts over
+        """
+        try:
+            with open(state_file) as stream:
+                state = json.load(stream)
+        except (OSError, ValueError):
+            return []
+
+        if any(state.get(name) != value for name, value in key.items()) \
+                or not os.path.exists(part_file) \
+                or state.get('range_size') != self._range_size:
+            LOGGER.info('Download of %s starts over', part_file)
+            return []
+
+        return state['done']
+
+    @staticmethod
+    def _remove_state(state_file):
+        """
+        :param state_file: str, it isn't written if there were no ranges to
+        get, e.g. for an empty file
+        :return:
+        """
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(state_file)
+
+    def _save_state(self, state_file, state):
+        """
+        Replace the state file atomically
+        :param state_file: str
+        :param state: dict
+        :return:
+        """
+        tmp_file = state_file + '.tmp'
+        with open(tmp_file, 'w') as stream:
+            json.dump(dict(state, range_size=self._range_size), stream)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.replace(tmp_file, state_file)
@@ -0,0 +1,238 @@
+""" Provides HTTP provider sharing a pool of keep-alive connections
+"""
+# pylint: disable=too-many-arguments
+from datetime import datetime, timezone
+import email.utils
+import threading
+
+import onedrivesdk
+from onedrivesdk.error import OneDriveError
+from onedrivesdk.http_response import HttpResponse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+DEFAULT_POOL_SIZE = 10
+# Size of the chunks a download is written by
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class ConnectionMetrics(object):
+    """
+    Counts requests sent through a session and the connections opened
+    for them
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def reused(self):
+        """
+        Number of requests sent over an already open connection
+        :return: integer
+        """
+        return max(self.requests - self.connections, 0)
+
+    def add_request(self):
+        """
+        :return:
+        """
+        with self._lock:
+            self.requests += 1
+
+    def add_connection(self):
+        """
+        :return:
+        """
+        with self._lock:
+            self.connections += 1
+
+    def to_dict(self):
+        """
+        :return: dict of the counters
+        """
+        return {'requests': self.requests, 'connections': self.connections,
+                'reused': self.reused}
+
+
+def retry_after(headers):
+    """
+    :param headers: dict of the headers of a response
+    :return: float, seconds to wait before the next request as Retry-After
+    says, None if it isn't there
+    """
+    value = headers.get('Retry-After')
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def http_response(status, headers, content):
+    """
+    Make onedrivesdk.HttpResponse, errors are raised also for responses
+    without a body and carry the time to wait as `retry_after`
+    :param status: integer, HTTP status
+    :param headers: dict of the headers
+    :param content: str, body of the response
+    :return: onedrivesdk.HttpResponse
+    """
+    try:
+        if status >= 400 and not content:
+            raise OneDriveError({'code': 'generalException',
+                                 'message': 'HTTP {}'.format(status)}, status)
+        return HttpResponse(status, headers, content)
+    except OneDriveError as exc:
+        exc.retry_after = retry_after(headers)
+        raise
+
+
+def _counting_pool(base, metrics):
+    """
+    :param base: class of urllib3 connection pool
+    :param metrics: ConnectionMetrics to count the new connections in
+    :return: subclass of the pool counting the connections it opens
+    """
+    class CountingPool(base):  # pylint: disable=too-few-public-methods
+        """
+        Connection pool counting the connections it opens
+        """
+
+        def _new_conn(self):
+            metrics.add_connection()
+            return super()._new_conn()
+
+    return CountingPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    """
+    Adapter with connection pools counting the connections, requests go
+    through the scheduler if there's one
+    """
+
+    def __init__(self, metrics, scheduler=None, **kwargs):
+        self._metrics = metrics
+        self._scheduler = scheduler
+        super().__init__(**kwargs)
+
+    # pylint: disable=arguments-differ
+    def send(self, request, *args, **kwargs):
+        send = super().send
+
+        def attempt():
+            """
+            :return: requests.Response
+            """
+            self._metrics.add_request()
+            return send(request, *args, **kwargs)
+
+        if self._scheduler is None:
+            return attempt()
+
+        return self._scheduler.send(request.method, request.url, attempt,
+                                    not hasattr(request.body, 'read'))
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self._metrics),
+            'https': _counting_pool(HTTPSConnectionPool, self._metrics)
+        }
+
+
+class PooledHttpProvider(onedrivesdk.HttpProvider):
+    """
+    HTTP provider sending all the requests through a single session
+
+    Connections are kept alive in the pool of the session, so consecutive
+    calls to the API don't pay for a TCP and TLS handshake each.
+    The pool is thread-safe and holds up to `pool_size` connections per
+    host. requests speaks HTTP/1.1 only, so HTTP/2 isn't used.
+    With a RequestScheduler all the requests of the session, including
+    those of RangedDownloader, keep to its limits.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, pool_block=False,
+                 scheduler=None):
+        """
+        :param pool_size: integer, max number of connections kept per host
+        :param pool_block: wait for a free connection rather than open
+        one beyond the pool size
+        :param scheduler: RequestScheduler to send the requests through
+        """
+        self.metrics = ConnectionMetrics()
+        self.scheduler = scheduler
+        self.session = requests.Session()
+        adapter = _CountingAdapter(self.metrics, scheduler,
+                                   pool_connections=pool_size,
+                                   pool_maxsize=pool_size,
+                                   pool_block=pool_block)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        """
+        Close the pooled connections
+        :return:
+        """
+        self.session.close()
+
+    def send(self, method, headers, url, data=None, content=None, path=None):
+        """
+        Send a request
+        :param method: str, HTTP method
+        :param headers: dict of the headers
+        :param url: str
+        :param data: body of the request
+        :param content: dict sent as JSON body
+        :param path: str, path to file sent as the body
+        :return: onedrivesdk.HttpResponse
+        """
+        # Prepared as onedrivesdk does, settings from the environment and
+        # the session aren't merged in
+        if path:
+            with open(path, mode='rb') as stream:
+                request = requests.Request(method, url, headers=headers,
+                                           data=stream)
+                response = self.session.send(request.prepare())
+        else:
+            request = requests.Request(method, url, headers=headers,
+                                       data=data, json=content)
+            response = self.session.send(request.prepare())
+
+        return http_response(response.status_code, response.headers,
+                             response.text)
+
+    def download(self, headers, url, path):
+        """
+        Download content to a file
+        :param headers: dict of the headers
+        :param url: str
+        :param path: str, local path to save the content to
+        :return: onedrivesdk.HttpResponse
+        """
+        request = requests.Request('GET', url, headers=headers)
+        with self.session.send(request.prepare(), stream=True) as response:
+            if response.status_code != 200:
+                return http_response(response.status_code, response.headers,
+                                     response.text)
+
+            with open(path, 'wb') as stream:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    stream.write(chunk)
+
+            return HttpResponse(response.status_code, response.headers, None)
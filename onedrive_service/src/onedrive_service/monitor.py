@@ -1,18 +1,95 @@
 """ Provides functionality to monitor remote changes
 """
+import logging
+import threading
 
-from time import sleep
+from onedrivesdk.error import OneDriveError
 
+from .scheduler import THROTTLED_STATUSES
 
-class OneDriveMonitor(object):
+
+LOGGER = logging.getLogger(__name__)
+
+# Delay in seconds after a round with changes
+DEFAULT_MIN_INTERVAL = 1
+# Max delay in seconds after rounds without changes
+DEFAULT_MAX_INTERVAL = 120
+
+
+class PollingSchedule(object):
+    """
+    Delays between delta rounds
+
+    The delay drops to `min_interval` after a round with changes and grows
+    by `factor` after every empty or throttled round up to `max_interval`.
+    A Retry-After of a throttled round is waited out in full.
+    """
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, factor=2):
+        """
+        :param min_interval: delay in seconds after a round with changes
+        :param max_interval: max delay in seconds
+        :param factor: growth of the delay after an empty round
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.delay = min_interval
+
+    def changed(self, count):
+        """
+        :param count: integer, number of changes of the round
+        :return: delay in seconds before the next round
+        """
+        if count:
+            self.delay = self.min_interval
+        else:
+            self._back_off()
+
+        return self.delay
+
+    def throttled(self, retry_after=None):
+        """
+        :param retry_after: seconds the service asked to wait, None if it
+        didn't
+        :return: delay in seconds before the next round
+        """
+        self._back_off()
+
+        return max(self.delay, retry_after or 0)
+
+    def _back_off(self):
+        self.delay = min(max(self.delay, self.min_interval) * self.factor,
+                         self.max_interval)
+
+
+class OneDriveMonitor(object):  # pylint: disable=too-many-instance-attributes
     """
     Monitor any changes and feed subscribers
+
+    By default delta is polled on the adaptive schedule. In the push mode
+    a round runs once `notify` is called, e.g. by NotificationReceiver,
+    and at least every `max_interval` of the schedule in case a
+    notification is lost.
     """
 
-    def __init__(self, service):
+    def __init__(self, service, checkpoint=None, schedule=None, push=False):
+        """
+        :param service: an instance of OneDriveUtil
+        :param checkpoint: DeltaCheckpoint keeping the progress across
+        restarts
+        :param schedule: PollingSchedule
+        :param push: run rounds on notifications
+        """
         self.service = service
+        self.checkpoint = checkpoint
+        self.schedule = schedule or PollingSchedule()
+        self.push = push
         self._run = False
-        self._timeout = 5
+        self._throttled = False
+        self._stopped = threading.Event()
+        self._notified = threading.Event()
         self.__subscribers = set()
 
     def register(self, subscriber):
@@ -37,10 +114,42 @@ class OneDriveMonitor(object):
         :return:
         """
         self._run = True
+        self._stopped.clear()
         while self._run:
-            items = self.service.delta()
-            self.dispatch(items)
-            sleep(self._timeout)
+            delay = self.poll()
+            if self.push and not self._throttled:
+                delay = self.schedule.max_interval
+            self._wait(delay)
+
+    def poll(self):
+        """
+        Run a delta round and feed subscribers with its changes
+        :return: delay in seconds before the next round
+        """
+        self._notified.clear()
+        count = 0
+        try:
+            for item in self.service.delta(self.checkpoint):
+                self.dispatch(item)
+                count += 1
+        except OneDriveError as exc:
+            if exc.status_code not in THROTTLED_STATUSES:
+                raise
+            self._throttled = True
+            delay = self.schedule.throttled(getattr(exc, 'retry_after', None))
+            LOGGER.warning('Delta is throttled, next round in %.1f s', delay)
+            return delay
+
+        self._throttled = False
+        return self.schedule.changed(count)
+
+    def notify(self):
+        """
+        Start the next round now, a throttled round still waits out
+        Retry-After
+        :return:
+        """
+        self._notified.set()
 
     def shutdown(self):
         """
@@ -48,6 +157,8 @@ class OneDriveMonitor(object):
         :return:
         """
         self._run = False
+        self._stopped.set()
+        self._notified.set()
 
     @property
     def subscribers(self):
@@ -59,9 +170,19 @@ class OneDriveMonitor(object):
 
     def dispatch(self, data):
         """
-        Send raw data to subscribers
-        :param data:
+        Send a change to subscribers
+        :param data: DirtyRemoteItem
         :return:
         """
         for subscriber in self.subscribers:
             subscriber.receive(data)
+
+    def _wait(self, delay):
+        """
+        :param delay: seconds to wait unless notified
+        :return:
+        """
+        if self._throttled:
+            self._stopped.wait(delay)
+        else:
+            self._notified.wait(delay)
@@ -0,0 +1,126 @@
+""" Provides receiver of webhook notifications of OneDrive
+"""
+import http.server
+import json
+import logging
+import socketserver
+import threading
+from urllib.parse import parse_qs, urlparse
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers validation requests and passes notifications to the receiver
+    """
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        A subscription is validated by echoing validationToken, any other
+        request is a notification
+        """
+        query = parse_qs(urlparse(self.path).query)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if 'validationToken' in query:
+            self._send(200, query['validationToken'][0].encode())
+            return
+
+        try:
+            notifications = json.loads(body.decode())['value']
+        except (ValueError, KeyError, TypeError):
+            self._send(400)
+            return
+
+        # The service retries notifications which aren't accepted quickly
+        self._send(202)
+        self.server.receiver.receive(notifications)
+
+    def _send(self, status, body=b''):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class NotificationReceiver(object):
+    """
+    HTTP endpoint for webhook notifications of OneDrive
+
+    The endpoint has to be reachable by the service at the notification
+    url of the subscription. Every notification with the expected client
+    state calls `callback`, usually OneDriveMonitor.notify.
+    """
+
+    def __init__(self, callback, host='127.0.0.1', port=0,
+                 client_state=None):
+        """
+        :param callback: callable without arguments
+        :param host: str, address to listen at
+        :param port: integer, port to listen at, any free one if 0
+        :param client_state: str, secret the subscription was created with,
+        notifications with another one are ignored
+        """
+        self._callback = callback
+        self._client_state = client_state
+        self._server = _Server((host, port), _Handler)
+        self._server.receiver = self
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def url(self):
+        """
+        Url of the endpoint
+        :return: str
+        """
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def start(self):
+        """
+        Start listening in a background thread
+        :return:
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """
+        Stop listening
+        :return:
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def receive(self, notifications):
+        """
+        :param notifications: list of dict, notifications of a request
+        :return:
+        """
+        valid = [notification for notification in notifications
+                 if self._client_state is None or
+                 notification.get('clientState') == self._client_state]
+        if len(valid) < len(notifications):
+            LOGGER.warning('%d notifications with unexpected client state',
+                           len(notifications) - len(valid))
+        if valid:
+            self._callback()
@@ -0,0 +1,376 @@
+""" Provides scheduling of API requests within the limits of the service
+"""
+# pylint: disable=too-many-arguments
+import asyncio
+import collections
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from .http_provider import retry_after
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Requests per second and burst of every class of endpoints
+DEFAULT_RATES = {
+    'metadata': (10.0, 20),
+    'delta': (2.0, 4),
+    'batch': (2.0, 4),
+    'content': (8.0, 16)
+}
+# Max number of requests in flight at once
+DEFAULT_CONCURRENCY = 8
+# Max number of times a throttled request is sent again
+DEFAULT_RETRIES = 5
+# First delay in seconds of the backoff when there's no Retry-After
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 60.0
+# Statuses the service throttles requests with
+THROTTLED_STATUSES = (429, 503)
+
+
+def endpoint_class(method, url):
+    """
+    :param method: str, HTTP method
+    :param url: str
+    :return: str, class of the endpoint, one of keys of DEFAULT_RATES
+    """
+    path = urlparse(url).path
+    if path.endswith('$batch'):
+        return 'batch'
+    if 'view.delta' in path:
+        return 'delta'
+    if path.endswith('/content') or method == 'PUT':
+        return 'content'
+
+    return 'metadata'
+
+
+class TokenBucket(object):
+    """
+    Rate limit of a class of endpoints which can be paused by Retry-After
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        :param rate: tokens added per second
+        :param capacity: max number of tokens, size of a burst
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """
+        Let no request through for the given time
+        :param seconds: float
+        :return:
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until,
+                                     time.monotonic() + seconds)
+
+    def try_acquire(self):
+        """
+        Take a token if there's one
+        :return: float, seconds to wait before the next attempt, None if
+        the token is taken
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens +
+                               (now - self._updated) * self.rate)
+            self._updated = now
+            if now >= self._paused_until and self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return max(self._paused_until - now,
+                       (1 - self._tokens) / self.rate)
+
+    def acquire(self):
+        """
+        Wait for a token
+        :return: float, seconds waited
+        """
+        started = time.monotonic()
+        delay = self.try_acquire()
+        while delay is not None:
+            time.sleep(delay)
+            delay = self.try_acquire()
+
+        return time.monotonic() - started
+
+    async def acquire_async(self, loop=None):
+        """
+        Wait for a token without blocking the event loop
+        :param loop: event loop
+        :return: float, seconds waited
+        """
+        started = time.monotonic()
+        delay = self.try_acquire()
+        while delay is not None:
+            await asyncio.sleep(delay, loop=loop)
+            delay = self.try_acquire()
+
+        return time.monotonic() - started
+
+
+class ConcurrencyLimit(object):
+    """
+    Cap of requests in flight shared by threads and event loops
+    """
+
+    def __init__(self, limit):
+        """
+        :param limit: integer, max number of requests in flight
+        """
+        self.limit = limit
+        self._active = 0
+        self._condition = threading.Condition()
+        # Futures of coroutines waiting for a slot with their loops
+        self._waiters = collections.deque()
+
+    def acquire(self):
+        """
+        Wait for a slot
+        :return:
+        """
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+    async def acquire_async(self, loop=None):
+        """
+        Wait for a slot without blocking the event loop
+        :param loop: event loop
+        :return:
+        """
+        loop = loop or asyncio.get_event_loop()
+        while True:
+            with self._condition:
+                if self._active < self.limit:
+                    self._active += 1
+                    return
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            await future
+
+    def release(self):
+        """
+        Free a slot and wake up the waiters to compete for it
+        :return:
+        """
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+            waiters, self._waiters = self._waiters, collections.deque()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake_up, future)
+
+
+def _wake_up(future):
+    """
+    :param future: asyncio.Future of a waiting coroutine
+    :return:
+    """
+    if not future.done():
+        future.set_result(None)
+
+
+class SchedulerMetrics(object):
+    """
+    Live counters of the scheduler
+    """
+
+    def __init__(self):
+        self.queued = 0
+        self.active = 0
+        self.sent = 0
+        self.throttled = 0
+        self.wait_time = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, **deltas):
+        """
+        :param deltas: increments of the counters by name
+        :return:
+        """
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self):
+        """
+        :return: dict of the counters
+        """
+        with self._lock:
+            return {'queued': self.queued, 'active': self.active,
+                    'sent': self.sent, 'throttled': self.throttled,
+                    'wait_time': self.wait_time}
+
+
+class RequestScheduler(object):
+    """
+    Sends API requests within the limits of the service
+
+    Every class of endpoints has its token bucket and no more than
+    `concurrency` requests are in flight at once. A throttled request is
+    sent again after Retry-After, which also pauses the whole class, or
+    after a jittered exponential backoff if the service doesn't say.
+    Requests of event loops share the token buckets and the cap of requests
+    in flight with the others.
+    """
+
+    def __init__(self, rates=None, concurrency=DEFAULT_CONCURRENCY,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF):
+        """
+        :param rates: dict of (requests per second, burst) by endpoint
+        class, overrides DEFAULT_RATES
+        :param concurrency: integer, max number of requests in flight
+        :param retries: integer, max number of retries of a throttled
+        request
+        :param backoff: first delay in seconds of the backoff
+        :param max_backoff: max delay in seconds of the backoff
+        """
+        rates = dict(DEFAULT_RATES, **(rates or {}))
+        self.buckets = {name: TokenBucket(rate, capacity)
+                        for name, (rate, capacity) in rates.items()}
+        self.metrics = SchedulerMetrics()
+        self._slots = ConcurrencyLimit(concurrency)
+        self._retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+
+    def send(self, method, url, send, replayable=True):
+        """
+        Send a request within the limits of its endpoint class
+        :param method: str, HTTP method
+        :param url: str
+        :param send: callable sending the request and returning
+        requests.Response
+        :param replayable: whether the request can be sent again, a request
+        streaming its body from a file can't
+        :return: requests.Response, the last one if all the retries were
+        throttled
+        """
+        name = endpoint_class(method, url)
+        bucket = self.buckets.get(name, self.buckets['metadata'])
+        attempt = 0
+        while True:
+            response = self._send_once(bucket, send)
+            delay = self._retry_delay(name, bucket, response.status_code,
+                                      response.headers,
+                                      attempt if replayable else None)
+            if delay is None:
+                return response
+
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    async def send_async(self, method, url, send, loop=None):
+        """
+        Send a request of an event loop within the limits of its endpoint
+        class
+        :param method: str, HTTP method
+        :param url: str
+        :param send: coroutine function sending the request and returning
+        aiohttp.ClientResponse
+        :param loop: event loop
+        :return: aiohttp.ClientResponse, the last one if all the retries
+        were throttled
+        """
+        name = endpoint_class(method, url)
+        bucket = self.buckets.get(name, self.buckets['metadata'])
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            self.metrics.update(queued=1)
+            try:
+                await bucket.acquire_async(loop)
+                await self._slots.acquire_async(loop)
+            finally:
+                self.metrics.update(queued=-1,
+                                    wait_time=time.monotonic() - started)
+
+            self.metrics.update(active=1, sent=1)
+            try:
+                response = await send()
+            finally:
+                self.metrics.update(active=-1)
+                self._slots.release()
+
+            delay = self._retry_delay(name, bucket, response.status,
+                                      response.headers, attempt)
+            if delay is None:
+                return response
+
+            response.release()
+            await asyncio.sleep(delay, loop=loop)
+            attempt += 1
+
+    def _send_once(self, bucket, send):
+        """
+        :param bucket: TokenBucket of the endpoint class
+        :param send: callable sending the request
+        :return: requests.Response
+        """
+        started = time.monotonic()
+        self.metrics.update(queued=1)
+        try:
+            bucket.acquire()
+            self._slots.acquire()
+        finally:
+            self.metrics.update(queued=-1,
+                                wait_time=time.monotonic() - started)
+
+        self.metrics.update(active=1, sent=1)
+        try:
+            return send()
+        finally:
+            self.metrics.update(active=-1)
+            self._slots.release()
+
+    def _retry_delay(self, name, bucket, status, headers, attempt):
+        """
+        :param name: str, endpoint class
+        :param bucket: TokenBucket of the endpoint class
+        :param status: integer, HTTP status of the response
+        :param headers: headers of the response
+        :param attempt: integer, number of the retry from 0, None if the
+        request can't be sent again
+        :return: float, delay in seconds before the request is sent again,
+        None if the response is final
+        """
+        if status not in THROTTLED_STATUSES:
+            return None
+
+        self.metrics.update(throttled=1)
+        if attempt is None or attempt >= self._retries:
+            return None
+
+        delay = retry_after(headers)
+        if delay is None:
+            delay = self._backoff_delay(attempt)
+        else:
+            bucket.pause(delay)
+        LOGGER.info('Request of %s endpoint is throttled, retry in %.2f s',
+                    name, delay)
+
+        return delay
+
+    def _backoff_delay(self, attempt):
+        """
+        :param attempt: integer, number of the retry from 0
+        :return: float, delay in seconds with full jitter
+        """
+        return random.uniform(0, min(self._max_backoff,
+                                     self._backoff * 2 ** attempt))
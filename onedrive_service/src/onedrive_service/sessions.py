@@ -0,0 +1,148 @@
+""" Provides persistent store of upload sessions
+"""
+import collections
+import logging
+import os
+import sqlite3
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Identity of a source file, a session is only resumed for the same file
+FileIdentity = collections.namedtuple('FileIdentity', [
+    'inode', 'size', 'modified', 'file_hash'
+])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    path TEXT PRIMARY KEY,
+    upload_url TEXT NOT NULL,
+    expiration INTEGER,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    modified INTEGER NOT NULL,
+    file_hash BLOB
+)
+"""
+
+
+def file_identity(src_file, file_hash=None):
+    """
+    :param src_file: str, path to file
+    :param file_hash: bytes, hash of the file content if it's known
+    :return: FileIdentity
+    """
+    stat = os.stat(src_file)
+
+    return FileIdentity(stat.st_ino, stat.st_size, stat.st_mtime_ns,
+                        file_hash)
+
+
+class UploadSessionStore(object):
+    """
+    Keeps upload sessions of files in SQLite database, so uploads continue
+    after a restart of the service
+
+    A session is recorded with the identity of the file it was created for
+    and is discarded once the file has changed or the session has expired.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: str, path to the database file
+        """
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(_SCHEMA)
+        self._connection.commit()
+
+    def close(self):
+        """
+        Close the database
+        :return:
+        """
+        self._connection.close()
+
+    def save(self, src_file, upload_url, expiration=None, file_hash=None):
+        """
+        Record the session of a file
+        :param src_file: str, path to file being uploaded
+        :param upload_url: str, url of the upload session
+        :param expiration: integer, expiration time of the session in
+        seconds since the epoch
+        :param file_hash: bytes, hash of the file content
+        :return:
+        """
+        identity = file_identity(src_file, file_hash)
+        with self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO upload_sessions VALUES '
+                '(?, ?, ?, ?, ?, ?, ?)',
+                (src_file, upload_url, expiration) + tuple(identity)
+            )
+
+    def load(self, src_file, file_hash=None):
+        """
+        Get the session of a file
+        :param src_file: str, path to file being uploaded
+        :param file_hash: bytes, current hash of the file content, compared
+        only if the session was recorded with a hash
+        :return: str, url of the upload session, None if there is no session
+        or it can't be resumed anymore
+        """
+        row = self._connection.execute(
+            'SELECT upload_url, expiration, inode, size, modified, file_hash '
+            'FROM upload_sessions WHERE path = ?', (src_file,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        upload_url, expiration = row[:2]
+        recorded = FileIdentity(*row[2:])
+        try:
+            current = file_identity(src_file, file_hash)
+        except OSError:
+            current = None
+
+        if expiration is not None and expiration <= time.time():
+            LOGGER.info('Upload session of %s has expired', src_file)
+        elif not self._is_same_file(recorded, current):
+            LOGGER.info('%s has changed, its upload session is discarded',
+                        src_file)
+        else:
+            return upload_url
+
+        self.remove(src_file)
+        return None
+
+    def remove(self, src_file):
+        """
+        Forget the session of a file
+        :param src_file: str, path to file
+        :return:
+        """
+        with self._connection:
+            self._connection.execute(
+                'DELETE FROM upload_sessions WHERE path = ?', (src_file,)
+            )
+
+    def paths(self):
+        """
+        :return: list of paths to files which have upload sessions
+        """
+        return [path for path, in self._connection.execute(
+            'SELECT path FROM upload_sessions ORDER BY path'
+        )]
+
+    @staticmethod
+    def _is_same_file(recorded, current):
+        """
+        :param recorded: FileIdentity recorded with the session
+        :param current: FileIdentity of the file now, None if it's gone
+        :return: bool
+        """
+        if current is None or recorded[:3] != current[:3]:
+            return False
+
+        return recorded.file_hash is None or current.file_hash is None or \
+            recorded.file_hash == current.file_hash
@@ -0,0 +1,293 @@
+""" Provides upload of large files through upload sessions
+"""
+# pylint: disable=too-many-arguments
+import calendar
+import concurrent.futures
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+
+from onedrive_client.entities.onedrive import UploadStatus
+import onedrivesdk
+from onedrivesdk.error import OneDriveError
+import requests
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Fragment sizes must be multiples of 320 KiB and must not exceed 60 MiB
+FRAGMENT_UNIT = 320 * 1024
+MAX_FRAGMENT_SIZE = 192 * FRAGMENT_UNIT
+DEFAULT_FRAGMENT_SIZE = 32 * FRAGMENT_UNIT
+
+# OneDrive rejects a fragment which doesn't start at the next expected byte
+DEFAULT_WORKERS = 1
+# Time in seconds a fragment is expected to take at the measured throughput
+DEFAULT_FRAGMENT_DURATION = 2
+DEFAULT_RETRIES = 3
+
+
+def parse_ranges(ranges, total):
+    """
+    Parse expected ranges of an upload session
+    :param ranges: list of str, e.g. ['0-1023', '4096-']
+    :param total: integer, size of the file in bytes
+    :return: list of (start, end) tuples, the end is exclusive
+    """
+    result = []
+    for item in ranges or []:
+        start, _, last = item.partition('-')
+        end = int(last) + 1 if last else total
+        result.append((int(start), min(end, total)))
+
+    return result
+
+
+def epoch_seconds(value):
+    """
+    :param value: datetime in UTC as onedrivesdk returns it, or None
+    :return: integer, seconds since the epoch, or None
+    """
+    if value is None:
+        return None
+
+    return calendar.timegm(value.timetuple())
+
+
+def upload_status(session, total):
+    """
+    Convert the status of an upload session to UploadStatus entity
+    :param session: onedrivesdk.UploadSession
+    :param total: integer, size of the file in bytes
+    :return: UploadStatus, the end of an expected range is exclusive and
+    the expiration time is in seconds since the epoch
+    """
+    status = UploadStatus()
+    expiration = epoch_seconds(session.expiration_date_time)
+    if expiration is not None:
+        status['expiration_date_time'] = expiration
+    for start, end in parse_ranges(session.next_expected_ranges, total):
+        status['next_expected_ranges'].append({'beginning': start,
+                                               'end': end})
+
+    return status
+
+
+def align_fragment_size(size):
+    """
+    :param size: integer, desired fragment size in bytes
+    :return: integer, the nearest allowed fragment size
+    """
+    units = max(1, min(int(size) // FRAGMENT_UNIT,
+                       MAX_FRAGMENT_SIZE // FRAGMENT_UNIT))
+
+    return units * FRAGMENT_UNIT
+
+
+class ChunkedUploader(object):
+    """
+    Uploads a file through an upload session in fragments
+
+    The file is mapped into memory and fragments are sent as slices of it,
+    so nothing is copied. Fragments are sent one at a time and in order,
+    as OneDrive requires, and the size of the next fragment follows the
+    measured throughput. Up to `workers` fragments may be in flight at once
+    for servers accepting fragments out of order. After a failure the
+    missing ranges are requested from the server and the upload continues
+    with one fragment at a time.
+    """
+
+    def __init__(self, util, workers=DEFAULT_WORKERS,
+                 fragment_size=DEFAULT_FRAGMENT_SIZE,
+                 fragment_duration=DEFAULT_FRAGMENT_DURATION,
+                 retries=DEFAULT_RETRIES):
+        """
+        :param util: an instance of OneDriveUtil
+        :param workers: integer, max number of fragments in flight, more
+        than one only for servers accepting fragments out of order
+        :param fragment_size: integer, initial fragment size in bytes
+        :param fragment_duration: time in seconds a fragment should take,
+        0 to keep the fragment size fixed
+        :param retries: integer, number of resumes after failures
+        """
+        self._util = util
+        self._workers = workers
+        self._fragment_size = align_fragment_size(fragment_size)
+        self._fragment_duration = fragment_duration
+        self._retries = retries
+        self._throughput = None
+        self._lock = threading.Lock()
+
+    @property
+    def fragment_size(self):
+        """
+        Size of the next fragment
+        :return: integer
+        """
+        return self._fragment_size
+
+    def upload(self, upload_url, src_file, resume=False):
+        """
+        Upload a file
+        :param upload_url: str, url of the upload session
+        :param src_file: str, path to file to upload
+        :param resume: continue the upload from the missing ranges reported
+        by the server
+        :return: onedrivesdk.Item, None if the server has the whole file but
+        didn't return the item
+        """
+        total = os.path.getsize(src_file)
+        if not total:
+            raise ValueError('Empty files can not be uploaded in fragments')
+
+        with open(src_file, 'rb') as stream, \
+                mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            try:
+                return self._upload(upload_url, view, total, resume)
+            finally:
+                view.release()
+
+    def _upload(self, upload_url, view, total, resume):
+        """
+        Upload the missing ranges until the server has the whole file
+        :param upload_url: str
+        :param view: memoryview of the file
+        :param total: integer, size of the file in bytes
+        :param resume: start from the missing ranges reported by the server
+        :return: onedrivesdk.Item or None
+        """
+        ranges = self.missing_ranges(upload_url, total) if resume \
+            else [(0, total)]
+        workers = self._workers
+        attempt = 0
+        while ranges:
+            try:
+                item = self._send_ranges(upload_url, view, total, ranges,
+                                         workers)
+            except (OneDriveError, requests.RequestException) as exc:
+                attempt += 1
+                if attempt > self._retries:
+                    raise
+                LOGGER.warning('Upload to %s failed, resuming: %s',
+                               upload_url, exc)
+                workers = 1
+                item = None
+
+            if item is not None:
+                return item
+            ranges = self.missing_ranges(upload_url, total)
+
+        return None
+
+    def missing_ranges(self, upload_url, total):
+        """
+        :param upload_url: str
+        :param total: integer, size of the file in bytes
+        :return: list of (start, end) ranges the server expects
+        """
+        status = upload_status(self._util.upload_session_status(upload_url),
+                               total)
+
+        return [(item['beginning'], item['end'])
+                for item in status['next_expected_ranges']]
+
+    def _send_ranges(self, upload_url, view, total, ranges, workers):
+        """
+        :param upload_url: str
+        :param view: memoryview of the file
+        :param total: integer, size of the file in bytes
+        :param ranges: list of (start, end) ranges to send
+        :param workers: integer, max number of fragments in flight
+        :return: onedrivesdk.Item if the server has completed the file
+        """
+        item = None
+        pending = set()
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            for start, end in self._fragments(ranges):
+                if len(pending) >= workers:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    item = self._collect(done) or item
+                pending.add(executor.submit(self._put, upload_url, view,
+                                            start, end, total))
+
+            done, _ = concurrent.futures.wait(pending)
+            item = self._collect(done) or item
+
+        return item
+
+    @staticmethod
+    def _collect(futures):
+        """
+        :param futures: set of completed futures of fragments
+        :return: onedrivesdk.Item returned for one of the fragments or None
+        """
+        items = [future.result() for future in futures]
+
+        return next((item for item in items if item is not None), None)
+
+    def _fragments(self, ranges):
+        """
+        :param ranges: list of (start, end) ranges
+        :return: generator of (start, end) fragments of the current size
+        """
+        for start, end in ranges:
+            while start < end:
+                fragment_end = min(start + self._fragment_size, end)
+                yield start, fragment_end
+                start = fragment_end
+
+    def _put(self, upload_url, view, start, end, total):
+        """
+        Send a fragment
+        :param upload_url: str
+        :param view: memoryview of the file
+        :param start: integer, first byte of the fragment
+        :param end: integer, byte after the last one of the fragment
+        :param total: integer, size of the file in bytes
+        :return: onedrivesdk.Item if the server has completed the file
+        """
+        headers = {
+            'Content-Range': 'bytes {}-{}/{}'.format(start, end - 1, total),
+            'Content-Length': str(end - start)
+        }
+        chunk = view[start:end]
+        started = time.monotonic()
+        try:
+            # The upload url is authorized on its own
+            response = self._util.client.http_provider.send(
+                'PUT', headers, upload_url, data=chunk
+            )
+        finally:
+            chunk.release()
+        self._measure(end - start, time.monotonic() - started)
+
+        if response.status in (200, 201):
+            return onedrivesdk.Item(json.loads(response.content))
+
+        return None
+
+    def _measure(self, size, elapsed):
+        """
+        Adapt the fragment size to the throughput of a sent fragment
+        :param size: integer, size of the fragment in bytes
+        :param elapsed: time in seconds it took
+        :return:
+        """
+        if not self._fragment_duration or elapsed <= 0:
+            return
+
+        with self._lock:
+            throughput = size / elapsed
+            if self._throughput is None:
+                self._throughput = throughput
+            else:
+                self._throughput = 0.7 * self._throughput + 0.3 * throughput
+            self._fragment_size = align_fragment_size(
+                self._throughput * self._fragment_duration
+            )
@@ -1,8 +1,18 @@
 """ Provides service to interact with remote API """
 # pylint: disable=too-many-arguments
 import json
+import logging
 
 import onedrivesdk
+from onedrivesdk.error import OneDriveError
+
+from .batch import BatchRequester
+from .delta import changes, first_request, next_page_request
+from .download import hashes_facet, RangedDownloader
+from .upload import ChunkedUploader, epoch_seconds
+
+
+LOGGER = logging.getLogger(__name__)
 
 
 class OneDriveUtil(object):
@@ -10,6 +20,8 @@ class OneDriveUtil(object):
     Provides access to the OneDrive API
     """
     DRIVE_ROOT = '/drive/root'
+    # Pre-authenticated url of the content of an item
+    DOWNLOAD_URL = '@content.downloadUrl'
 
     def __init__(self, client, token=None):
         self.token = token
@@ -92,6 +104,15 @@ class OneDriveUtil(object):
         item = self.client.item(id=item_id, path=item_path)
         item.delete()
 
+    def batch(self, **kwargs):
+        """
+        Collect metadata operations into batch requests
+        Operations of the requester return futures and are sent 20 at a time
+        :param kwargs: keyword arguments of BatchRequester
+        :return: BatchRequester
+        """
+        return BatchRequester(self, **kwargs)
+
     def create_folder(self, name, parent_id=None, parent_path=None):
         """
         Create a new folder in OneDrive
@@ -108,16 +129,29 @@ class OneDriveUtil(object):
 
         return item.children.add(folder_to_create)
 
-    def download(self, dst_file, item_id=None, item_path=None):
+    def download(self, dst_file, item_id=None, item_path=None, **kwargs):
         """
         Download a OneDrive Item contents
+        Items with a download url are fetched by ranges in parallel,
+        verified with their hashes and resumed after an interruption
         :param dst_file: str, local destination file
         :param item_id:
         :param item_path:
+        :param kwargs: keyword arguments of RangedDownloader
         :return:
         """
-        item = self.client.item(id=item_id, path=item_path)
-        item.download(dst_file)
+        item = self.get_item(item_id, item_path)
+        download_url = item.to_dict().get(self.DOWNLOAD_URL)
+        if download_url is None:
+            self.client.item(id=item_id, path=item_path).download(dst_file)
+            return
+
+        # Ranges go through the pooled connections of the client if any
+        kwargs.setdefault('session',
+                          getattr(self.client.http_provider, 'session', None))
+        downloader = RangedDownloader(**kwargs)
+        downloader.download(download_url, dst_file, item.size,
+                            hashes_facet(item))
 
     def simple_upload(self, name, src_file, parent_id=None, parent_path=None):
         """
@@ -176,6 +210,57 @@ class OneDriveUtil(object):
 
         return entity
 
+    def upload_file(self, upload_url, src_file, resume=False, **kwargs):
+        """
+        Upload a whole file through an upload session
+        Fragments are sent in order without reading the file into memory
+        :param upload_url: str, url of the upload session
+        :param src_file: str, path to file to upload
+        :param resume: continue the upload from the missing ranges
+        :param kwargs: keyword arguments of ChunkedUploader
+        :return: onedrivesdk.Item
+        """
+        uploader = ChunkedUploader(self, **kwargs)
+
+        return uploader.upload(upload_url, src_file, resume)
+
+    def resumable_upload(self, name, parent_path, src_file, sessions,
+                         file_hash=None, **kwargs):
+        """
+        Upload a whole file through an upload session kept in a store
+        The session recorded for the file is resumed if the file hasn't
+        changed since, otherwise a new session is created and recorded
+        :param name: str, name of the item
+        :param parent_path: str
+        :param src_file: str, path to file to upload
+        :param sessions: an instance of UploadSessionStore
+        :param file_hash: bytes, hash of the file content
+        :param kwargs: keyword arguments of ChunkedUploader
+        :return: onedrivesdk.Item
+        """
+        item = None
+        upload_url = sessions.load(src_file, file_hash)
+        if upload_url is not None:
+            try:
+                item = self.upload_file(upload_url, src_file, resume=True,
+                                        **kwargs)
+            except OneDriveError as exc:
+                if exc.status_code != 404:
+                    raise
+                LOGGER.info('Upload session of %s is gone: %s', src_file, exc)
+                upload_url = None
+
+        if upload_url is None:
+            session = self.create_upload_session(name, parent_path)
+            sessions.save(src_file, session.upload_url,
+                          epoch_seconds(session.expiration_date_time),
+                          file_hash)
+            item = self.upload_file(session.upload_url, src_file, **kwargs)
+
+        sessions.remove(src_file)
+
+        return item
+
     def upload_session_status(self, upload_url):
         """
         Check the upload session status
@@ -205,15 +290,24 @@ class OneDriveUtil(object):
         req = onedrivesdk.ItemRequestBuilder(upload_url, self.client)
         return req.delete()
 
-    def delta(self):
+    def delta(self, checkpoint=None):
         """
-        Returns last changes from OneDrive
-        :return: list(onedrive.Item, ...)
+        Streams last changes from OneDrive page by page
+        Only one page is kept in memory. The token is committed after the
+        last page is consumed, so an interrupted stream starts over from the
+        page the checkpoint stopped at or from the previous token
+        :param checkpoint: DeltaCheckpoint to resume from and to save the
+        progress to after every page
+        :return: generator of DirtyRemoteItem
         """
-        items = self.client.item(path='/').delta(self.token).get()
-        self.token = items.token
+        self.token, req = first_request(self.client, self.token, checkpoint)
+        page = None
+        while req is not None:
+            page = req.get()
+            yield from changes(page)
+            req = next_page_request(page, self.client, self.token, checkpoint)
 
-        return items
+        self.token = page.token
 
     @staticmethod
     def _init_upload_session_header(first_range, data_len, total):
@@ -0,0 +1,211 @@
+"""Test AsyncOneDriveUtil functionality."""
+# pylint: disable=no-self-use
+
+import asyncio
+import os
+import threading
+
+from onedrive_service.async_util import AsyncOneDriveUtil
+from onedrive_service.http_provider import PooledHttpProvider
+from onedrive_service.scheduler import RequestScheduler
+from onedrivesdk.error import OneDriveError
+import pytest
+
+from .utils.server import ApiHandler, ApiState, FakeServer, make_util, \
+    UploadState
+
+
+def run_async(util, operation):
+    """
+    Run an operation of AsyncOneDriveUtil made alongside a OneDriveUtil
+    :param util: OneDriveUtil
+    :param operation: callable which takes AsyncOneDriveUtil and returns
+    a coroutine
+    :return: result of the operation
+    """
+    loop = asyncio.new_event_loop()
+
+    async def main():
+        """
+        :return: result of the operation
+        """
+        async with AsyncOneDriveUtil(util.client, concurrency=5,
+                                     limit_per_host=5, loop=loop) as client:
+            return await operation(client)
+
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def make_state():
+    """
+    :return: ApiState with a folder of files
+    """
+    state = ApiState()
+    state.add('docs')
+    for index in range(3):
+        state.add('file{}'.format(index), 'docs', os.urandom(1000))
+
+    return state
+
+
+class TestAsyncOneDriveUtil(object):
+    """
+    Test AsyncOneDriveUtil functionality
+    """
+
+    def test_metadata(self):
+        """
+        Metadata matches that of OneDriveUtil
+        :return:
+        """
+        with FakeServer(ApiHandler, api=make_state(), upload=None) as server:
+            util = make_util(server.url)
+            item = run_async(util, lambda util: util.get_item('file0'))
+            assert item.to_dict() == util.get_item('file0').to_dict()
+
+            items = run_async(util, lambda util: util.get_items('docs'))
+            assert [child.to_dict() for child in items] == \
+                [child.to_dict() for child in util.get_items('docs')]
+
+            async def delta(async_util):
+                """
+                :return: tuple of changes and the token
+                """
+                items = [item async for item in async_util.delta()]
+                return items, async_util.token
+            items, token = run_async(util, delta)
+            assert items == list(util.delta())
+            assert token == util.token == '5'
+
+    def test_content(self, tmpdir):
+        """
+        Downloads and simple uploads match those of OneDriveUtil
+        :return:
+        """
+        state = make_state()
+        src_file = tmpdir.join('src')
+        src_file.write_binary(b'content')
+
+        with FakeServer(ApiHandler, api=state, upload=None) as server:
+            util = make_util(server.url)
+            run_async(util, lambda util: util.download(
+                str(tmpdir.join('async')), item_id='file1'
+            ))
+            util.download(str(tmpdir.join('sync')), item_id='file1')
+
+            item = run_async(util, lambda util: util.simple_upload(
+                'new', str(src_file), parent_id='docs'
+            ))
+
+        assert tmpdir.join('async').read_binary() == \
+            state.contents['file1']
+        assert tmpdir.join('sync').read_binary() == state.contents['file1']
+        assert item.id == 'new'
+        assert state.contents['new'] == b'content'
+
+    def test_upload_session(self):
+        """
+        Upload session methods match those of OneDriveUtil
+        :return:
+        """
+        upload = UploadState(200)
+
+        with FakeServer(ApiHandler, api=make_state(),
+                        upload=upload) as server:
+            util = make_util(server.url)
+            session = run_async(util, lambda util: util.create_upload_session(
+                'file', '/docs'
+            ))
+            status = run_async(util, lambda util: util.upload_session(
+                session.upload_url, b'x' * 100, 200
+            ))
+            assert status.next_expected_ranges == ['100-199']
+            assert status.next_expected_ranges == util.upload_session_status(
+                session.upload_url
+            ).next_expected_ranges
+
+            run_async(util, lambda util: util.cancel_upload_session(
+                session.upload_url
+            ))
+            assert upload.gone
+
+    def test_error(self):
+        """
+        Errors are raised as OneDriveError
+        :return:
+        """
+        with FakeServer(ApiHandler, api=make_state(), upload=None) as server:
+            util = make_util(server.url)
+            with pytest.raises(OneDriveError) as error:
+                run_async(util, lambda util: util.get_item('missing'))
+
+        assert error.value.status_code == 404
+
+    def test_concurrency(self):
+        """
+        Operations run concurrently within the limit
+        :return:
+        """
+        state = make_state()
+        state.delay = 0.01
+
+        async def get_items(async_util):
+            """
+            :return: list of items
+            """
+            return await asyncio.gather(*[
+                async_util.get_item('file{}'.format(index % 3))
+                for index in range(50)
+            ])
+
+        with FakeServer(ApiHandler, api=state, upload=None) as server:
+            items = run_async(make_util(server.url), get_items)
+
+        assert len(items) == 50
+        assert 1 < state.peak <= 5
+
+    def test_authentication(self):
+        """
+        Requests are authenticated outside of the event loop thread
+        :return:
+        """
+        threads = []
+
+        with FakeServer(ApiHandler, api=make_state(), upload=None) as server:
+            util = make_util(server.url)
+            util.client.auth_provider.authenticate_request.side_effect = \
+                lambda req: threads.append(threading.current_thread())
+            run_async(util, lambda util: util.get_item('file0'))
+
+        assert len(threads) == 1
+        assert threads[0] is not threading.current_thread()
+
+    def test_scheduler(self):
+        """
+        Throttled requests are sent again through the scheduler of the
+        client after Retry-After
+        :return:
+        """
+        state = make_state()
+        state.throttle = 2
+        state.retry_after = '0.1'
+
+        with FakeServer(ApiHandler, api=state, upload=None) as server:
+            scheduler = RequestScheduler(retries=2)
+            util = make_util(server.url,
+                             PooledHttpProvider(scheduler=scheduler))
+            item = run_async(util, lambda util: util.get_item('file0'))
+
+            state.throttle = 3
+            with pytest.raises(OneDriveError) as error:
+                run_async(util, lambda util: util.get_item('file0'))
+
+        assert item.id == 'file0'
+        assert state.times[1] - state.times[0] >= 0.1
+        assert error.value.status_code == 429
+        assert error.value.retry_after == 0.1
+        assert scheduler.metrics.sent == 6
+        assert scheduler.metrics.throttled == 5
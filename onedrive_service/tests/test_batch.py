@@ -0,0 +1,98 @@
+"""Test BatchRequester functionality."""
+# pylint: disable=no-self-use
+
+from onedrive_service.batch import item_url, parent_reference
+from onedrivesdk.error import OneDriveError
+import pytest
+
+from .utils.server import BatchHandler, DriveState, FakeServer, make_util
+
+
+class TestBatchRequester(object):
+    """
+    Test BatchRequester functionality
+    """
+
+    def test_item_url(self):
+        """
+        Test for item_url and parent_reference
+        :return:
+        """
+        assert item_url('id') == '/drive/items/id'
+        assert item_url('id', segment='children') == '/drive/items/id/children'
+        assert item_url(item_path='/Docs/a') == '/drive/root:/Docs/a'
+        assert item_url(item_path='/Docs', segment='children') == \
+            '/drive/root:/Docs:/children'
+        assert parent_reference('id') == {'id': 'id'}
+        assert parent_reference(parent_path='/Docs/') == {
+            'path': '/drive/root:/Docs'
+        }
+
+    def test_batches(self):
+        """
+        Operations are sent 20 at a time and results map back to futures
+        :return:
+        """
+        state = DriveState(items=['item{}'.format(index)
+                                  for index in range(45)])
+
+        with FakeServer(BatchHandler, drive=state) as server:
+            with make_util(server.url).batch(delay=None) as batch:
+                futures = [batch.get_item('item{}'.format(index))
+                           for index in range(45)]
+                missing = batch.get_item('missing')
+
+        assert state.batches == [20, 20, 6]
+        assert [future.result().id for future in futures] == \
+            ['item{}'.format(index) for index in range(45)]
+        with pytest.raises(OneDriveError) as error:
+            missing.result()
+        assert error.value.status_code == 404
+        assert error.value.code == 'itemNotFound'
+
+    def test_operations(self):
+        """
+        Moves, deletes and folder creates go in one batch
+        :return:
+        """
+        state = DriveState(items=['a', 'b'])
+
+        with FakeServer(BatchHandler, drive=state) as server:
+            with make_util(server.url).batch(delay=None) as batch:
+                folder = batch.create_folder('folder', parent_path='/')
+                moved = batch.move_item('a', parent_id='folder')
+                deleted = batch.delete_item('b')
+
+        assert state.batches == [3]
+        assert folder.result().folder is not None
+        assert moved.result().parent_reference.id == 'folder'
+        assert deleted.result() is None
+        assert sorted(state.items) == ['a', 'folder']
+
+    def test_timer(self):
+        """
+        Batch is sent after the delay without flush
+        :return:
+        """
+        state = DriveState(items=['a'])
+
+        with FakeServer(BatchHandler, drive=state) as server:
+            batch = make_util(server.url).batch(delay=0.01)
+            assert batch.get_item('a').result(timeout=5).id == 'a'
+
+        assert state.batches == [1]
+
+    def test_failed_batch(self):
+        """
+        Error of the whole batch is set to all its operations
+        :return:
+        """
+        state = DriveState(items=['a', 'b'], fail_batches=[1])
+
+        with FakeServer(BatchHandler, drive=state) as server:
+            with make_util(server.url).batch(delay=None) as batch:
+                futures = [batch.get_item('a'), batch.get_item('b')]
+
+        for future in futures:
+            with pytest.raises(OneDriveError):
+                future.result()
@@ -0,0 +1,307 @@
+"""Test streaming of changes."""
+# pylint: disable=no-self-use
+
+from datetime import datetime
+import hashlib
+import json
+import os
+
+import mock
+from onedrive_client.entities.common import DirtyRemoteItem
+from onedrive_service.delta import DeltaCheckpoint, dirty_remote_item
+from onedrive_service.monitor import OneDriveMonitor
+import onedrivesdk
+from onedrivesdk.error import OneDriveError
+import pytest
+
+from .utils.server import ApiHandler, ApiState, FakeServer, make_util
+
+
+def make_state(files, page_size):
+    """
+    :param files: integer, number of files in the root
+    :param page_size: integer, number of changes in a page
+    :return: ApiState
+    """
+    state = ApiState(page_size=page_size)
+    for index in range(files):
+        state.add('file{}'.format(index), data=b'x' * index)
+
+    return state
+
+
+class Crash(Exception):
+    """
+    Stops processing of changes as a crash of the service would
+    """
+
+
+def consume(util, checkpoint, processed, crash_at=None):
+    """
+    Process changes until the given number of them is processed in total
+    :param util: OneDriveUtil
+    :param checkpoint: DeltaCheckpoint
+    :param processed: list to append ids of processed changes to
+    :param crash_at: integer, number of processed changes to crash at
+    :return:
+    """
+    for item in util.delta(checkpoint):
+        if len(processed) == crash_at:
+            raise Crash()
+        processed.append(item['our_id'])
+
+
+class TestDirtyRemoteItem(object):
+    """
+    Test conversion of changes to entities
+    """
+
+    def test_file(self):
+        """
+        Metadata and hashes of a file are kept
+        :return:
+        """
+        data = b'content'
+        item = onedrivesdk.Item({
+            'id': 'ABC!1', 'name': 'file', 'eTag': 'e1', 'cTag': 'c1',
+            'size': len(data),
+            'lastModifiedDateTime': '2017-10-01T10:00:00Z',
+            'file': {'hashes': {
+                'sha1Hash': hashlib.sha1(data).hexdigest().upper()
+            }}
+        })
+
+        entity = dirty_remote_item(item)
+        assert isinstance(entity, DirtyRemoteItem)
+        assert entity['our_id'] == b'ABC!1'
+        assert entity['item']['base_item']['id'] == b'ABC!1'
+        assert entity['item']['base_item']['e_tag'] == b'e1'
+        assert entity['item']['base_item']['c_tag'] == b'c1'
+        assert entity['item']['base_item']['name'] == 'file'
+        assert entity['item']['base_item']['last_modified_date_time'] == \
+            int((datetime(2017, 10, 1, 10) - datetime(1970, 1, 1))
+                .total_seconds())
+        assert entity['item']['size'] == len(data)
+        assert entity['item']['file']['hashes']['sha1_hash'] == \
+            hashlib.sha1(data).digest()
+        assert 'folder' not in entity['item']
+
+    def test_folder_and_deleted(self):
+        """
+        Facets without hashes are marked
+        :return:
+        """
+        folder = dirty_remote_item(onedrivesdk.Item({
+            'id': 'f', 'name': 'docs', 'folder': {'childCount': 1}
+        }))
+        assert 'folder' in folder['item']
+        assert 'file' not in folder['item']
+
+        deleted = dirty_remote_item(onedrivesdk.Item({
+            'id': 'd', 'deleted': {}
+        }))
+        assert 'deleted' in deleted['item']
+        assert deleted['item']['base_item']['name'] == ''
+
+
+class TestDelta(object):
+    """
+    Test paging of OneDriveUtil.delta
+    """
+
+    def test_pages(self):
+        """
+        All pages are followed and the token is committed at the end
+        :return:
+        """
+        state = make_state(files=9, page_size=4)
+        with FakeServer(ApiHandler, api=state) as server:
+            util = make_util(server.url)
+            ids = [item['our_id'] for item in util.delta()]
+
+        assert sorted(ids) == sorted(item.encode() for item in state.items)
+        assert state.pages == 3
+        assert util.token == '10'
+
+    def test_lazy(self):
+        """
+        Pages are requested as items are consumed, the token stays until
+        the last page
+        :return:
+        """
+        state = make_state(files=9, page_size=4)
+        with FakeServer(ApiHandler, api=state) as server:
+            util = make_util(server.url)
+            util.token = '0'
+            changes = util.delta()
+            for _ in range(4):
+                next(changes)
+            assert state.pages == 1
+            next(changes)
+            assert state.pages == 2
+            assert util.token == '0'
+
+            remaining = list(changes)
+
+        assert len(remaining) == 5
+        assert util.token == '10'
+
+    def test_interrupted(self):
+        """
+        An error in the middle keeps the previous token
+        :return:
+        """
+        state = make_state(files=9, page_size=4)
+        state.fail_page = 1
+        with FakeServer(ApiHandler, api=state) as server:
+            util = make_util(server.url)
+            util.token = '0'
+            changes = util.delta()
+            with pytest.raises(OneDriveError):
+                list(changes)
+
+        assert util.token == '0'
+
+    def test_monitor(self):
+        """
+        Subscribers receive every change as it streams
+        :return:
+        """
+        state = make_state(files=5, page_size=2)
+        with FakeServer(ApiHandler, api=state) as server:
+            monitor = OneDriveMonitor(make_util(server.url))
+            subscriber = mock.Mock()
+            monitor.register(subscriber)
+            with mock.patch.object(monitor, '_wait',
+                                   side_effect=lambda _: monitor.shutdown()):
+                monitor.monitor()
+
+        received = [call[0][0] for call in subscriber.receive.call_args_list]
+        assert len(received) == len(state.items)
+        assert all(isinstance(item, DirtyRemoteItem) for item in received)
+        assert monitor.service.token == '6'
+
+
+class TestDeltaCheckpoint(object):
+    """
+    Test persistence of delta progress
+    """
+
+    def test_save_load(self, tmpdir):
+        """
+        A saved checkpoint is read back and no temporary file is left
+        :return:
+        """
+        path = str(tmpdir.join('delta.json'))
+        assert DeltaCheckpoint(path).token is None
+
+        DeltaCheckpoint(path).save('1', 'http://next')
+        checkpoint = DeltaCheckpoint(path)
+        assert (checkpoint.token, checkpoint.next_link) == \
+            ('1', 'http://next')
+        assert os.listdir(str(tmpdir)) == ['delta.json']
+
+    def test_broken_file(self, tmpdir):
+        """
+        A broken checkpoint means a full enumeration
+        :return:
+        """
+        path = tmpdir.join('delta.json')
+        path.write('{"token": ')
+        checkpoint = DeltaCheckpoint(str(path))
+        assert checkpoint.token is None
+        assert checkpoint.next_link is None
+
+    def test_crash_in_write(self, tmpdir):
+        """
+        A crash while the file is written keeps the previous checkpoint
+        :return:
+        """
+        path = str(tmpdir.join('delta.json'))
+        DeltaCheckpoint(path).save('1')
+        with mock.patch('onedrive_service.delta.os.replace',
+                        side_effect=OSError('crash')):
+            with pytest.raises(OSError):
+                DeltaCheckpoint(path).save('2', 'http://next')
+
+        with open(path) as stream:
+            assert json.load(stream) == {'token': '1', 'next_link': None}
+
+    def test_restart(self, tmpdir):
+        """
+        After a completed round a restart costs one request and sends new
+        changes only
+        :return:
+        """
+        path = str(tmpdir.join('delta.json'))
+        state = make_state(files=9, page_size=4)
+        with FakeServer(ApiHandler, api=state) as server:
+            processed = []
+            consume(make_util(server.url), DeltaCheckpoint(path), processed)
+            assert len(processed) == len(state.items)
+
+            state.pages = 0
+            util = make_util(server.url)
+            processed = []
+            consume(util, DeltaCheckpoint(path), processed)
+            assert processed == []
+            assert state.pages == 1
+
+            state.add('new', data=b'new')
+            consume(util, DeltaCheckpoint(path), processed)
+
+        assert processed == [b'new']
+
+    @pytest.mark.parametrize('crash_at', range(10))
+    def test_crash(self, tmpdir, crash_at):
+        """
+        A crash at any change loses nothing, only the changes of the page it
+        happened in are sent again
+        :return:
+        """
+        path = str(tmpdir.join('delta.json'))
+        state = make_state(files=9, page_size=4)
+        with FakeServer(ApiHandler, api=state) as server:
+            processed = []
+            with pytest.raises(Crash):
+                consume(make_util(server.url), DeltaCheckpoint(path),
+                        processed, crash_at)
+            util = make_util(server.url)
+            consume(util, DeltaCheckpoint(path), processed)
+
+        assert sorted(set(processed)) == \
+            sorted(item_id.encode() for item_id in state.items)
+        assert len(processed) - len(state.items) == crash_at % 4
+        assert util.token == DeltaCheckpoint(path).token == '10'
+
+    def test_crash_in_checkpoint(self, tmpdir):
+        """
+        A crash while the progress of a page is saved sends the page again
+        :return:
+        """
+        path = str(tmpdir.join('delta.json'))
+        state = make_state(files=9, page_size=4)
+        replace = os.replace
+        calls = []
+
+        def crash_second(*args):
+            """
+            Fail the checkpoint of the second page
+            """
+            calls.append(args)
+            if len(calls) == 2:
+                raise OSError('crash')
+            replace(*args)
+
+        with FakeServer(ApiHandler, api=state) as server:
+            processed = []
+            with mock.patch('onedrive_service.delta.os.replace',
+                            side_effect=crash_second):
+                with pytest.raises(OSError):
+                    consume(make_util(server.url), DeltaCheckpoint(path),
+                            processed)
+            consume(make_util(server.url), DeltaCheckpoint(path), processed)
+
+        assert sorted(set(processed)) == \
+            sorted(item_id.encode() for item_id in state.items)
+        assert len(processed) - len(state.items) == 4
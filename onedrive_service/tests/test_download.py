@@ -0,0 +1,141 @@
+"""Test RangedDownloader functionality."""
+# pylint: disable=no-self-use
+
+import base64
+import os
+
+from onedrive_client.entities.hashing import QuickXorHash
+from onedrive_service.download import DownloadError, hashes_facet, \
+    PART_SUFFIX, STATE_SUFFIX
+import onedrivesdk
+import pytest
+import requests
+
+from .utils.server import ContentState, DownloadHandler, FakeServer, \
+    make_util
+
+
+DATA = os.urandom(10500)
+KWARGS = dict(workers=3, range_size=1000, retries=0)
+
+
+class TestRangedDownloader(object):
+    """
+    Test RangedDownloader functionality
+    """
+
+    def test_hashes_facet(self):
+        """
+        Test for hashes_facet
+        :return:
+        """
+        item = onedrivesdk.Item({'file': {'hashes': {
+            'crc32Hash': '0A0B0C0D', 'sha1Hash': 'FF' * 20,
+            'quickXorHash': 'AAAA'
+        }}})
+
+        facet = hashes_facet(item)
+
+        assert facet['crc32_hash'] == b'\x0a\x0b\x0c\x0d'
+        assert facet['sha1_hash'] == b'\xff' * 20
+        assert facet['quick_xor_hash'] == b'\x00\x00\x00'
+        assert hashes_facet(onedrivesdk.Item({})) is None
+
+    def test_download(self, tmpdir):
+        """
+        Content is fetched by ranges into the destination
+        :return:
+        """
+        dst_file = str(tmpdir.join('file'))
+        state = ContentState(DATA)
+
+        with FakeServer(DownloadHandler, content=state) as server:
+            make_util(server.url).download(dst_file, item_id='item',
+                                           **KWARGS)
+
+        with open(dst_file, 'rb') as stream:
+            assert stream.read() == DATA
+        assert sorted(state.ranges) == [
+            (start, min(start + 1000, len(DATA)))
+            for start in range(0, len(DATA), 1000)
+        ]
+        assert os.listdir(str(tmpdir)) == ['file']
+
+    def test_resume(self, tmpdir):
+        """
+        Interrupted download continues with the missing ranges
+        :return:
+        """
+        dst_file = str(tmpdir.join('file'))
+        state = ContentState(DATA, fail_gets=[4])
+
+        with FakeServer(DownloadHandler, content=state) as server:
+            util = make_util(server.url)
+            kwargs = dict(KWARGS)
+            kwargs['workers'] = 1
+            with pytest.raises(requests.RequestException):
+                util.download(dst_file, item_id='item', **kwargs)
+            assert os.path.exists(dst_file + PART_SUFFIX)
+            assert os.path.exists(dst_file + STATE_SUFFIX)
+            assert not os.path.exists(dst_file)
+
+            util.download(dst_file, item_id='item', **KWARGS)
+
+        with open(dst_file, 'rb') as stream:
+            assert stream.read() == DATA
+        assert len(state.ranges) == 11
+        assert len(set(state.ranges)) == 11
+
+    def test_hash_mismatch(self, tmpdir):
+        """
+        Content which doesn't match the hashes is discarded
+        :return:
+        """
+        dst_file = str(tmpdir.join('file'))
+        state = ContentState(DATA, sha1_hash='00' * 20)
+
+        with FakeServer(DownloadHandler, content=state) as server:
+            with pytest.raises(DownloadError):
+                make_util(server.url).download(dst_file, item_id='item',
+                                               **KWARGS)
+
+        assert os.listdir(str(tmpdir)) == []
+
+    def test_quick_xor_hash(self, tmpdir):
+        """
+        Content is verified with QuickXorHash when there are no other hashes
+        :return:
+        """
+        dst_file = str(tmpdir.join('file'))
+        valid = base64.b64encode(QuickXorHash(DATA).digest()).decode()
+        invalid = base64.b64encode(bytes(20)).decode()
+
+        for quick_xor_hash in [invalid, valid]:
+            state = ContentState(DATA, quick_xor_hash=quick_xor_hash)
+            with FakeServer(DownloadHandler, content=state) as server:
+                util = make_util(server.url)
+                if quick_xor_hash == invalid:
+                    with pytest.raises(DownloadError):
+                        util.download(dst_file, item_id='item', **KWARGS)
+                else:
+                    util.download(dst_file, item_id='item', **KWARGS)
+
+        with open(dst_file, 'rb') as stream:
+            assert stream.read() == DATA
+
+    def test_empty(self, tmpdir):
+        """
+        Empty item is downloaded without requests of ranges
+        :return:
+        """
+        dst_file = str(tmpdir.join('file'))
+        state = ContentState(b'')
+
+        with FakeServer(DownloadHandler, content=state) as server:
+            make_util(server.url).download(dst_file, item_id='item',
+                                           **KWARGS)
+
+        with open(dst_file, 'rb') as stream:
+            assert stream.read() == b''
+        assert state.ranges == []
+        assert os.listdir(str(tmpdir)) == ['file']
@@ -0,0 +1,116 @@
+"""Test PooledHttpProvider functionality."""
+# pylint: disable=no-self-use
+# pylint: disable=protected-access
+
+from datetime import datetime, timedelta, timezone
+import email.utils
+import os
+
+from onedrive_service.authentication.one_drive_client import OneDriveClient
+from onedrive_service.http_provider import http_response, \
+    PooledHttpProvider, retry_after
+from onedrivesdk.error import OneDriveError
+import pytest
+
+from .utils.server import ContentState, DownloadHandler, FakeServer, \
+    make_util
+
+
+CONFIG = {
+    'auth': {
+        'client_secret': 'test_client_secret',
+        'client_id': 'test_client_id',
+        'scopes': ['test', 'scopes']
+    },
+    'http': {
+        'pool_size': 4
+    }
+}
+
+
+class TestPooledHttpProvider(object):
+    """
+    Test PooledHttpProvider functionality
+    """
+
+    def test_reuse(self):
+        """
+        Consecutive calls share a connection
+        :return:
+        """
+        provider = PooledHttpProvider()
+
+        with FakeServer(DownloadHandler,
+                        content=ContentState(b'data')) as server:
+            util = make_util(server.url, provider)
+            for _ in range(5):
+                assert util.get_item(item_id='item').id == 'item'
+            provider.close()
+
+        assert provider.metrics.to_dict() == {'requests': 5,
+                                              'connections': 1,
+                                              'reused': 4}
+
+    def test_download(self, tmpdir):
+        """
+        Content is downloaded through the pool
+        :return:
+        """
+        provider = PooledHttpProvider()
+        path = str(tmpdir.join('file'))
+        data = os.urandom(1000)
+
+        with FakeServer(DownloadHandler,
+                        content=ContentState(data)) as server:
+            response = provider.download({}, server.url + '/content', path)
+
+        assert response.status == 200
+        with open(path, 'rb') as stream:
+            assert stream.read() == data
+
+    def test_client(self):
+        """
+        OneDriveClient sends requests through the pool
+        :return:
+        """
+        client = OneDriveClient(CONFIG)
+
+        assert isinstance(client.http_provider, PooledHttpProvider)
+        assert client.http_provider.session.get_adapter(
+            'https://api.onedrive.com'
+        )._pool_maxsize == 4
+
+
+class TestRetryAfter(object):
+    """
+    Test errors carrying Retry-After
+    """
+
+    def test_parse(self):
+        """
+        Retry-After is read as seconds or as a date
+        :return:
+        """
+        date = email.utils.format_datetime(
+            datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True
+        )
+        assert retry_after({'Retry-After': '5'}) == 5
+        assert 25 < retry_after({'Retry-After': date}) <= 30
+        assert retry_after({'Retry-After': 'soon'}) is None
+        assert retry_after({}) is None
+
+    def test_error(self):
+        """
+        Errors are raised with the time to wait, also without a body
+        :return:
+        """
+        with pytest.raises(OneDriveError) as info:
+            http_response(429, {'Retry-After': '7'}, '')
+        assert info.value.status_code == 429
+        assert info.value.retry_after == 7
+
+        with pytest.raises(OneDriveError) as info:
+            http_response(503, {}, '{"error": {"code": "serviceNotAvailable"'
+                                   ', "message": "busy"}}')
+        assert info.value.code == 'serviceNotAvailable'
+        assert info.value.retry_after is None
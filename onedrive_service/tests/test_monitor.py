@@ -0,0 +1,202 @@
+"""Test OneDriveMonitor functionality."""
+# pylint: disable=no-self-use
+
+import threading
+import time
+
+import mock
+from onedrive_service.monitor import OneDriveMonitor, PollingSchedule
+from onedrive_service.notifications import NotificationReceiver
+from onedrivesdk.error import OneDriveError
+import pytest
+import requests
+
+from .utils.server import ApiHandler, ApiState, FakeServer, make_util
+
+
+def wait_for(condition, timeout=5):
+    """
+    :param condition: callable returning True once it's met
+    :param timeout: seconds to wait at most
+    :return: bool, whether the condition is met
+    """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+
+    return True
+
+
+class Running(object):  # pylint: disable=too-few-public-methods
+    """
+    Runs the monitor in a background thread
+    """
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self._thread = threading.Thread(target=monitor.monitor, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self.monitor
+
+    def __exit__(self, *exc_info):
+        self.monitor.shutdown()
+        self._thread.join(5)
+
+
+class TestPollingSchedule(object):
+    """
+    Test delays between delta rounds
+    """
+
+    def test_back_off(self):
+        """
+        Empty rounds double the delay up to the max, changes reset it
+        :return:
+        """
+        schedule = PollingSchedule(min_interval=1, max_interval=8)
+        assert [schedule.changed(0) for _ in range(5)] == [2, 4, 8, 8, 8]
+        assert schedule.changed(3) == 1
+        assert schedule.changed(0) == 2
+
+    def test_retry_after(self):
+        """
+        Retry-After is waited out in full
+        :return:
+        """
+        schedule = PollingSchedule(min_interval=1, max_interval=8)
+        assert schedule.throttled() == 2
+        assert schedule.throttled(30) == 30
+        assert schedule.throttled(0.5) == 8
+
+
+class TestOneDriveMonitor(object):
+    """
+    Test scheduling of delta rounds
+    """
+
+    def test_adaptive(self):
+        """
+        Delay grows while nothing changes and drops after changes
+        :return:
+        """
+        state = ApiState()
+        with FakeServer(ApiHandler, api=state) as server:
+            monitor = OneDriveMonitor(make_util(server.url), schedule=(
+                PollingSchedule(min_interval=0.01, max_interval=0.04)
+            ))
+            subscriber = mock.Mock()
+            monitor.register(subscriber)
+            delays = [monitor.poll() for _ in range(4)]
+            state.add('file', data=b'data')
+            delays.append(monitor.poll())
+
+        assert delays == [0.01, 0.02, 0.04, 0.04, 0.01]
+        assert subscriber.receive.call_count == 2
+
+    def test_throttled(self):
+        """
+        A throttled round is retried after Retry-After
+        :return:
+        """
+        state = ApiState()
+        state.throttle = 1
+        state.retry_after = '3'
+        with FakeServer(ApiHandler, api=state) as server:
+            monitor = OneDriveMonitor(make_util(server.url), schedule=(
+                PollingSchedule(min_interval=0.01, max_interval=0.04)
+            ))
+            assert monitor.poll() == 3
+            assert monitor.poll() == 0.01
+
+    def test_error(self):
+        """
+        Errors other than throttling are raised
+        :return:
+        """
+        state = ApiState(fail_page=0)
+        with FakeServer(ApiHandler, api=state) as server:
+            monitor = OneDriveMonitor(make_util(server.url))
+            with pytest.raises(OneDriveError):
+                monitor.poll()
+
+    def test_notified_while_throttled(self):
+        """
+        Notifications don't cut Retry-After short
+        :return:
+        """
+        state = ApiState()
+        state.throttle = 1
+        state.retry_after = '0.5'
+        with FakeServer(ApiHandler, api=state) as server:
+            monitor = OneDriveMonitor(make_util(server.url), push=True)
+            started = time.monotonic()
+            with Running(monitor):
+                assert wait_for(lambda: state.pages == 1)
+                monitor.notify()
+                assert wait_for(lambda: state.pages == 2)
+                assert time.monotonic() - started >= 0.5
+
+
+class TestNotificationReceiver(object):
+    """
+    Test the push mode with a local source of notifications
+    """
+
+    def test_validation(self):
+        """
+        The validation token is echoed
+        :return:
+        """
+        callback = mock.Mock()
+        with NotificationReceiver(callback) as receiver:
+            response = requests.post(receiver.url,
+                                     params={'validationToken': 'abc'})
+
+        assert response.status_code == 200
+        assert response.text == 'abc'
+        assert not callback.called
+
+    def test_push(self):
+        """
+        A round runs on a notification only
+        :return:
+        """
+        state = ApiState()
+        subscriber = mock.Mock()
+        with FakeServer(ApiHandler, api=state) as server:
+            monitor = OneDriveMonitor(make_util(server.url), push=True)
+            monitor.register(subscriber)
+            with NotificationReceiver(monitor.notify,
+                                      client_state='secret') as receiver, \
+                    Running(monitor):
+                assert wait_for(lambda: state.pages == 1)
+                state.add('file', data=b'data')
+
+                response = requests.post(receiver.url, json={'value': [
+                    {'subscriptionId': '1', 'clientState': 'other'}
+                ]})
+                assert response.status_code == 202
+                time.sleep(0.2)
+                assert state.pages == 1
+
+                requests.post(receiver.url, json={'value': [
+                    {'subscriptionId': '1', 'clientState': 'secret'}
+                ]})
+                assert wait_for(lambda: subscriber.receive.call_count == 2)
+                assert state.pages == 2
+
+    def test_malformed(self):
+        """
+        Malformed notifications are rejected
+        :return:
+        """
+        callback = mock.Mock()
+        with NotificationReceiver(callback) as receiver:
+            response = requests.post(receiver.url, data=b'not json')
+
+        assert response.status_code == 400
+        assert not callback.called
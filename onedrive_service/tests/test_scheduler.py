@@ -0,0 +1,265 @@
+"""Test RequestScheduler functionality."""
+# pylint: disable=no-self-use
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from onedrive_service.authentication.one_drive_client import OneDriveClient
+from onedrive_service.http_provider import PooledHttpProvider
+from onedrive_service.scheduler import endpoint_class, RequestScheduler, \
+    TokenBucket
+from onedrivesdk.error import OneDriveError
+import pytest
+
+from .utils.server import ApiHandler, ApiState, FakeServer, make_util
+
+
+def make_state(throttle=0, retry_after=None, delay=0):
+    """
+    :param throttle: integer, number of requests answered with 429
+    :param retry_after: str, Retry-After of the 429 responses
+    :param delay: time in seconds a request of metadata takes
+    :return: ApiState with a file
+    """
+    state = ApiState(delay=delay)
+    state.add('file', data=b'data')
+    state.throttle = throttle
+    state.retry_after = retry_after
+
+    return state
+
+
+class InFlight(object):
+    """
+    Counter of requests in flight with its peak
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        """
+        :return: a stand-in of a successful response
+        """
+        with self._lock:
+            self.count += 1
+            self.peak = max(self.peak, self.count)
+
+        return type('Response', (object,),
+                    {'status_code': 200, 'status': 200, 'headers': {}})()
+
+    def leave(self):
+        """
+        :return:
+        """
+        with self._lock:
+            self.count -= 1
+
+
+def make_scheduled_util(url, **kwargs):
+    """
+    :param url: base url of the stand-in
+    :param kwargs: arguments of RequestScheduler
+    :return: OneDriveUtil sending requests through a scheduler
+    """
+    scheduler = RequestScheduler(**kwargs)
+
+    return make_util(url, PooledHttpProvider(scheduler=scheduler))
+
+
+class TestTokenBucket(object):
+    """
+    Test rate limits
+    """
+
+    def test_rate(self):
+        """
+        A burst goes through at once, the rest at the rate
+        :return:
+        """
+        bucket = TokenBucket(rate=50, capacity=5)
+        started = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        assert time.monotonic() - started < 0.05
+
+        for _ in range(5):
+            bucket.acquire()
+        assert time.monotonic() - started >= 0.09
+
+    def test_pause(self):
+        """
+        Nothing goes through while paused
+        :return:
+        """
+        bucket = TokenBucket(rate=100, capacity=10)
+        bucket.pause(0.2)
+        assert bucket.acquire() >= 0.19
+
+
+class TestRequestScheduler(object):
+    """
+    Test scheduling of requests against a server injecting 429s
+    """
+
+    def test_endpoint_class(self):
+        """
+        Requests are classified by their urls
+        :return:
+        """
+        base = 'https://api.onedrive.com/v1.0/drive'
+        assert endpoint_class('GET', base + '/items/1') == 'metadata'
+        assert endpoint_class('GET', base + '/root:/:/view.delta?token=1') \
+            == 'delta'
+        assert endpoint_class('POST', 'https://api.onedrive.com/v1.0/$batch') \
+            == 'batch'
+        assert endpoint_class('GET', base + '/items/1/content') == 'content'
+        assert endpoint_class('PUT', 'https://upload/session') == 'content'
+
+    def test_retry_after(self):
+        """
+        Throttled requests are sent again no sooner than Retry-After
+        :return:
+        """
+        state = make_state(throttle=2, retry_after='0.2')
+        with FakeServer(ApiHandler, api=state) as server:
+            util = make_scheduled_util(server.url)
+            assert util.get_item('file').name == 'file'
+
+        assert len(state.times) == 3
+        assert state.times[1] - state.times[0] >= 0.2
+        assert state.times[2] - state.times[1] >= 0.2
+        metrics = util.client.http_provider.scheduler.metrics.to_dict()
+        assert metrics['throttled'] == 2
+        assert metrics['sent'] == 3
+        assert metrics['queued'] == metrics['active'] == 0
+
+    def test_paused_class(self):
+        """
+        Retry-After holds back the other requests of the class
+        :return:
+        """
+        state = make_state(throttle=1, retry_after='0.3')
+        with FakeServer(ApiHandler, api=state) as server:
+            util = make_scheduled_util(server.url)
+            with ThreadPoolExecutor(4) as executor:
+                first = executor.submit(util.get_item, 'file')
+                time.sleep(0.1)
+                others = [executor.submit(util.get_item, 'file')
+                          for _ in range(3)]
+                for future in [first] + others:
+                    future.result()
+
+        assert all(moment - state.times[0] >= 0.3
+                   for moment in state.times[1:])
+
+    def test_backoff(self):
+        """
+        Without Retry-After throttled requests back off
+        :return:
+        """
+        state = make_state(throttle=3)
+        with FakeServer(ApiHandler, api=state) as server:
+            util = make_scheduled_util(server.url, backoff=0.01)
+            assert util.get_item('file').name == 'file'
+
+        assert util.client.http_provider.scheduler.metrics.throttled == 3
+
+    def test_retries_exhausted(self):
+        """
+        The last throttled response is raised with its Retry-After
+        :return:
+        """
+        state = make_state(throttle=10, retry_after='0')
+        with FakeServer(ApiHandler, api=state) as server:
+            util = make_scheduled_util(server.url, retries=2)
+            with pytest.raises(OneDriveError) as info:
+                util.get_item('file')
+
+        assert info.value.status_code == 429
+        assert info.value.retry_after == 0
+        assert len(state.times) == 3
+
+    def test_concurrency(self):
+        """
+        No more requests than the cap are in flight
+        :return:
+        """
+        state = make_state(delay=0.05)
+        with FakeServer(ApiHandler, api=state) as server:
+            util = make_scheduled_util(server.url, concurrency=3,
+                                       rates={'metadata': (1000, 1000)})
+            with ThreadPoolExecutor(12) as executor:
+                items = list(executor.map(lambda _: util.get_item('file'),
+                                          range(24)))
+
+        assert len(items) == 24
+        assert state.peak <= 3
+        metrics = util.client.http_provider.scheduler.metrics
+        assert metrics.wait_time > 0
+        assert metrics.sent == 24
+
+    def test_mixed_concurrency(self):
+        """
+        Requests of threads and of an event loop share the cap
+        :return:
+        """
+        scheduler = RequestScheduler(concurrency=3,
+                                     rates={'metadata': (1000, 1000)})
+        in_flight = InFlight()
+        url = 'https://api.onedrive.com/v1.0/drive/root'
+
+        def send():
+            """
+            :return: a stand-in of requests.Response
+            """
+            response = in_flight.enter()
+            time.sleep(0.02)
+            in_flight.leave()
+            return response
+
+        async def send_async():
+            """
+            :return: a stand-in of aiohttp.ClientResponse
+            """
+            response = in_flight.enter()
+            await asyncio.sleep(0.02)
+            in_flight.leave()
+            return response
+
+        loop = asyncio.new_event_loop()
+        try:
+            with ThreadPoolExecutor(6) as executor:
+                futures = [executor.submit(scheduler.send, 'GET', url, send)
+                           for _ in range(12)]
+                loop.run_until_complete(asyncio.gather(*[
+                    scheduler.send_async('GET', url, send_async, loop)
+                    for _ in range(12)
+                ], loop=loop))
+                for future in futures:
+                    future.result()
+        finally:
+            loop.close()
+
+        assert in_flight.peak <= 3
+        assert scheduler.metrics.sent == 24
+        assert scheduler.metrics.active == 0
+
+    def test_client(self):
+        """
+        OneDriveClient sends requests through the configured scheduler
+        :return:
+        """
+        client = OneDriveClient({
+            'auth': {'client_id': 'id', 'scopes': ['scope']},
+            'http': {'scheduler': {'concurrency': 2,
+                                   'rates': {'delta': [1, 2]}}}
+        })
+
+        scheduler = client.http_provider.scheduler
+        assert isinstance(scheduler, RequestScheduler)
+        assert scheduler.buckets['delta'].capacity == 2
@@ -0,0 +1,101 @@
+"""Test UploadSessionStore functionality."""
+# pylint: disable=no-self-use
+
+import os
+import time
+
+from onedrive_service.sessions import file_identity, UploadSessionStore
+
+
+URL = 'https://example.com/upload'
+
+
+def make_store(tmpdir):
+    """
+    :param tmpdir: py.path.local
+    :return: tuple of the store and path to a source file
+    """
+    src_file = tmpdir.join('file')
+    src_file.write_binary(b'data')
+
+    return UploadSessionStore(str(tmpdir.join('sessions.db'))), str(src_file)
+
+
+class TestUploadSessionStore(object):
+    """
+    Test UploadSessionStore functionality
+    """
+
+    def test_file_identity(self, tmpdir):
+        """
+        Test for file_identity
+        :return:
+        """
+        _, src_file = make_store(tmpdir)
+        stat = os.stat(src_file)
+
+        assert file_identity(src_file, b'hash') == (
+            stat.st_ino, 4, stat.st_mtime_ns, b'hash'
+        )
+
+    def test_restart(self, tmpdir):
+        """
+        Sessions survive reopening of the store
+        :return:
+        """
+        store, src_file = make_store(tmpdir)
+        store.save(src_file, URL, int(time.time()) + 3600)
+        store.close()
+
+        store = UploadSessionStore(str(tmpdir.join('sessions.db')))
+        assert store.paths() == [src_file]
+        assert store.load(src_file) == URL
+
+        store.remove(src_file)
+        assert store.load(src_file) is None
+
+    def test_changed_file(self, tmpdir):
+        """
+        Session is discarded when the file changes
+        :return:
+        """
+        store, src_file = make_store(tmpdir)
+        store.save(src_file, URL)
+        with open(src_file, 'ab') as stream:
+            stream.write(b'more')
+
+        assert store.load(src_file) is None
+        assert store.paths() == []
+
+    def test_removed_file(self, tmpdir):
+        """
+        Session is discarded when the file is gone
+        :return:
+        """
+        store, src_file = make_store(tmpdir)
+        store.save(src_file, URL)
+        os.remove(src_file)
+
+        assert store.load(src_file) is None
+
+    def test_changed_hash(self, tmpdir):
+        """
+        Hashes are compared when both are known
+        :return:
+        """
+        store, src_file = make_store(tmpdir)
+        store.save(src_file, URL, file_hash=b'old')
+
+        assert store.load(src_file) == URL
+        assert store.load(src_file, b'old') == URL
+        assert store.load(src_file, b'new') is None
+
+    def test_expired(self, tmpdir):
+        """
+        Expired session is discarded
+        :return:
+        """
+        store, src_file = make_store(tmpdir)
+        store.save(src_file, URL, int(time.time()) - 1)
+
+        assert store.load(src_file) is None
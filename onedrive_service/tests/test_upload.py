@@ -0,0 +1,202 @@
+"""Test ChunkedUploader functionality."""
+# pylint: disable=protected-access
+# pylint: disable=no-self-use
+
+import os
+
+from onedrive_service.sessions import UploadSessionStore
+from onedrive_service.upload import align_fragment_size, ChunkedUploader, \
+    FRAGMENT_UNIT, MAX_FRAGMENT_SIZE, parse_ranges, upload_status
+import onedrivesdk
+
+from .utils.server import FakeServer, make_util, UploadHandler, UploadState
+
+
+def write_file(tmpdir, size):
+    """
+    Make a file of random data
+    :param tmpdir: py.path.local
+    :param size: integer
+    :return: tuple of path and data
+    """
+    data = os.urandom(size)
+    path = tmpdir.join('file')
+    path.write_binary(data)
+
+    return str(path), data
+
+
+class TestChunkedUploader(object):
+    """
+    Test ChunkedUploader functionality
+    """
+
+    def test_parse_ranges(self):
+        """
+        Test for parse_ranges
+        :return:
+        """
+        assert parse_ranges(['0-99', '200-'], 1024) == [(0, 100),
+                                                        (200, 1024)]
+        assert parse_ranges(None, 1024) == []
+
+    def test_upload_status(self):
+        """
+        Test for upload_status, offsets beyond 4 GiB are kept
+        :return:
+        """
+        total = 20 << 30
+        session = onedrivesdk.UploadSession({
+            'expirationDateTime': '2030-01-01T00:00:00.000Z',
+            'nextExpectedRanges': ['0-99', '{}-'.format(total - 100)]
+        })
+
+        status = upload_status(session, total)
+
+        assert status['expiration_date_time'] == 1893456000
+        assert [(item['beginning'], item['end'])
+                for item in status['next_expected_ranges']] == [
+                    (0, 100), (total - 100, total)
+                ]
+
+    def test_align_fragment_size(self):
+        """
+        Test for align_fragment_size
+        :return:
+        """
+        assert align_fragment_size(1) == FRAGMENT_UNIT
+        assert align_fragment_size(FRAGMENT_UNIT * 2.5) == FRAGMENT_UNIT * 2
+        assert align_fragment_size(1 << 40) == MAX_FRAGMENT_SIZE
+
+    def test_adaptive_fragment_size(self):
+        """
+        Fragment size follows the measured throughput
+        :return:
+        """
+        uploader = ChunkedUploader(None, fragment_duration=2)
+
+        uploader._measure(10 * FRAGMENT_UNIT, 1)
+        assert uploader.fragment_size == 20 * FRAGMENT_UNIT
+
+        for _ in range(20):
+            uploader._measure(FRAGMENT_UNIT, 10)
+        assert uploader.fragment_size == FRAGMENT_UNIT
+
+    def test_upload(self, tmpdir):
+        """
+        File is uploaded in sequential fragments
+        :return:
+        """
+        path, data = write_file(tmpdir, 5 * FRAGMENT_UNIT + 123)
+        state = UploadState(len(data))
+
+        with FakeServer(UploadHandler, upload=state) as server:
+            util = make_util(server.url)
+            item = util.upload_file(server.url + '/upload', path,
+                                    fragment_size=FRAGMENT_UNIT,
+                                    fragment_duration=0)
+
+        assert item.id == 'item'
+        assert bytes(state.data) == data
+        assert state.puts == 6
+
+    def test_upload_out_of_order(self, tmpdir):
+        """
+        Upload continues in order after fragments are rejected as out of
+        order
+        :return:
+        """
+        path, data = write_file(tmpdir, 5 * FRAGMENT_UNIT + 123)
+        state = UploadState(len(data))
+
+        with FakeServer(UploadHandler, upload=state) as server:
+            util = make_util(server.url)
+            item = util.upload_file(server.url + '/upload', path, workers=3,
+                                    fragment_size=FRAGMENT_UNIT,
+                                    fragment_duration=0)
+
+        assert item.id == 'item'
+        assert bytes(state.data) == data
+
+    def test_resume_after_failure(self, tmpdir):
+        """
+        Upload continues from the missing ranges after a failed fragment
+        :return:
+        """
+        path, data = write_file(tmpdir, 4 * FRAGMENT_UNIT)
+        state = UploadState(len(data), fail_puts=[2])
+
+        with FakeServer(UploadHandler, upload=state) as server:
+            uploader = ChunkedUploader(make_util(server.url),
+                                       fragment_size=FRAGMENT_UNIT,
+                                       fragment_duration=0)
+            item = uploader.upload(server.url + '/upload', path)
+
+        assert item.id == 'item'
+        assert bytes(state.data) == data
+
+    def test_resume(self, tmpdir):
+        """
+        Only the missing ranges are sent when an upload is resumed
+        :return:
+        """
+        path, data = write_file(tmpdir, 4 * FRAGMENT_UNIT)
+        state = UploadState(len(data))
+        state.data[:2 * FRAGMENT_UNIT] = data[:2 * FRAGMENT_UNIT]
+        state.received.append((0, 2 * FRAGMENT_UNIT))
+
+        with FakeServer(UploadHandler, upload=state) as server:
+            uploader = ChunkedUploader(make_util(server.url),
+                                       fragment_size=FRAGMENT_UNIT,
+                                       fragment_duration=0)
+            item = uploader.upload(server.url + '/upload', path, resume=True)
+
+        assert item.id == 'item'
+        assert bytes(state.data) == data
+        assert state.puts == 2
+
+    def test_resumable_upload(self, tmpdir):
+        """
+        Upload recorded in the store continues after a restart
+        :return:
+        """
+        path, data = write_file(tmpdir, 4 * FRAGMENT_UNIT)
+        state = UploadState(len(data), fail_puts=[2])
+        store = UploadSessionStore(str(tmpdir.join('sessions.db')))
+        kwargs = dict(workers=1, fragment_size=FRAGMENT_UNIT,
+                      fragment_duration=0, retries=0)
+
+        with FakeServer(UploadHandler, upload=state) as server:
+            util = make_util(server.url)
+            try:
+                util.resumable_upload('file', '/', path, store, **kwargs)
+            except onedrivesdk.error.OneDriveError:
+                pass
+            assert store.paths() == [path]
+
+            item = util.resumable_upload('file', '/', path, store, **kwargs)
+
+        assert item.id == 'item'
+        assert bytes(state.data) == data
+        assert state.sessions == 1
+        assert state.puts == 5
+        assert store.paths() == []
+
+    def test_resumable_upload_gone(self, tmpdir):
+        """
+        New session is created when the recorded one is gone
+        :return:
+        """
+        path, data = write_file(tmpdir, 2 * FRAGMENT_UNIT)
+        state = UploadState(len(data), gone=True)
+        store = UploadSessionStore(str(tmpdir.join('sessions.db')))
+
+        with FakeServer(UploadHandler, upload=state) as server:
+            store.save(path, server.url + '/upload')
+            item = make_util(server.url).resumable_upload(
+                'file', '/', path, store, fragment_duration=0
+            )
+
+        assert item.id == 'item'
+        assert bytes(state.data) == data
+        assert state.sessions == 1
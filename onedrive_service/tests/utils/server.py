@@ -0,0 +1,462 @@
+""" Local stand-ins of OneDrive endpoints.
+"""
+# pylint: disable=invalid-name
+# pylint: disable=too-few-public-methods
+# pylint: disable=too-many-instance-attributes
+import hashlib
+import http.server
+import json
+import socketserver
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import mock
+from onedrive_service.http_provider import PooledHttpProvider
+from onedrive_service.util import OneDriveUtil
+import onedrivesdk
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class FakeServer(object):
+    """ HTTP server running in a background thread.
+
+    Keyword arguments are set as attributes of the server, so handlers
+    reach the state of the stand-in through `self.server`.
+    """
+
+    def __init__(self, handler, **attributes):
+        self.server = _ThreadingServer(('127.0.0.1', 0), handler)
+        for name, value in attributes.items():
+            setattr(self.server, name, value)
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def url(self):
+        """ Base url of the server.
+        """
+        return 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+
+class JsonHandler(http.server.BaseHTTPRequestHandler):
+    """ Base of the stand-in handlers.
+    """
+
+    # Keep connections alive as the service does
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def read_body(self):
+        """ Body of the request.
+        """
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def send_json(self, status, content, headers=None):
+        """ Send a response with JSON body.
+        """
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class UploadState(object):
+    """ State of an upload session.
+    """
+
+    def __init__(self, total, fail_puts=(), gone=False):
+        self.total = total
+        self.data = bytearray(total)
+        self.received = []
+        self.fail_puts = set(fail_puts)
+        self.puts = 0
+        self.gone = gone
+        self.sessions = 0
+        self.lock = threading.Lock()
+
+    def restart(self):
+        """ Start a new session.
+        """
+        self.received = []
+        self.gone = False
+        self.sessions += 1
+
+    def missing(self):
+        """ Ranges of the file that haven't been received.
+        """
+        result = []
+        position = 0
+        for start, end in sorted(self.received):
+            if start > position:
+                result.append((position, start))
+            position = max(position, end)
+        if position < self.total:
+            result.append((position, self.total))
+
+        return result
+
+
+class UploadHandler(JsonHandler):
+    """ Stand-in of an upload session url.
+    """
+
+    def do_PUT(self):
+        """ Receive a fragment.
+        """
+        state = self.server.upload
+        if state.gone:
+            self.read_body()
+            self.send_not_found()
+            return
+        body = self.read_body()
+        first, last = self.headers['Content-Range'].split()[1] \
+            .split('/')[0].split('-')
+        start, end = int(first), int(last) + 1
+
+        with state.lock:
+            state.puts += 1
+            if state.puts in state.fail_puts:
+                self.send_json(500, {'error': {'code': 'generalException',
+                                               'message': 'Failed'}})
+                return
+            missing = state.missing()
+            if not missing or start != missing[0][0]:
+                self.send_json(416, {'error': {
+                    'code': 'invalidRange',
+                    'message': 'Fragment is not the next expected one'
+                }})
+                return
+            state.data[start:end] = body
+            state.received.append((start, end))
+            missing = state.missing()
+
+        if missing:
+            self.send_json(202, self.status(missing))
+        else:
+            self.send_json(201, {'id': 'item', 'name': 'file',
+                                 'size': state.total})
+
+    def do_POST(self):
+        """ Create the upload session.
+        """
+        self.read_body()
+        with self.server.upload.lock:
+            self.server.upload.restart()
+        host, port = self.server.server_address
+        self.send_json(200, {
+            'uploadUrl': 'http://{}:{}/upload'.format(host, port),
+            'expirationDateTime': '2030-01-01T00:00:00.000Z',
+            'nextExpectedRanges': ['0-']
+        })
+
+    def do_GET(self):
+        """ Report the status of the session.
+        """
+        if self.server.upload.gone:
+            self.send_not_found()
+            return
+        with self.server.upload.lock:
+            missing = self.server.upload.missing()
+        self.send_json(200, self.status(missing))
+
+    def send_not_found(self):
+        """ Respond as for an expired session.
+        """
+        self.send_json(404, {'error': {'code': 'itemNotFound',
+                                       'message': 'Not found'}})
+
+    @staticmethod
+    def status(missing):
+        """ Upload session of the missing ranges.
+        """
+        return {'expirationDateTime': '2030-01-01T00:00:00.000Z',
+                'nextExpectedRanges': ['{}-{}'.format(start, end - 1)
+                                       for start, end in missing]}
+
+
+class ContentState(object):
+    """ Content of an item and the ranges requested.
+    """
+
+    def __init__(self, data, fail_gets=(), sha1_hash=None,
+                 quick_xor_hash=None):
+        self.data = data
+        self.fail_gets = set(fail_gets)
+        self.hashes = {'sha1Hash': sha1_hash or hashlib.sha1(data).hexdigest()}
+        if quick_xor_hash is not None:
+            # OneDrive for Business reports QuickXorHash only
+            self.hashes = {'quickXorHash': quick_xor_hash}
+        self.gets = 0
+        self.ranges = []
+        self.lock = threading.Lock()
+
+
+class DownloadHandler(JsonHandler):
+    """ Stand-in of an item and its content supporting ranges.
+    """
+
+    def do_GET(self):
+        """ Send the metadata of the item or a range of its content.
+        """
+        state = self.server.content
+        if not self.path.endswith('/content'):
+            host, port = self.server.server_address
+            self.send_json(200, {
+                'id': 'item', 'name': 'file', 'size': len(state.data),
+                'file': {'hashes': state.hashes},
+                '@content.downloadUrl':
+                    'http://{}:{}/content'.format(host, port)
+            })
+            return
+
+        with state.lock:
+            state.gets += 1
+            failed = state.gets in state.fail_gets
+        if failed:
+            self.send_json(500, {'error': {'code': 'generalException',
+                                           'message': 'Failed'}})
+            return
+
+        start, end = 0, len(state.data)
+        if 'Range' in self.headers:
+            first, last = self.headers['Range'].split('=')[1].split('-')
+            start, end = int(first), min(int(last) + 1, end)
+        with state.lock:
+            state.ranges.append((start, end))
+
+        self.send_response(206 if 'Range' in self.headers else 200)
+        self.send_header('Content-Length', str(end - start))
+        self.end_headers()
+        self.wfile.write(state.data[start:end])
+
+
+class DriveState(object):
+    """ Items of a drive and the batches received.
+    """
+
+    def __init__(self, items=(), fail_batches=()):
+        self.items = {item_id: {'id': item_id, 'name': item_id}
+                      for item_id in items}
+        self.fail_batches = set(fail_batches)
+        self.batches = []
+        self.lock = threading.Lock()
+
+
+class BatchHandler(JsonHandler):
+    """ Stand-in of the JSON batch endpoint.
+    """
+
+    def do_POST(self):
+        """ Run the requests of a batch.
+        """
+        state = self.server.drive
+        requests = json.loads(self.read_body().decode())['requests']
+        with state.lock:
+            state.batches.append(len(requests))
+            failed = len(state.batches) in state.fail_batches
+            responses = [] if failed else [self.run(state, request)
+                                           for request in requests]
+        if failed:
+            self.send_json(503, {'error': {'code': 'serviceNotAvailable',
+                                           'message': 'Unavailable'}})
+            return
+
+        # Responses come in any order
+        self.send_json(200, {'responses': responses[::-1]})
+
+    @staticmethod
+    def run(state, request):
+        """ Response to a request of a batch.
+        """
+        parts = request['url'].strip('/').split('/')
+        item = state.items.get(parts[2])
+        response = {'id': request['id'], 'status': 200}
+        if request['method'] == 'POST' and parts[3:] == ['children']:
+            folder = dict(request['body'], id=request['body']['name'])
+            state.items[folder['id']] = folder
+            response.update(status=201, body=folder)
+        elif item is None:
+            response.update(status=404, body={'error': {
+                'code': 'itemNotFound', 'message': 'Item not found'
+            }})
+        elif request['method'] == 'GET':
+            response['body'] = item
+        elif request['method'] == 'PATCH':
+            item.update(request['body'])
+            response['body'] = item
+        elif request['method'] == 'DELETE':
+            del state.items[parts[2]]
+            response['status'] = 204
+
+        return response
+
+
+class ApiState(object):
+    """ Items of a drive with their content.
+
+    Ids of added items are logged, a delta token is the length of the log
+    when the changes were sent.
+    """
+
+    def __init__(self, delay=0, page_size=None, fail_page=None):
+        self.items = {'root': {'id': 'root', 'name': 'root', 'folder': {}}}
+        self.changes = ['root']
+        self.contents = {}
+        self.delay = delay
+        self.page_size = page_size
+        self.fail_page = fail_page
+        self.throttle = 0
+        self.retry_after = '1'
+        self.times = []
+        self.pages = 0
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def add(self, item_id, parent_id='root', data=None):
+        """ Add a file or a folder if there's no data.
+        """
+        item = {'id': item_id, 'name': item_id,
+                'parentReference': {'id': parent_id}}
+        if data is None:
+            item['folder'] = {}
+        else:
+            item.update(file={}, size=len(data))
+            self.contents[item_id] = data
+        self.items[item_id] = item
+        self.changes.append(item_id)
+
+        return item
+
+    def children(self, item_id):
+        """ Children of an item.
+        """
+        return [item for item in self.items.values()
+                if item.get('parentReference', {}).get('id') == item_id]
+
+
+class ApiHandler(UploadHandler):
+    """ Stand-in of the item API and upload sessions.
+    """
+
+    def do_GET(self):
+        """ Send metadata, children, changes or content of items.
+        """
+        if self.path.startswith('/upload'):
+            super().do_GET()
+            return
+
+        state = self.server.api
+        if self.send_throttled(state):
+            return
+
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if 'view.delta' in self.path:
+            self.send_delta(state)
+            return
+
+        item_id = parts[2]
+        if item_id not in state.items:
+            self.send_not_found()
+        elif parts[3:] == ['children']:
+            self.send_json(200, {'value': state.children(item_id)})
+        elif parts[3:] == ['content']:
+            data = state.contents[item_id]
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            with state.lock:
+                state.active += 1
+                state.peak = max(state.peak, state.active)
+            time.sleep(state.delay)
+            with state.lock:
+                state.active -= 1
+            self.send_json(200, state.items[item_id])
+
+    def send_throttled(self, state):
+        """ Answer with 429 while the state says so.
+        """
+        with state.lock:
+            state.times.append(time.monotonic())
+            if not state.throttle:
+                return False
+            state.throttle -= 1
+
+        headers = {}
+        if state.retry_after is not None:
+            headers['Retry-After'] = state.retry_after
+        self.send_json(429, {'error': {'code': 'activityLimitReached',
+                                       'message': 'Throttled'}}, headers)
+        return True
+
+    def send_delta(self, state):
+        """ Send a page of changes since the token, linking to the next page
+        if there's more.
+        """
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        token = int(query.get('token', ['0'])[0])
+        page = int(query.get('page', ['0'])[0])
+        if page == state.fail_page:
+            self.send_json(500, {'error': {'code': 'generalException'}})
+            return
+        items = [state.items[item_id] for item_id in state.changes[token:]]
+        size = state.page_size or len(items) or 1
+        body = {'value': items[page * size:(page + 1) * size]}
+        if (page + 1) * size < len(items):
+            body['@odata.nextLink'] = 'http://{}{}?token={}&page={}'.format(
+                self.headers['Host'], url.path, token, page + 1
+            )
+        else:
+            body['@delta.token'] = str(len(state.changes))
+        state.pages += 1
+        self.send_json(200, body)
+
+    def do_PUT(self):
+        """ Receive content of a file or a fragment of an upload session.
+        """
+        if self.path.startswith('/upload'):
+            super().do_PUT()
+            return
+
+        parts = self.path.strip('/').split('/')
+        item = self.server.api.add(parts[4], parts[2], self.read_body())
+        self.send_json(201, item)
+
+    def do_DELETE(self):
+        """ Cancel the upload session.
+        """
+        self.server.upload.gone = True
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def make_util(url, http_provider=None):
+    """ OneDriveUtil sending requests to a local server.
+    """
+    client = onedrivesdk.OneDriveClient(url + '/', mock.Mock(),
+                                        http_provider or PooledHttpProvider())
+
+    return OneDriveUtil(client)